@@ -2,35 +2,170 @@
 # coding: UTF-8
 # author: Sylphia
 # created:  21:55
-import asyncio
+import argparse
+import json
 import logging
-import threading
-import gettext
 import os
+import sys
+import time
 
-from controllers.game_controller import GameController
-from game_config import GameConfig
 
-localedir = os.path.join(os.path.abspath(os.path.dirname(__file__)), 'locale')
-translate = gettext.translation('2048', localedir, languages=['en-US', 'zh_CN'], fallback=True)
-translate.install()
+def install_translations():
+    """
+    Install _ for the window texts, only the window needs it so headless commands skip reading the catalogs
+    :return: None
+    """
+    import gettext
 
+    localedir = os.path.join(os.path.abspath(os.path.dirname(__file__)), 'locale')
+    translate = gettext.translation('2048', localedir, languages=['en-US', 'zh_CN'], fallback=True)
+    translate.install()
 
-def io_loop_thread(loop):
-    loop.run_forever()
 
+def play(args):
+    install_translations()
+    from controllers.game_controller import GameController  # needs tkinter, headless commands never import it
+    from game_config import GameConfig
 
-def stop_loop():
-    loop = asyncio.get_event_loop()
-    loop.stop()
-
-
-if __name__ == '__main__':
     logging.basicConfig(level=logging.DEBUG)
-    io_loop = asyncio.get_event_loop()
-    threading.Thread(target=io_loop_thread, args=(io_loop,)).start()
     config = GameConfig('config.json')
     GameController.initialize(config)
     GameController.new_game()
     GameController.run()
-    io_loop.call_soon_threadsafe(stop_loop)
+
+
+def simulate(args):
+    from simulation.tournament import run_tournament
+
+    if args.policy == 'expectimax' and args.size != 4:
+        sys.exit('The expectimax policy only plays 4x4 boards')
+
+    def print_result(result):
+        print(json.dumps(result._replace(log=None)._asdict()), flush=True)
+
+    archive = open(args.record, 'ab') if args.record else None
+    try:
+        stats, seconds = run_tournament(args.games, args.workers, args.size, args.target, args.policy, args.seed,
+                                        args.max_moves, args.chunk_size, print_result if args.per_game else None,
+                                        args.score_bucket, archive)
+    finally:
+        if archive:
+            archive.close()
+    if args.json:
+        print(json.dumps(stats.to_dict(seconds)))
+    else:
+        print(stats.format(seconds), file=sys.stderr if args.per_game else sys.stdout)
+
+
+def analyze(args):
+    from simulation.analytics import analyze_archive
+
+    stats = analyze_archive(args.archive, args.workers, args.length_bucket)
+    data = stats.to_dict()
+    if args.json:
+        print(json.dumps(data))
+        return
+    curve = data.pop('score_curve')
+    for key, value in data.items():
+        print('{}: {}'.format(key, value))
+    print('score curve: ' + ', '.join('{}: {:.0f}'.format(move, curve[move]) for move in range(100, len(curve), 100)))
+
+
+def verify_engine(args):
+    from models import bitboard
+    from simulation.differential import check, format_mismatch, load_engine
+
+    if args.engine == 'bitboard' and args.size != bitboard.SIZE:
+        sys.exit('The bitboard engine only moves 4x4 boards')
+    if args.engine == 'bitboard' and args.max_exponent >= bitboard.MAX_EXPONENT:   # two of the largest never merge
+        sys.exit('The bitboard engine caps tiles at {}, use a --max-exponent below {}'.format(
+            1 << bitboard.MAX_EXPONENT, bitboard.MAX_EXPONENT))
+    try:
+        engine = load_engine(args.engine)
+    except (ValueError, ImportError, AttributeError) as e:
+        sys.exit(str(e))
+
+    def print_progress(compared):
+        print('\r{} boards'.format(compared), end='', file=sys.stderr, flush=True)
+
+    start = time.perf_counter()
+    try:
+        compared, mismatch = check(engine, args.size, args.count, args.seed, args.batch_size, args.max_exponent,
+                                   args.full_check_every, print_progress)
+    except ImportError as e:   # e.g. the vectorized engine without numpy
+        sys.exit('{} can not run: {}'.format(args.engine, e))
+    print(file=sys.stderr)
+    if mismatch:
+        print('{} disagrees with Game after {} boards. {}'.format(args.engine, compared, format_mismatch(mismatch)))
+        sys.exit(1)
+    print('{} matches Game on {} boards in {:.1f} s'.format(args.engine, compared, time.perf_counter() - start))
+
+
+def check_config(args):
+    from game_config import GameConfig
+
+    with open(args.config, 'r') as f:
+        try:
+            data = json.load(f)
+        except ValueError as e:
+            sys.exit('{}: not valid JSON: {}'.format(args.config, e))
+    errors = GameConfig.validate(data)
+    for error in errors:
+        print('{}: {}'.format(args.config, error), file=sys.stderr)
+    if errors:
+        sys.exit(1)
+    print('{}: OK'.format(args.config))
+
+
+def parse_args(argv=None):
+    from simulation.policies import POLICIES
+
+    parser = argparse.ArgumentParser(prog='2048')
+    commands = parser.add_subparsers(dest='command')
+    commands.add_parser('play', help='play in a window (default)')
+    simulate_parser = commands.add_parser('simulate', help='play headless games across a process pool')
+    simulate_parser.add_argument('--games', type=int, default=100, help='number of games')
+    simulate_parser.add_argument('--workers', type=int, default=None,
+                                 help='worker processes, defaults to one per core, 0 plays in this process')
+    simulate_parser.add_argument('--size', type=int, default=4, help='board size')
+    simulate_parser.add_argument('--target', type=int, default=2048, help='target tile')
+    simulate_parser.add_argument('--policy', choices=sorted(POLICIES), default='random', help='move policy')
+    simulate_parser.add_argument('--seed', type=int, default=0, help='seed of the first game, game i uses seed + i')
+    simulate_parser.add_argument('--max-moves', type=int, default=0, help='move limit per game, 0 for none')
+    simulate_parser.add_argument('--chunk-size', type=int, default=None, help='games sent to a worker at once')
+    simulate_parser.add_argument('--score-bucket', type=int, default=1000, help='width of a score histogram bucket')
+    simulate_parser.add_argument('--per-game', action='store_true', help='print a JSON line per finished game')
+    simulate_parser.add_argument('--record', metavar='FILE', help='append the replay log of every game to FILE')
+    simulate_parser.add_argument('--json', action='store_true', help='print the summary as JSON')
+    analyze_parser = commands.add_parser('analyze', help='aggregate statistics over a recorded archive')
+    analyze_parser.add_argument('archive', help='archive written with simulate --record')
+    analyze_parser.add_argument('--workers', type=int, default=None,
+                                help='worker processes, defaults to one per core, 0 analyzes in this process')
+    analyze_parser.add_argument('--length-bucket', type=int, default=100, help='width of a game length bucket')
+    analyze_parser.add_argument('--json', action='store_true', help='print the statistics as JSON')
+    verify_parser = commands.add_parser('verify-engine', help='compare a move engine with Game on random boards')
+    verify_parser.add_argument('engine', help='bitboard, vectorized or module:function of an engine callable')
+    verify_parser.add_argument('--size', type=int, default=4, help='board size')
+    verify_parser.add_argument('--count', type=int, default=1000000, help='number of boards')
+    verify_parser.add_argument('--seed', type=int, default=0, help='seed of the board generator')
+    verify_parser.add_argument('--batch-size', type=int, default=4096, help='boards per engine call')
+    verify_parser.add_argument('--max-exponent', type=int, default=11, help='largest tile exponent of the boards')
+    verify_parser.add_argument('--full-check-every', type=int, default=1000,
+                               help='also move every n-th board as a whole with Game, 0 to disable')
+    check_config_parser = commands.add_parser('check-config', help='validate a game config file')
+    check_config_parser.add_argument('config', nargs='?', default='config.json', help='config file')
+    return parser.parse_args(argv)
+
+
+if __name__ == '__main__':
+    arguments = parse_args()
+    if arguments.command == 'simulate':
+        simulate(arguments)
+    elif arguments.command == 'analyze':
+        analyze(arguments)
+    elif arguments.command == 'verify-engine':
+        verify_engine(arguments)
+    elif arguments.command == 'check-config':
+        check_config(arguments)
+    else:
+        play(arguments)
@@ -0,0 +1,202 @@
+#!/usr/bin/env python
+# coding: UTF-8
+# author: Sylphia
+# created:  10:07
+import time
+from collections import OrderedDict
+
+from models import bitboard
+from models.symmetry import EvaluationCache, canonical_board
+
+
+class _OutOfTime(Exception):
+    pass
+
+
+def _row_heuristic(row):
+    """
+    Score a packed row: prefer empty cells, equal neighbours and monotonic rows, punish big tiles spread out
+    """
+    line = [(row >> (4 * i)) & 0xF for i in range(bitboard.SIZE)]
+    tile_sum = 0
+    empty = 0
+    merges = 0
+    previous = 0
+    counter = 0
+    for rank in line:
+        tile_sum += rank ** 3.5
+        if not rank:
+            empty += 1
+            continue
+        if previous == rank:
+            counter += 1
+        elif counter:
+            merges += 1 + counter
+            counter = 0
+        previous = rank
+    if counter:
+        merges += 1 + counter
+    monotonicity_left = monotonicity_right = 0
+    for i in range(1, bitboard.SIZE):
+        if line[i - 1] > line[i]:
+            monotonicity_left += line[i - 1] ** 4 - line[i] ** 4
+        else:
+            monotonicity_right += line[i] ** 4 - line[i - 1] ** 4
+    return 200000 + 270 * empty + 700 * merges - 47 * min(monotonicity_left, monotonicity_right) - 11 * tile_sum
+
+
+_heuristic_table = [_row_heuristic(row) for row in range(65536)]
+
+
+class TranspositionTable(object):
+    """
+    Bounded board -> (depth, value) cache with least recently used eviction.
+    The solver stores canonical boards (models.symmetry), so the 8 images of a board share one entry
+    """
+
+    def __init__(self, capacity=100000):
+        self.capacity = capacity
+        self.__entries = OrderedDict()
+
+    def get(self, board, depth):
+        """
+        Get a cached value that was searched at least as deep as requested
+        :param board: packed board
+        :param depth: required search depth
+        :return: value or None
+        """
+        entry = self.__entries.get(board)
+        if entry is None or entry[0] < depth:
+            return None
+        self.__entries.move_to_end(board)
+        return entry[1]
+
+    def put(self, board, depth, value):
+        entries = self.__entries
+        entries[board] = (depth, value)
+        entries.move_to_end(board)
+        if len(entries) > self.capacity:
+            entries.popitem(last=False)
+
+    def clear(self):
+        self.__entries.clear()
+
+    def __len__(self):
+        return len(self.__entries)
+
+
+class ExpectimaxSolver(object):
+    """
+    Pick moves for 4x4 games by expectimax search over the spawn chance nodes.
+
+    After a move the game spawns a 2 on a random empty cell, every empty cell is a chance outcome of equal weight.
+    The search deepens one move at a time until the depth or the time budget of a move is used up.
+    The heuristic is the same for the 8 rotations and reflections of a board, so searched values are cached per
+    canonical board.
+    """
+    __probability_threshold = 0.0001    # chance branches less likely than this are not searched further
+
+    def __init__(self, max_depth=3, time_budget_ms=40, table_size=100000, cache: EvaluationCache = None):
+        """
+        Create a solver
+        :param max_depth: deepest number of moves to look ahead
+        :param time_budget_ms: time limit of a single best_move call in milliseconds
+        :param table_size: maximal number of boards kept in the transposition table
+        :param cache: cache of best moves found with the full depth, shareable between solvers and threads, or None
+        """
+        self.max_depth = max_depth
+        self.time_budget_ms = time_budget_ms
+        self.table = TranspositionTable(table_size)
+        self.cache = cache
+        self.__deadline = 0
+        self.__stop = None
+
+    @staticmethod
+    def evaluate(board):
+        """
+        Heuristic value of a packed board
+        :param board: packed board
+        :return: the higher the better
+        """
+        table = _heuristic_table
+        t = bitboard.transpose(board)
+        return table[board & 0xFFFF] + table[(board >> 16) & 0xFFFF] + table[(board >> 32) & 0xFFFF] + \
+            table[(board >> 48) & 0xFFFF] + table[t & 0xFFFF] + table[(t >> 16) & 0xFFFF] + \
+            table[(t >> 32) & 0xFFFF] + table[(t >> 48) & 0xFFFF]
+
+    def best_move(self, game):
+        """
+        Pick the best move for a game
+        :param game: models.game.Game with a 4x4 board
+        :return: Directions value, None if the game is over or nothing can move
+        """
+        if game.size != bitboard.SIZE:
+            raise ValueError("Expectimax solver only supports {0}x{0} boards".format(bitboard.SIZE))
+        if game.game_over:
+            return None
+        return self.best_move_for_board(bitboard.from_matrix(game.matrix))
+
+    def best_move_for_board(self, board, stop=None):
+        """
+        Pick the best move for a packed board
+        :param board: packed board
+        :param stop: callable polled during the search, returning True ends it like running out of time, or None
+        :return: Directions value, None if nothing can move
+        """
+        if self.cache is not None:
+            cached = self.cache.get(board)
+            if cached is not None and cached[1] >= self.max_depth:
+                return cached[0]
+        self.__deadline = time.monotonic() + self.time_budget_ms / 1000
+        self.__stop = stop
+        children = []
+        for direction, move in bitboard.MOVES.items():
+            new_board, _ = move(board)
+            if new_board != board:
+                children.append((direction, new_board))
+        if len(children) <= 1:
+            if not children:
+                return None
+            if self.cache is not None:  # a forced move is the best one at any depth
+                self.cache.put(board, children[0][0], self.max_depth)
+            return children[0][0]
+
+        best_direction = children[0][0]
+        for depth in range(1, self.max_depth + 1):
+            try:
+                scores = [(self.__chance_node(new_board, depth - 1, 1.0), direction)
+                          for direction, new_board in children]
+            except _OutOfTime:
+                break
+            best_direction = max(scores, key=lambda item: item[0])[1]
+            if depth == self.max_depth and self.cache is not None:   # the value of an entry is its search depth
+                self.cache.put(board, best_direction, depth)
+        return best_direction
+
+    def __chance_node(self, board, depth, probability):
+        if depth <= 0 or probability < ExpectimaxSolver.__probability_threshold:
+            return self.evaluate(board)
+        key, _ = canonical_board(board)
+        cached = self.table.get(key, depth)
+        if cached is not None:
+            return cached
+        if time.monotonic() > self.__deadline or (self.__stop is not None and self.__stop()):
+            raise _OutOfTime()
+
+        empty_cells = [shift for shift in range(0, 64, 4) if not (board >> shift) & 0xF]
+        probability /= len(empty_cells)
+        total = 0
+        for shift in empty_cells:
+            total += self.__max_node(board | (1 << shift), depth, probability)
+        value = total / len(empty_cells)
+        self.table.put(key, depth, value)
+        return value
+
+    def __max_node(self, board, depth, probability):
+        best = 0
+        for move in bitboard.MOVES.values():
+            new_board, _ = move(board)
+            if new_board != board:
+                best = max(best, self.__chance_node(new_board, depth - 1, probability))
+        return best
+
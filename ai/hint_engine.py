@@ -0,0 +1,167 @@
+#!/usr/bin/env python
+# coding: UTF-8
+# author: Sylphia
+# created:  23:40
+"""
+Move hints searched on a background thread.
+
+The engine follows the position of a game: update is called with the packed board after every move, undo, redo and
+new game. A worker thread searches the best move of that board first, then the positions the next move probably leads
+to, the board after each legal move (the hinted one first) with a 2 spawned on each empty cell. Results go to a shared
+models.symmetry.EvaluationCache, so by the time the player asks, the hint of the current board is usually a cache hit.
+
+A newer update cancels whatever the worker is searching, the solver polls a stop callable during the search. Finished
+hints of the current board are announced by hint_ready_event, delivered through the dispatch callable, which is how
+the UI moves them to its own thread, the worker never touches Game or any widget.
+"""
+import threading
+from collections import deque
+
+from ai.expectimax import ExpectimaxSolver
+from common.multicast_delegate import MulticastDelegate
+from models import bitboard
+from models.symmetry import EvaluationCache, canonical_board
+
+
+def positions_ahead(board, first=None):
+    """
+    Get the boards a move and the spawn after it can lead to, every board once up to symmetry
+    :param board: packed board
+    :param first: Directions value to list first, usually the hinted one, or None
+    :return: list of packed boards
+    """
+    directions = sorted(bitboard.MOVES, key=lambda direction: direction != first)
+    seen = set()
+    boards = []
+    for direction in directions:
+        moved, _ = bitboard.MOVES[direction](board)
+        if moved == board:
+            continue
+        for shift in range(0, 64, 4):
+            if (moved >> shift) & 0xF:
+                continue
+            spawned = moved | (1 << shift)
+            key, _ = canonical_board(spawned)
+            if key not in seen:
+                seen.add(key)
+                boards.append(spawned)
+    return boards
+
+
+class HintEngine(object):
+    """
+    Background search of move hints for a 4x4 game
+    """
+
+    def __init__(self, cache: EvaluationCache = None, dispatch=None, max_depth=3, time_budget_ms=2000,
+                 look_ahead=True):
+        """
+        Create an engine and start its worker thread
+        :param cache: cache of searched boards, shared with other solvers, or None for a new one
+        :param dispatch: called from the worker with a function without arguments that must run on the thread owning
+        the subscribers of hint_ready_event, e.g. lambda callback: board.call_later(0, callback). None calls the
+        function on the worker
+        :param max_depth: search depth of a hint
+        :param time_budget_ms: time limit of a single search, a search cut short is not cached but its move is still the
+        hint of the board
+        :param look_ahead: search the positions after the next move once the current one is done
+        """
+        self.cache = cache if cache is not None else EvaluationCache()
+        self.dispatch = dispatch
+        self.look_ahead = look_ahead
+        self.hint_ready_event = MulticastDelegate(None)   # (packed board, Directions or None) of the current board
+        self.__solver = ExpectimaxSolver(max_depth, time_budget_ms, cache=self.cache)
+        self.__condition = threading.Condition()
+        self.__board = None     # current position
+        self.__announced = None     # (packed board, Directions or None) of the last finished search of the position
+        self.__generation = 0   # bumped by every update, work of an older generation is dropped
+        self.__jobs = deque()
+        self.__searching = False
+        self.__closed = False
+        self.__thread = threading.Thread(target=self.__work, name='HintEngine', daemon=True)
+        self.__thread.start()
+
+    def update(self, board):
+        """
+        Follow a new position, cancels the search of the previous one
+        :param board: packed board, or None when there is nothing to hint, e.g. the game is over
+        :return: None
+        """
+        with self.__condition:
+            self.__generation += 1
+            self.__board = board
+            self.__jobs.clear()
+            if board is not None:
+                self.__jobs.append(board)
+                self.__condition.notify()
+
+    def get_hint(self, board=None):
+        """
+        Get the hint of a position if it has been searched or announced, never waits for the worker
+        :param board: packed board, None for the current one
+        :return: Directions value, None if it isn't searched yet or nothing can move
+        """
+        if board is None:
+            board = self.__board
+            if board is None:
+                return None
+        announced = self.__announced
+        if announced is not None and announced[0] == board:
+            return announced[1]
+        cached = self.cache.get(board)
+        if cached is None or cached[1] < self.__solver.max_depth:
+            return None
+        return cached[0]
+
+    @property
+    def busy(self):
+        """
+        True while the worker has positions left to search
+        """
+        with self.__condition:
+            return bool(self.__jobs) or self.__searching
+
+    def close(self, timeout=None):
+        """
+        Stop the worker thread, the search in progress is cancelled
+        :param timeout: seconds to wait for the thread, None to wait until it ends, 0 to not wait
+        :return: None
+        """
+        with self.__condition:
+            self.__closed = True
+            self.__generation += 1
+            self.__jobs.clear()
+            self.__condition.notify()
+        if timeout != 0:
+            self.__thread.join(timeout)
+
+    def __work(self):
+        condition = self.__condition
+        while True:
+            with condition:
+                while not self.__jobs and not self.__closed:
+                    self.__searching = False
+                    condition.wait()
+                if self.__closed:
+                    return
+                generation = self.__generation
+                board = self.__jobs.popleft()
+                self.__searching = True
+            direction = self.__solver.best_move_for_board(board, lambda: self.__generation != generation)
+            with condition:
+                if generation != self.__generation or board != self.__board:
+                    continue    # cancelled, or one of the positions ahead
+                self.__announced = (board, direction)
+                if self.look_ahead:
+                    self.__jobs.extend(positions_ahead(board, direction))
+            self.__announce(board, direction)
+
+    def __announce(self, board, direction):
+        def fire():
+            if board == self.__board:  # still current once on the subscribers' thread
+                self.hint_ready_event.fire(board, direction)
+
+        if self.dispatch is None:
+            fire()
+        else:
+            self.dispatch(fire)
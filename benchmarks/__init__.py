@@ -0,0 +1,4 @@
+#!/usr/bin/env python
+# coding: UTF-8
+# author: Sylphia
+# created:  16:40
\ No newline at end of file
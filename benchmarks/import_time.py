@@ -0,0 +1,113 @@
+#!/usr/bin/env python
+# coding: UTF-8
+# author: Sylphia
+# created:  16:45
+"""
+Cold-start benchmark of the headless entry points.
+
+Every sample is a fresh interpreter run with -X importtime, so it measures what a simulate or analyze worker pays on
+start. Run from the repository root:
+
+    python -m benchmarks.import_time [--repeat 10] [--json]
+
+Exits with 1 if an entry point imported tkinter.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# modules imported by headless commands and by the processes of their pools
+ENTRY_MODULES = ['models.game', 'models.replay', 'simulation.policies', 'simulation.tournament',
+                 'simulation.analytics', 'game_config']
+
+# command lines timed as a whole, interpreter start included
+ENTRY_COMMANDS = {
+    'simulate --help': ['.', 'simulate', '--help'],
+    'check-config': ['.', 'check-config', 'config.json'],
+}
+
+
+def parse_import_time(output):
+    """
+    Parse the -X importtime report of an interpreter run
+    :param output: stderr of the run
+    :return: dict of module name -> cumulative import time in microseconds
+    """
+    modules = {}
+    for line in output.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        modules[name.strip()] = int(cumulative)
+    return modules
+
+
+def time_module(module):
+    """
+    Import a module in a fresh interpreter
+    :return: Tuple of (cumulative import time in ms, whether tkinter was imported)
+    """
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', 'import ' + module], cwd=ROOT,
+                            stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, universal_newlines=True, check=True)
+    modules = parse_import_time(result.stderr)
+    return modules[module] / 1000, 'tkinter' in modules
+
+
+def time_command(args):
+    """
+    Run a command line of the game in a fresh interpreter
+    :return: Tuple of (wall time in ms, whether tkinter was imported)
+    """
+    start = time.perf_counter()
+    result = subprocess.run([sys.executable, '-X', 'importtime'] + args, cwd=ROOT,
+                            stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, universal_newlines=True, check=True)
+    elapsed = (time.perf_counter() - start) * 1000
+    return elapsed, 'tkinter' in parse_import_time(result.stderr)
+
+
+def run(repeat=10):
+    """
+    Time every entry point
+    :param repeat: samples per entry point, the median is reported
+    :return: list of dict with name, median_ms, min_ms and tkinter
+    """
+    entries = [(module, time_module, module) for module in ENTRY_MODULES]
+    entries += [(name, time_command, args) for name, args in ENTRY_COMMANDS.items()]
+    report = []
+    for name, measure, target in entries:
+        measure(target)     # warm the disk cache, .pyc files and the move tables of models.bitboard
+        samples = []
+        tkinter = False
+        for _ in range(repeat):
+            elapsed, imported = measure(target)
+            samples.append(elapsed)
+            tkinter = tkinter or imported
+        report.append({'name': name, 'median_ms': statistics.median(samples), 'min_ms': min(samples),
+                       'tkinter': tkinter})
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m benchmarks.import_time')
+    parser.add_argument('--repeat', type=int, default=10, help='fresh interpreter runs per entry point')
+    parser.add_argument('--json', action='store_true', help='print the report as JSON')
+    args = parser.parse_args(argv)
+
+    report = run(args.repeat)
+    if args.json:
+        print(json.dumps(report))
+    else:
+        for entry in report:
+            print('{:<24} median {:8.1f} ms   min {:8.1f} ms{}'.format(
+                entry['name'], entry['median_ms'], entry['min_ms'], '   imports tkinter!' if entry['tkinter'] else ''))
+    return 1 if any(entry['tkinter'] for entry in report) else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,311 @@
+#!/usr/bin/env python
+# coding: UTF-8
+# author: Sylphia
+# created:  17:20
+"""
+Benchmark of models.game.Game with regression thresholds.
+
+Every operation runs on every board size, once on a bare game and once with a handler on every event of the game
+(which also takes 4x4 boards off the bitboard engine). Boards and spawns come from fixed seeds, so two runs do the same
+work. Per scenario it reports:
+
+    ns_per_op           median over the repeats of the mean wall time of one operation
+    alloc_bytes_per_op  mean of the memory allocated above the start of an operation at its high water mark
+    peak_kb             peak of the traced memory over the whole scenario, setup included
+
+Run from the repository root:
+
+    python -m benchmarks.move_engine                  compare against benchmarks/move_engine_baseline.json
+    python -m benchmarks.move_engine --save           write the results as the new baseline
+    python -m benchmarks.move_engine --threshold 10   fail when a result is more than 10% worse than its baseline
+
+Exits with 1 when a result regressed. Timings of a baseline only compare with runs on the same machine.
+"""
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import time
+import tracemalloc
+from collections import namedtuple
+from functools import partial
+
+from models.directions import Directions
+from models.game import Game
+
+BASELINE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'move_engine_baseline.json')
+SIZES = (4, 6, 8, 12, 16)
+SEED = 2048
+TARGET = 2048
+MAX_EXPONENT = 8    # largest tile of generated boards, no move can reach the target from them
+
+Scenario = namedtuple('Scenario', ['operation', 'size', 'subscribed'])
+Result = namedtuple('Result', ['name', 'ops', 'ns_per_op', 'alloc_bytes_per_op', 'peak_kb'])
+
+
+def scenario_name(scenario: Scenario):
+    return '{}/{}x{}/{}'.format(scenario.operation, scenario.size, scenario.size,
+                                'subscribed' if scenario.subscribed else 'bare')
+
+
+def random_board(rnd, size, fill=0.5):
+    """
+    Generate a board with about fill of its cells taken by tiles up to 2 ** MAX_EXPONENT
+    :return: matrix[x][y] of tile values
+    """
+    return [[1 << rnd.randint(1, MAX_EXPONENT) if rnd.random() < fill else 0 for _ in range(size)]
+            for __ in range(size)]
+
+
+def losing_board(size):
+    """
+    Build a board one Right move away from losing: no two neighbours are equal, and the only empty cell sits at the
+    right end of row 2. The move shifts that row and the 2 spawned on its left end matches no neighbour
+    :return: matrix[x][y] of tile values
+    """
+    board = [[1 << 1 + (x + 2 * y) % 7 for y in range(size)] for x in range(size)]
+    board[size - 1][2] = 0
+    return board
+
+
+def _ignore(*args):
+    pass
+
+
+def subscribe(game: Game):
+    """
+    Attach a handler that does nothing to every event of a game
+    :return: None
+    """
+    for event in (game.tile_event, game.tile_batch_event, game.score_event, game.game_over_event,
+                  game.move_complete_event, game.undo_event, game.redo_event):
+        event += _ignore
+
+
+def _bench_move(direction):
+    def bench(game, rnd, count):
+        for _ in range(count):
+            while True:     # a board the direction changes, otherwise the move is a no-op
+                game.load(random_board(rnd, game.size))
+                if direction in game.legal_moves():
+                    break
+            yield partial(game.move, direction)
+    return bench
+
+
+def _bench_new_game(game, rnd, count):
+    for _ in range(count):
+        yield game.new_game
+
+
+def _bench_spawn(game, rnd, count):
+    spawn = game._Game__create_random_tile  # no public way to spawn outside of a move
+    for _ in range(count):
+        game.load(random_board(rnd, game.size))
+        yield partial(spawn, 1, [2])
+
+
+def _bench_undo(game, rnd, count):
+    done = 0
+    while done < count:
+        game.new_game(rnd.getrandbits(32))
+        for _ in range(count - done):
+            legal = sorted(game.legal_moves(), key=lambda direction: direction.value)
+            if not legal:
+                break
+            game.move(rnd.choice(legal))
+        if game.game_over:
+            continue    # a finished game can't be undone, play another one
+        while game.undo_history and done < count:
+            done += 1
+            yield game.undo
+
+
+def _bench_game_over(game, rnd, count):
+    board = losing_board(game.size)
+    for _ in range(count):
+        game.load(board)
+        yield partial(game.move, Directions.Right)
+
+
+OPERATIONS = {'move_' + direction.name.lower(): _bench_move(direction) for direction in Directions}
+OPERATIONS.update({
+    'new_game': _bench_new_game,
+    'spawn': _bench_spawn,
+    'undo': _bench_undo,
+    'game_over': _bench_game_over,
+})
+
+
+def _create_game(scenario: Scenario):
+    game = Game(scenario.size, TARGET, seed=SEED)
+    if scenario.subscribed:
+        subscribe(game)
+    return game
+
+
+def _scenario_random(scenario: Scenario):
+    return random.Random('{}/{}'.format(SEED, scenario_name(scenario)))
+
+
+def _time_once(scenario: Scenario, count):
+    total = 0
+    ops = 0
+    clock = time.perf_counter_ns
+    for call in OPERATIONS[scenario.operation](_create_game(scenario), _scenario_random(scenario), count):
+        start = clock()
+        call()
+        total += clock() - start
+        ops += 1
+    return total, ops
+
+
+def _trace_memory(scenario: Scenario, count):
+    allocated = 0
+    ops = 0
+    tracemalloc.start()
+    try:
+        for call in OPERATIONS[scenario.operation](_create_game(scenario), _scenario_random(scenario), count):
+            current, peak = tracemalloc.get_traced_memory()
+            tracemalloc.reset_peak()
+            call()
+            allocated += tracemalloc.get_traced_memory()[1] - current
+            ops += 1
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return allocated, peak, ops
+
+
+def run_scenario(scenario: Scenario, count=100, repeat=5):
+    """
+    Measure one scenario
+    :param scenario: Scenario
+    :param count: operations per repeat
+    :param repeat: timed repeats, the median is reported. Memory is traced in a separate run, tracing slows it down
+    :return: Result
+    """
+    timings = []
+    ops = 0
+    for _ in range(repeat):
+        total, ops = _time_once(scenario, count)
+        timings.append(total / ops)
+    allocated, peak, traced_ops = _trace_memory(scenario, count)
+    return Result(scenario_name(scenario), ops, round(statistics.median(timings), 1),
+                  round(allocated / traced_ops, 1), round(peak / 1024, 1))
+
+
+def run(sizes=SIZES, operations=None, count=100, repeat=5, on_result=None):
+    """
+    Measure every combination of operation, size and subscribers
+    :param sizes: board sizes
+    :param operations: names of OPERATIONS, None for all
+    :param count: operations per repeat
+    :param repeat: timed repeats per scenario
+    :param on_result: called with every Result as soon as it is measured, or None
+    :return: list of Result
+    """
+    results = []
+    for size in sizes:
+        for operation in operations or OPERATIONS:
+            for subscribed in (False, True):
+                result = run_scenario(Scenario(operation, size, subscribed), count, repeat)
+                results.append(result)
+                if on_result:
+                    on_result(result)
+    return results
+
+
+def load_baseline(path=BASELINE_FILE):
+    """
+    :return: dict of scenario name -> result dict, empty if there is no baseline
+    """
+    try:
+        with open(path, 'r') as f:
+            return json.load(f)['results']
+    except OSError:
+        return {}
+
+
+def save_baseline(results, path=BASELINE_FILE):
+    """
+    Write results as the baseline, merged into the existing one so a partial run only replaces its own scenarios
+    :return: None
+    """
+    baseline = load_baseline(path)
+    baseline.update((result.name, result._asdict()) for result in results)
+    with open(path, 'w') as f:
+        json.dump({'results': dict(sorted(baseline.items()))}, f, indent=1)
+        f.write('\n')
+
+
+def compare(results, baseline, threshold=25.0):
+    """
+    Find the results worse than their baseline
+    :param results: list of Result
+    :param baseline: dict from load_baseline
+    :param threshold: allowed increase of ns_per_op and alloc_bytes_per_op, in percent
+    :return: list of (scenario name, metric, baseline value, new value)
+    """
+    regressions = []
+    for result in results:
+        expected = baseline.get(result.name)
+        if not expected:
+            continue
+        for metric in ('ns_per_op', 'alloc_bytes_per_op'):
+            value = getattr(result, metric)
+            if value > expected[metric] * (1 + threshold / 100):
+                regressions.append((result.name, metric, expected[metric], value))
+    return regressions
+
+
+def _parse_sizes(value):
+    sizes = []
+    for part in value.split(','):
+        first, _, last = part.partition('-')
+        sizes.extend(range(int(first), int(last or first) + 1))
+    return sizes
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m benchmarks.move_engine')
+    parser.add_argument('--sizes', type=_parse_sizes, default=SIZES,
+                        help='board sizes, e.g. 4,8 or 4-16, default {}'.format(','.join(map(str, SIZES))))
+    parser.add_argument('--operations', type=lambda value: value.split(','), default=None,
+                        help='comma separated subset of ' + ','.join(OPERATIONS))
+    parser.add_argument('--count', type=int, default=100, help='operations per repeat')
+    parser.add_argument('--repeat', type=int, default=5, help='timed repeats per scenario')
+    parser.add_argument('--baseline', default=BASELINE_FILE, help='baseline file')
+    parser.add_argument('--threshold', type=float, default=25.0, help='allowed regression in percent')
+    parser.add_argument('--save', action='store_true', help='save the results as the baseline instead of comparing')
+    parser.add_argument('--json', action='store_true', help='print the results as JSON lines')
+    args = parser.parse_args(argv)
+    unknown = set(args.operations or ()) - set(OPERATIONS)
+    if unknown:
+        parser.error('unknown operations: ' + ', '.join(sorted(unknown)))
+
+    baseline = load_baseline(args.baseline)
+
+    def print_result(result):
+        if args.json:
+            print(json.dumps(result._asdict()), flush=True)
+            return
+        expected = baseline.get(result.name)
+        change = ' {:+6.1f}%'.format((result.ns_per_op / expected['ns_per_op'] - 1) * 100) if expected else ''
+        print('{:<32} {:>12.1f} ns/op{} {:>10.1f} B/op {:>10.1f} KiB peak'.format(
+            result.name, result.ns_per_op, change, result.alloc_bytes_per_op, result.peak_kb), flush=True)
+
+    results = run(args.sizes, args.operations, args.count, args.repeat, print_result)
+    if args.save:
+        save_baseline(results, args.baseline)
+        return 0
+    regressions = compare(results, baseline, args.threshold)
+    for name, metric, expected, value in regressions:
+        print('REGRESSION {} {}: {} -> {}'.format(name, metric, expected, value), file=sys.stderr)
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
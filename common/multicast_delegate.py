@@ -5,19 +5,93 @@
 
 
 class MulticastDelegate(object):
-    def __init__(self, target_function):
-        self._invocation_list = []
+    def __init__(self, target_function, coalesce=False):
+        """
+        Create a delegate
+        :param target_function: first function to subscribe, or None
+        :param coalesce: while batching, only deliver the last call of the batch
+        """
+        self._invocation_list = ()  # immutable, so subscribing while invoking never changes a running loop
+        self._batch_handlers = ()
+        self.coalesce = coalesce
+        self.__batch_depth = 0
+        self.__pending = None   # argument tuples queued while batching
         if target_function and not callable(target_function):
             raise ValueError("Target function must be callable")
         if target_function:
-            self._invocation_list.append(target_function)
+            self._invocation_list = (target_function,)
 
     def invoke(self, *args, **kwargs):
         return [fun(*args, **kwargs) for fun in self._invocation_list]
 
+    def fire(self, *args, **kwargs):
+        """
+        Call every subscriber without collecting results, queues the call while batching
+        :return: None
+        """
+        if not self._invocation_list and not self._batch_handlers:
+            return
+        if self.__pending is not None:
+            if kwargs:
+                raise ValueError("Keyword arguments can not be batched")
+            if self.coalesce:
+                self.__pending.clear()
+            self.__pending.append(args)
+            return
+        for fun in self._invocation_list:
+            fun(*args, **kwargs)
+        for handler in self._batch_handlers:
+            handler([args])
+
+    def begin_batch(self):
+        """
+        Queue calls made by fire until the matching end_batch, batches can be nested
+        :return: None
+        """
+        self.__batch_depth += 1
+        if self.__pending is None:
+            self.__pending = []
+
+    def end_batch(self):
+        """
+        Deliver the calls queued since begin_batch, each function receives every call in order,
+        batch handlers receive the list of argument tuples once
+        :return: None
+        """
+        self.__batch_depth -= 1
+        if self.__batch_depth > 0:
+            return
+        self.__batch_depth = 0  # reset before delivering, a raising function never leaves the delegate batching
+        pending, self.__pending = self.__pending, None
+        if not pending:
+            return
+        for args in pending:
+            for fun in self._invocation_list:
+                fun(*args)
+        for handler in self._batch_handlers:
+            handler(pending)
+
+    def add_batch_handler(self, handler):
+        """
+        Subscribe a function that receives all calls of a batch at once, as a list of argument tuples.
+        Outside a batch it receives every call as a batch of one.
+        :param handler: callable
+        :return: None
+        """
+        if not callable(handler):
+            raise ValueError("Handler must be callable")
+        if handler not in self._batch_handlers:
+            self._batch_handlers += (handler,)
+
+    def remove_batch_handler(self, handler):
+        self._batch_handlers = tuple(item for item in self._batch_handlers if item != handler)
+
     def get_invocation_list(self):
         return list(self._invocation_list)
 
+    def __len__(self):
+        return len(self._invocation_list) + len(self._batch_handlers)
+
     def __call__(self, *args, **kwargs):
         return self.invoke(*args, **kwargs)
 
@@ -25,25 +99,48 @@ class MulticastDelegate(object):
         # type: (callable) -> MulticastDelegate
         if not other and not callable(other):
             raise ValueError("Other must be callable")
-        my_functions = self.get_invocation_list()
-        ret = MulticastDelegate(None)
+        ret = MulticastDelegate(None, self.coalesce)
+        ret._batch_handlers = self._batch_handlers
         if isinstance(other, MulticastDelegate):
-            ret._invocation_list = my_functions + other._invocation_list
+            ret._invocation_list = self._invocation_list + other._invocation_list
         else:
-            ret._invocation_list = my_functions
-            if not other in my_functions:
-                ret._invocation_list.append(other)
+            ret._invocation_list = self._invocation_list
+            if other not in self._invocation_list:
+                ret._invocation_list += (other,)
         return ret
 
     def __sub__(self, other):
         # type: (callable) -> MulticastDelegate
         if not other and not callable(other):
             raise ValueError("Other must be callable")
-        my_functions = self.get_invocation_list()
-        ret = MulticastDelegate(None)
-        ret._invocation_list = my_functions
+        ret = MulticastDelegate(None, self.coalesce)
+        ret._batch_handlers = self._batch_handlers
         if isinstance(other, MulticastDelegate):
-            ret._invocation_list = [item for item in my_functions if item not in other._invocation_list]
+            ret._invocation_list = tuple(item for item in self._invocation_list if item not in other._invocation_list)
         else:
-            ret._invocation_list.remove(other)
+            functions = list(self._invocation_list)
+            functions.remove(other)
+            ret._invocation_list = tuple(functions)
         return ret
+
+    def __iadd__(self, other):
+        # type: (callable) -> MulticastDelegate
+        if not other and not callable(other):
+            raise ValueError("Other must be callable")
+        if isinstance(other, MulticastDelegate):
+            self._invocation_list += other._invocation_list
+        elif other not in self._invocation_list:
+            self._invocation_list += (other,)
+        return self
+
+    def __isub__(self, other):
+        # type: (callable) -> MulticastDelegate
+        if not other and not callable(other):
+            raise ValueError("Other must be callable")
+        if isinstance(other, MulticastDelegate):
+            self._invocation_list = tuple(item for item in self._invocation_list if item not in other._invocation_list)
+        else:
+            functions = list(self._invocation_list)
+            functions.remove(other)
+            self._invocation_list = tuple(functions)
+        return self
@@ -2,53 +2,219 @@
 # coding: UTF-8
 # author: Sylphia
 # created:  15:03
-import asyncio
 import logging
 
+from ai.expectimax import ExpectimaxSolver
+from ai.hint_engine import HintEngine
 from controllers.controller_base import ControllerBase
+from controllers.input_queue import InputQueue
+from models import bitboard
 from models.directions import Directions
 from models.game import Game
+from models.symmetry import EvaluationCache
 from views.board import Board
 
 
 class GameController(ControllerBase):
+    Solver = None
+    AutoPlay = False
+    Input = None    # moves applied to the game while the board was animating, rendered when it stops
+    MetricsDumping = False  # a metrics dump is scheduled
+    Hints = None    # searches hints of the current position in the background
+    HintWanted = False  # the player asked for a hint that wasn't ready yet
+    __auto_play_interval_ms = 150
+    __config_poll_interval_ms = 1000
+
     @classmethod
     def initialize(cls, config):
         cls.Config = config
         cls.Game = Game()
-        cls.Board = Board(cls.Game, _("2048"), config, asyncio.get_event_loop())
+        cache = EvaluationCache()   # auto play reuses what the hint engine searched ahead and the other way round
+        cls.Solver = ExpectimaxSolver(cache=cache)
+        cls.Board = Board(cls.Game, _("2048"), config)
+        # hints are handed to the Tk loop, the worker never touches the board
+        cls.Hints = HintEngine(cache, dispatch=lambda callback: cls.Board.call_later(0, callback))
+        cls.Hints.hint_ready_event += cls.__hint_ready
+        cls.Game.move_complete_event += cls.__position_changed
+        cls.Game.undo_event += cls.__history_changed
+        cls.Game.redo_event += cls.__history_changed
         cls.Board.on_new_game_clicked += cls.new_game
         cls.Board.on_undo_clicked += cls.undo
+        cls.Board.on_redo_clicked += cls.redo
+        cls.Board.on_auto_play_clicked += cls.toggle_auto_play
+        cls.Board.on_hint_clicked += cls.hint
         cls.Board.on_key_event += cls.dispatch
+        cls.Board.animations.idle_event += cls.render_pending
+        cls.Input = InputQueue(config.get_input_queue_depth(), config.get_input_full_policy())
+        config.changed_event += cls.__config_changed
+        cls.Board.call_later(cls.__config_poll_interval_ms, cls.__watch_config)
+        cls.__update_metrics()
+
+    @classmethod
+    def __update_metrics(cls):
+        """
+        Record game metrics while the config names a metrics file, and dump them there periodically
+        :return: None
+        """
+        if not cls.Config.get_metrics_file():
+            cls.Game.disable_metrics()
+            return
+        if cls.Game.metrics is None:
+            cls.Game.enable_metrics()
+        if not cls.MetricsDumping:
+            cls.MetricsDumping = True
+            cls.Board.call_later(cls.Config.get_metrics_interval_ms(), cls.__dump_metrics)
+
+    @classmethod
+    def __dump_metrics(cls, reschedule=True):
+        path = cls.Config.get_metrics_file()
+        metrics = cls.Game.metrics
+        if not path or metrics is None:    # disabled since the dump was scheduled
+            cls.MetricsDumping = False
+            return
+        try:
+            metrics.dump(path, cls.Config.get_metrics_format())
+        except OSError as e:
+            logging.warning('Could not write metrics to %s: %s', path, e)
+        if reschedule:
+            cls.Board.call_later(cls.Config.get_metrics_interval_ms(), cls.__dump_metrics)
+
+    @classmethod
+    def __watch_config(cls):
+        cls.Config.check_for_changes()
+        cls.Board.call_later(cls.__config_poll_interval_ms, cls.__watch_config)
+
+    @classmethod
+    def __config_changed(cls, config):
+        logging.debug('Config reloaded')
+        if (cls.Input.depth, cls.Input.full_policy) != (config.get_input_queue_depth(), config.get_input_full_policy()):
+            cls.render_pending()
+            cls.Input = InputQueue(config.get_input_queue_depth(), config.get_input_full_policy())
+        cls.__update_metrics()
 
     @classmethod
     def new_game(cls):
         game = cls.Game
         board = cls.Board
+        cls.render_pending()
         board.clear_board()
         game.new_game()
+        cls.__position_changed()
 
     @classmethod
     def undo(cls):
         logging.debug('undo')
+        cls.render_pending()
         cls.Game.undo()
 
+    @classmethod
+    def redo(cls):
+        logging.debug('redo')
+        cls.render_pending()
+        cls.Game.redo()
+
+    @classmethod
+    def hint(cls):
+        """
+        Show the recommended move of the current position, at once if it was searched already, otherwise as soon as
+        the hint engine finishes it. Nothing to show once the game is over
+        :return: None
+        """
+        if cls.Game.game_over:
+            return
+        direction = cls.Hints.get_hint()
+        if direction is None:
+            cls.HintWanted = True
+            return
+        cls.Board.show_hint(direction)
+
+    @classmethod
+    def __hint_ready(cls, board, direction):
+        if cls.HintWanted:
+            cls.HintWanted = False
+            cls.Board.show_hint(direction)
+
+    @classmethod
+    def __history_changed(cls, score, matrix):
+        cls.__position_changed()
+
+    @classmethod
+    def __position_changed(cls):
+        """
+        Drop the shown hint and let the hint engine search the new position
+        :return: None
+        """
+        cls.HintWanted = False
+        cls.Board.clear_hint()
+        game = cls.Game
+        cls.Hints.update(None if game.game_over else bitboard.from_matrix(game.matrix))
+
     @classmethod
     def move(cls, direction: Directions):
         logging.debug('Moving {}'.format(direction.name))
         cls.Game.move(direction)
 
+    @classmethod
+    def toggle_auto_play(cls):
+        """
+        Start or stop letting the solver play the game
+        :return: None
+        """
+        cls.AutoPlay = not cls.AutoPlay
+        logging.debug('Auto play {}'.format('on' if cls.AutoPlay else 'off'))
+        if cls.AutoPlay:
+            cls.__auto_play_step()
+
+    @classmethod
+    def __auto_play_step(cls):
+        if not cls.AutoPlay:
+            return
+        direction = cls.Solver.best_move(cls.Game)
+        if direction is None:   # game over, nothing left to play
+            cls.AutoPlay = False
+            return
+        cls.move(direction)
+        cls.Board.call_later(cls.__auto_play_interval_ms, cls.__auto_play_step)
+
     @classmethod
     def dispatch(cls, event, *args, **kwargs):
-        if event.keysym in cls.Config.get_up_keys():
-            cls.move(Directions.Up)
-        elif event.keysym in cls.Config.get_down_keys():
-            cls.move(Directions.Down)
-        elif event.keysym in cls.Config.get_left_keys():
-            cls.move(Directions.Left)
-        elif event.keysym in cls.Config.get_right_keys():
-            cls.move(Directions.Right)
+        """
+        Apply a key press to the game at once. While the board is animating, the moves are rendered together as one
+        animation to the final board when it stops, at most Input.depth of them: once the queue is full, Ignore
+        ignores the key and Flush renders the queued moves right away, skipping their animation, so no key is lost
+        """
+        direction = cls.Config.get_direction(event.keysym)
+        if direction is None:
+            return
+        board = cls.Board
+        if not board.animations:    # nothing in flight, the move animates by itself
+            cls.move(direction)
+            return
+        pending = cls.Input
+        if pending.full and pending.full_policy == InputQueue.Flush:
+            cls.render_pending()
+            if not board.animations:
+                cls.move(direction)
+                return
+        if not pending.push():
+            return
+        if len(pending) == 1:
+            board.begin_batch()
+        cls.move(direction)
+
+    @classmethod
+    def render_pending(cls):
+        """
+        Animate the board from what it shows to the game state, if moves were applied while it was animating
+        :return: None
+        """
+        if not cls.Input:
+            return
+        cls.Input.clear()
+        cls.Board.end_batch()
 
     @classmethod
     def run(cls):
         cls.Board.show()
+        cls.Hints.close(timeout=0)
+        cls.__dump_metrics(reschedule=False)     # the last moves of the session
@@ -0,0 +1,48 @@
+#!/usr/bin/env python
+# coding: UTF-8
+# author: Sylphia
+# created:  17:25
+
+
+class InputQueue(object):
+    """
+    Bounded count of moves applied to the game while the board was animating, not rendered yet
+    """
+    Flush = 'flush'     # a full queue has its pending moves rendered at once, then takes the new one
+    Ignore = 'ignore'   # a full queue ignores new moves
+
+    def __init__(self, depth=4, full_policy=Flush):
+        """
+        Create a queue
+        :param depth: maximal number of pending moves, at least 1
+        :param full_policy: Flush or Ignore
+        """
+        if depth < 1:
+            raise ValueError("Queue depth must be at least 1")
+        if full_policy not in (InputQueue.Flush, InputQueue.Ignore):
+            raise ValueError("Unknown full queue policy '{}'".format(full_policy))
+        self.depth = depth
+        self.full_policy = full_policy
+        self.ignored = 0    # number of moves a full queue ignored
+        self.__pending = 0
+
+    @property
+    def full(self):
+        return self.__pending >= self.depth
+
+    def push(self):
+        """
+        Count a pending move
+        :return: False if the queue is full and the move must be ignored
+        """
+        if self.full:
+            self.ignored += 1
+            return False
+        self.__pending += 1
+        return True
+
+    def clear(self):
+        self.__pending = 0
+
+    def __len__(self):
+        return self.__pending
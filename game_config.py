@@ -3,6 +3,12 @@
 # author: Sylphia
 # created:  0:00
 import json
+import logging
+import os
+from types import MappingProxyType
+
+from common.multicast_delegate import MulticastDelegate
+from models.directions import Directions
 
 
 class GameConfig(object):
@@ -21,6 +27,18 @@ class GameConfig(object):
             "face": "Arial",
             "size": 20
         },
+        "rendering": {
+            "mode": "canvas"
+        },
+        "input": {
+            "queueDepth": 4,
+            "fullPolicy": "flush"
+        },
+        "metrics": {
+            "file": "",
+            "format": "prometheus",
+            "intervalMs": 10000
+        },
         "colors": {
             "board": {
                 "foreground": "#ac7e65",
@@ -37,89 +55,295 @@ class GameConfig(object):
 
     def __init__(self, config_file):
         """
-        Load game config from json file
+        Load game config from json file, a missing or invalid file leaves the defaults in place
         :param config_file: game config json file name
         """
+        self.config_file = config_file
         self.data = {}
+        self.changed_event = MulticastDelegate(None)    # Config reloaded with new content, called with the config
+        self.__key_map = None
+        self.__tile_colors = None
+        self.__file_state = None   # (mtime, size) of the file last read, None if it could not be read
+        self.__compile()
+        self.reload()
+
+    def reload(self):
+        """
+        Read the config file again and rebuild the lookup tables. The new content must pass validate, otherwise the
+        current config is kept
+        :return: True if the new content was applied
+        """
+        self.__file_state = self.__get_file_state()
         try:
-            with open(config_file, 'r') as f:
-                self.data = json.load(f)
-        except:
-            pass
+            with open(self.config_file, 'r') as f:
+                data = json.load(f)
+        except OSError:
+            return False    # no config file, keep what we have
+        except ValueError as e:
+            logging.warning('Config %s is not valid JSON, keeping the current config: %s', self.config_file, e)
+            return False
+        errors = GameConfig.validate(data)
+        if errors:
+            logging.warning('Config %s is invalid, keeping the current config: %s', self.config_file, '; '.join(errors))
+            return False
+        if data == self.data:
+            return False
+        self.data = data
+        self.__compile()
+        self.changed_event.fire(self)
+        return True
+
+    def check_for_changes(self):
+        """
+        Reload the config if its file changed since it was last read, only costs a stat call otherwise
+        :return: True if a new config was applied
+        """
+        if self.__get_file_state() == self.__file_state:
+            return False
+        return self.reload()
+
+    def __get_file_state(self):
+        try:
+            stat = os.stat(self.config_file)
+        except OSError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    @staticmethod
+    def validate(data):
+        """
+        Check config content against the config schema, unknown sections and keys are allowed
+        :param data: parsed json
+        :return: list of error messages, empty if the content is valid
+        """
+        errors = []
+
+        def check_section(name, value, fields):
+            if not isinstance(value, dict):
+                errors.append('"{}" must be an object'.format(name))
+                return
+            for key, check, description in fields:
+                if key in value and not check(value[key]):
+                    errors.append('"{}.{}" must be {}'.format(name, key, description))
+
+        def is_positive_int(value):
+            return isinstance(value, int) and not isinstance(value, bool) and value > 0
+
+        def is_key_list(value):
+            return isinstance(value, list) and all(isinstance(key, (str, int)) and not isinstance(key, bool)
+                                                   for key in value)
+
+        def is_color(value):
+            return isinstance(value, str)
+
+        color_fields = [("foreground", is_color, "a color string"), ("background", is_color, "a color string")]
+        if not isinstance(data, dict):
+            return ['config must be an object']
+        if "controls" in data:
+            check_section("controls", data["controls"],
+                          [(name, is_key_list, "a list of keys") for name in ("up", "down", "left", "right")])
+        if "dimensions" in data:
+            check_section("dimensions", data["dimensions"], [("cellSize", is_positive_int, "a positive integer"),
+                                                             ("cellPadding", is_positive_int, "a positive integer")])
+        if "font" in data:
+            check_section("font", data["font"], [("face", lambda value: isinstance(value, str), "a string"),
+                                                 ("size", is_positive_int, "a positive integer")])
+        if "rendering" in data:
+            check_section("rendering", data["rendering"],
+                          [("mode", lambda value: value in ("canvas", "widget"), '"canvas" or "widget"')])
+        if "input" in data:
+            check_section("input", data["input"], [("queueDepth", is_positive_int, "a positive integer"),
+                                                   ("fullPolicy", lambda value: value in ("flush", "ignore"),
+                                                    '"flush" or "ignore"')])
+        if "metrics" in data:
+            check_section("metrics", data["metrics"], [("file", lambda value: isinstance(value, str), "a string"),
+                                                       ("format", lambda value: value in ("prometheus", "json"),
+                                                        '"prometheus" or "json"'),
+                                                       ("intervalMs", is_positive_int, "a positive integer")])
+        if "colors" in data:
+            colors = data["colors"]
+            check_section("colors", colors, [])
+            if isinstance(colors, dict):
+                if "board" in colors:
+                    check_section("colors.board", colors["board"], color_fields)
+                if "tiles" in colors:
+                    tiles = colors["tiles"]
+                    check_section("colors.tiles", tiles, [])
+                    if isinstance(tiles, dict):
+                        for value, tile_colors in tiles.items():
+                            check_section("colors.tiles.{}".format(value), tile_colors, color_fields)
+        return errors
+
+    def __compile(self):
+        """
+        Resolve every setting against the defaults once, getters only return the results
+        :return: None
+        """
+        data = self.data
+        dimensions = data.get("dimensions", {})
+        self.__cell_size = dimensions.get("cellSize", 0) or self.__defaults["dimensions"]["cellSize"]
+        self.__cell_padding = dimensions.get("cellPadding", 0) or self.__defaults["dimensions"]["cellPadding"]
+
+        board_config = data.get("colors", {}).get("board", {})
+        self.__board_colors = (board_config.get("foreground", '') or self.__defaults["colors"]["board"]["foreground"],
+                               board_config.get("background", '') or self.__defaults["colors"]["board"]["background"])
+
+        font = data.get("font", {})
+        self.__label_font = (font.get("face", '') or self.__defaults["font"]["face"],
+                             font.get("size", 0) or self.__defaults["font"]["size"])
+
+        mode = data.get("rendering", {}).get("mode", '')
+        self.__render_mode = mode if mode in ("canvas", "widget") else self.__defaults["rendering"]["mode"]
+
+        input_config = data.get("input", {})
+        self.__input_queue_depth = input_config.get("queueDepth", 0) or self.__defaults["input"]["queueDepth"]
+        policy = input_config.get("fullPolicy", '')
+        self.__input_full_policy = policy if policy in ("flush", "ignore") else self.__defaults["input"]["fullPolicy"]
+
+        metrics = data.get("metrics", {})
+        self.__metrics_file = metrics.get("file", '') or None
+        metrics_format = metrics.get("format", '')
+        self.__metrics_format = metrics_format if metrics_format in ("prometheus", "json") else \
+            self.__defaults["metrics"]["format"]
+        self.__metrics_interval_ms = metrics.get("intervalMs", 0) or self.__defaults["metrics"]["intervalMs"]
+
+        self.__keys = {direction: list(self.__get_keys_for(direction)) for direction in ("up", "down", "left", "right")}
+        key_map = {}
+        for direction in Directions:    # a key bound to several directions keeps the first one, like the old checks
+            for key in self.__keys[direction.name.lower()]:
+                key_map.setdefault(str(key), direction)
+        self.__key_map = MappingProxyType(key_map)
+
+        self.__tile_colors = {}     # tile value -> colors, filled on first use of a value
 
     def get_up_keys(self):
         """
         Get key codes that defined as move up
         :return: array of keycodes
         """
-        return self.__get_keys_for("up")
+        return list(self.__keys["up"])
 
     def get_down_keys(self):
         """
         Get key codes that defined as move down
         :return: array of keycodes
         """
-        return self.__get_keys_for("down")
+        return list(self.__keys["down"])
 
     def get_left_keys(self):
         """
         Get key codes that defined as move left
         :return: array of keycodes
         """
-        return self.__get_keys_for("left")
+        return list(self.__keys["left"])
 
     def get_right_keys(self):
         """
         Get key codes that defined as move right
         :return: array of keycodes
         """
-        return self.__get_keys_for("right")
+        return list(self.__keys["right"])
+
+    def get_key_map(self):
+        """
+        Get the direction of every bound key
+        :return: read-only mapping of keysym string to Directions
+        """
+        return self.__key_map
+
+    def get_direction(self, keysym):
+        """
+        Get the direction a key is bound to
+        :param keysym: Tk keysym of the key
+        :return: Directions, or None if the key is not bound
+        """
+        return self.__key_map.get(keysym)
 
     def get_cell_size(self):
         """
         Get cell size in pixels
         :return: cell size in pixels
         """
-        return self.data.get("dimensions", {}).get("cellSize", 0) or self.__defaults["dimensions"]["cellSize"]
+        return self.__cell_size
 
     def get_cell_padding(self):
         """
         Get cell padding pixels
         :return: cell padding in pixels
         """
-        return self.data.get("dimensions", {}).get("cellPadding", 0) or self.__defaults["dimensions"]["cellPadding"]
+        return self.__cell_padding
 
     def get_board_colors(self):
         """
         Get board's foreground and background colors
         :return: Tuple of hex color string (foreground, background)
         """
-        board_config = self.data.get("colors", {}).get("board", {})
-        config_fg = board_config.get("foreground", '')
-        config_bg = board_config.get("background", '')
-
-        return config_fg or self.__defaults["colors"]["board"]["foreground"], config_bg or \
-               self.__defaults["colors"]["board"]["background"]
+        return self.__board_colors
 
     def get_label_font(self):
         """
         Get cell label font
         :return: Tuple of font attribute (face, size)
         """
-        font_face = self.data.get("font", {}).get("face", '')
-        font_size = self.data.get("font", {}).get("size", 0)
-        return font_face or self.__defaults["font"]["face"], font_size or self.__defaults["font"]["size"]
+        return self.__label_font
+
+    def get_render_mode(self):
+        """
+        Get how tiles are drawn, "canvas" for pooled canvas items or "widget" for a Frame and Label per tile
+        :return: render mode name
+        """
+        return self.__render_mode
+
+    def get_input_queue_depth(self):
+        """
+        Get how many moves the game may run ahead of the animating board, they are rendered as one animation
+        :return: queue depth
+        """
+        return self.__input_queue_depth
+
+    def get_input_full_policy(self):
+        """
+        Get what a key press does when the input queue is full: "flush" renders the queued moves at once without their
+        animation and applies it, "ignore" ignores it
+        :return: full queue policy name
+        """
+        return self.__input_full_policy
+
+    def get_metrics_file(self):
+        """
+        Get the file game metrics are dumped to
+        :return: file name, None if metrics are disabled
+        """
+        return self.__metrics_file
+
+    def get_metrics_format(self):
+        """
+        Get the format of the metrics file, "prometheus" for the Prometheus text format or "json"
+        :return: format name
+        """
+        return self.__metrics_format
+
+    def get_metrics_interval_ms(self):
+        """
+        Get the time between two dumps of the metrics file
+        :return: interval in milliseconds
+        """
+        return self.__metrics_interval_ms
 
     def get_tile_colors(self, tile_value):
         """
         Get tile's foreground and background colors
         :return: Tuple of hex color string (foreground, background)
         """
-        tiles_config = self.data.get("colors", {}).get("tiles", {}).get(str(tile_value), {})
-        config_fg = tiles_config.get("foreground", '')
-        config_bg = tiles_config.get("background", '')
-        return config_fg or self.__defaults["colors"]["tiles"]["undefined"]["foreground"], config_bg or \
-               self.__defaults["colors"]["tiles"]["undefined"]["background"]
+        colors = self.__tile_colors.get(tile_value)
+        if colors is None:
+            tiles_config = self.data.get("colors", {}).get("tiles", {}).get(str(tile_value), {})
+            config_fg = tiles_config.get("foreground", '')
+            config_bg = tiles_config.get("background", '')
+            colors = self.__tile_colors[tile_value] = \
+                (config_fg or self.__defaults["colors"]["tiles"]["undefined"]["foreground"],
+                 config_bg or self.__defaults["colors"]["tiles"]["undefined"]["background"])
+        return colors
 
     def __get_keys_for(self, direction):
         return self.data.get("controls", {}).get(direction, []) or self.__defaults["controls"][direction]
@@ -0,0 +1,175 @@
+#!/usr/bin/env python
+# coding: UTF-8
+# author: Sylphia
+# created:  21:30
+import random
+from array import array
+
+from models import bitboard
+from models.directions import Directions
+from models.lines import LineMover, build_lines
+
+
+class BatchSimulator(object):
+    """
+    Headless runner that steps many games in lockstep.
+
+    Games follow the rules of ``models.game.Game`` (two 2/4 tiles on a new game, a 2 after every move that changed the
+    board, the game ends when the target is merged or nothing can move) but no events are sent and no per-tile objects
+    are allocated. Boards are kept as tile exponents (0 for empty, 1 for 2, 2 for 4 ...), 4x4 boards are moved with
+    ``models.bitboard``.
+    """
+
+    def __init__(self, count, size=4, target=2048, seed=None, use_bitboard=None, cache_size=1 << 18):
+        """
+        Create a batch of games and start them
+        :param count: number of games
+        :param size: the size of the square boards
+        :param target: the target tile value to win a game
+        :param seed: seed for the spawn random generator, None for a random seed
+        :param use_bitboard: move with the bitboard engine, None to enable it whenever the boards are 4x4
+        :param cache_size: maximal number of memoized line moves of boards moved without the bitboard engine
+        """
+        self.count = count
+        self.size = size
+        self.target = target
+        self.random = random.Random(seed)
+
+        self.scores = array('Q', [0]) * count
+        self.move_counts = array('L', [0]) * count
+        self.game_over = bytearray(count)
+        self.won = bytearray(count)
+
+        self.__target_exponent = target.bit_length() - 1 if target > 1 and not target & (target - 1) else None
+        if use_bitboard is None:
+            use_bitboard = size == bitboard.SIZE and target <= 1 << bitboard.MAX_EXPONENT
+        self.__use_bitboard = use_bitboard
+        self.__packed = [0] * count if self.__use_bitboard else None
+        self.__cells = None if self.__use_bitboard else [bytearray(size * size) for _ in range(count)]
+        self.__lines = build_lines(size)
+        self.__line_mover = LineMover(cache_size)
+
+        for index in range(count):
+            self.__spawn(index, 2, (1, 2))
+
+    def __move_cells(self, cells, direction):
+        """
+        Move a flat exponent board in place
+        :return: Tuple of (moved, score gained, highest merged exponent)
+        """
+        moved, merged = self.__line_mover.move_cells(cells, self.__lines[direction])
+        if not merged:
+            return moved, 0, 0
+        return moved, sum([1 << exponent for exponent in merged]), max(merged)
+
+    def __can_move_cells(self, cells):
+        size = self.size
+        if 0 in cells:
+            return True
+        for x in range(size):
+            for y in range(size):
+                value = cells[x * size + y]
+                if x + 1 < size and cells[(x + 1) * size + y] == value:
+                    return True
+                if y + 1 < size and cells[x * size + y + 1] == value:
+                    return True
+        return False
+
+    def __spawn(self, index, count, exponents):
+        if self.__use_bitboard:
+            board = self.__packed[index]
+            empty_cells = bitboard.empty_cells(board)
+            for _ in range(min(count, len(empty_cells))):
+                x, y = empty_cells.pop(self.random.randrange(len(empty_cells)))
+                board = bitboard.set_exponent(board, x, y, self.random.choice(exponents))
+            self.__packed[index] = board
+            return
+        cells = self.__cells[index]
+        empty_cells = [i for i, value in enumerate(cells) if not value]
+        for _ in range(min(count, len(empty_cells))):
+            cell = empty_cells.pop(self.random.randrange(len(empty_cells)))
+            cells[cell] = self.random.choice(exponents)
+
+    def __step_game(self, index, direction):
+        if self.__use_bitboard:
+            board = self.__packed[index]
+            new_board, score = bitboard.MOVES[direction](board)
+            if new_board == board:
+                return
+            self.__packed[index] = new_board
+            won = bool(score) and self.__target_exponent is not None and \
+                bitboard.max_exponent(new_board) >= self.__target_exponent
+        else:
+            moved, score, highest = self.__move_cells(self.__cells[index], direction)
+            if not moved:
+                return
+            won = self.__target_exponent is not None and highest == self.__target_exponent
+        self.scores[index] += score
+        self.move_counts[index] += 1
+        self.__spawn(index, 1, (1,))
+        if won:
+            self.game_over[index] = 1
+            self.won[index] = 1
+        elif not self.__can_move(index):
+            self.game_over[index] = 1
+
+    def __can_move(self, index):
+        if not self.__use_bitboard:
+            return self.__can_move_cells(self.__cells[index])
+        board = self.__packed[index]
+        if bitboard.count_empty(board):
+            return True
+        return any(move(board)[0] != board for move in bitboard.MOVES.values())
+
+    def step(self, directions):
+        """
+        Move every game that is not over yet
+        :param directions: one direction for all games, or a sequence with one direction per game
+        :return: number of games still running
+        """
+        if isinstance(directions, Directions):
+            directions = [directions] * self.count
+        game_over = self.game_over
+        for index in range(self.count):
+            if not game_over[index]:
+                self.__step_game(index, directions[index])
+        return self.count - sum(game_over)
+
+    def run(self, moves):
+        """
+        Step all games through a list of moves, stops early when every game is over
+        :param moves: iterable of directions (or per game direction sequences), one entry per step
+        :return: self
+        """
+        for directions in moves:
+            if not self.step(directions):
+                break
+        return self
+
+    def get_boards(self):
+        """
+        Get all boards as tile exponents
+        :return: array of count * size * size exponents, cell (x, y) of game i is at i * size * size + x * size + y
+        """
+        boards = array('B')
+        if not self.__use_bitboard:
+            for cells in self.__cells:
+                boards.frombytes(cells)
+            return boards
+        for board in self.__packed:
+            for x in range(bitboard.SIZE):
+                for y in range(bitboard.SIZE):
+                    boards.append(bitboard.get_exponent(board, x, y))
+        return boards
+
+    def get_matrix(self, index):
+        """
+        Get a board in Game.matrix layout
+        :param index: game index
+        :return: matrix[x][y] of tile values
+        """
+        if self.__use_bitboard:
+            return bitboard.to_matrix(self.__packed[index])
+        cells = self.__cells[index]
+        size = self.size
+        return [[1 << cells[x * size + y] if cells[x * size + y] else 0 for y in range(size)] for x in range(size)]
@@ -0,0 +1,301 @@
+#!/usr/bin/env python
+# coding: UTF-8
+# author: Sylphia
+# created:  20:12
+"""
+Bitboard move engine for 4x4 games.
+
+The board is packed into a single 64-bit integer of 4-bit log2 exponents (0 for an empty cell, 1 for 2, 2 for 4 ...).
+Cell (x, y) of ``Game.matrix`` lives at nibble ``4 * y + x``, so each 16-bit word holds one row of the board.
+
+Every possible row is moved once at import time and stored in 65,536-entry lookup tables, a move is then four table
+lookups (plus a transpose for vertical moves). Exponents are capped at 15 (32768), two 32768 tiles are never merged.
+"""
+import os
+import zlib
+from array import array
+
+from models import lines
+from models.directions import Directions
+
+SIZE = 4
+MAX_EXPONENT = 15
+
+_ROW_MASK = 0xFFFF
+
+
+def _build_tables():
+    """
+    Move every possible row towards nibble 0 once with models.lines.move_line. Each row fills its entry of the left and
+    up tables and the entry of its mirrored row in the right and down tables, so every table comes out of a single pass
+    """
+    row_left = [0] * 65536
+    row_right = [0] * 65536
+    col_up = [0] * 65536
+    col_down = [0] * 65536
+    score_left = [0] * 65536
+    score_right = [0] * 65536
+    exponents = range(16)
+    max_exponent = MAX_EXPONENT
+    move_line = lines.move_line
+    row = 0
+    for d in exponents:
+        for c in exponents:
+            for b in exponents:
+                for a in exponents:
+                    result, merged = move_line((a, b, c, d), max_exponent)
+                    left = right = up = down = 0
+                    for i, exponent in enumerate(result):
+                        if exponent:
+                            left |= exponent << (4 * i)
+                            right |= exponent << (12 - 4 * i)
+                            up |= exponent << (16 * i)
+                            down |= exponent << (48 - 16 * i)
+                    mirrored = a << 12 | b << 8 | c << 4 | d
+                    score = sum([1 << exponent for exponent in merged])
+                    row_left[row] = left
+                    col_up[row] = up
+                    score_left[row] = score
+                    row_right[mirrored] = right
+                    col_down[mirrored] = down
+                    score_right[mirrored] = score
+                    row += 1
+    return row_left, row_right, col_up, col_down, score_left, score_right
+
+
+_TABLE_TYPES = 'HHQQII'    # array type codes of the tables in the order _build_tables returns them
+
+
+def _tables_path():
+    """
+    Get the cache file of the move tables. Its name carries a checksum of everything the tables depend on: the source
+    of this module and of models.lines, the board size, the exponent cap and the layout of the file
+    :return: path of the cache file, None if the sources can't be read
+    """
+    layout = (SIZE, MAX_EXPONENT, _TABLE_TYPES, [array(type_code).itemsize for type_code in _TABLE_TYPES])
+    checksum = zlib.crc32(repr(layout).encode())
+    try:
+        for module_file in (__file__, lines.__file__):
+            with open(module_file, 'rb') as f:
+                checksum = zlib.crc32(f.read(), checksum)
+    except OSError:
+        return None
+    return os.path.join(os.path.dirname(os.path.abspath(__file__)), '__pycache__',
+                        'bitboard-{:08x}.tables'.format(checksum))
+
+
+def _remove_stale_tables(path):
+    """
+    Delete the cache files of other versions of the tables
+    :param path: the cache file to keep
+    """
+    directory, name = os.path.split(path)
+    for other in os.listdir(directory):
+        if other.startswith('bitboard-') and other.endswith('.tables') and other != name:
+            try:
+                os.remove(os.path.join(directory, other))
+            except OSError:
+                pass    # removed by another process starting at the same time
+
+
+def _load_tables():
+    """
+    Get the move tables from the cache file next to the compiled module, building and caching them on a miss.
+    Changed rules never load stale tables (see _tables_path), a file of the wrong length is built again and the files
+    of older versions are deleted.
+    Loading takes a few milliseconds instead of building for a few hundred, which headless worker processes pay on
+    every start.
+    """
+    path = _tables_path()
+    if path is None:
+        return _build_tables()
+    try:
+        with open(path, 'rb') as f:
+            data = f.read()
+        if len(data) == 65536 * sum([array(type_code).itemsize for type_code in _TABLE_TYPES]):
+            tables = []
+            offset = 0
+            for type_code in _TABLE_TYPES:
+                table = array(type_code)
+                end = offset + 65536 * table.itemsize
+                table.frombytes(data[offset:end])
+                tables.append(table.tolist())
+                offset = end
+            if all(len(table) == 65536 for table in tables):
+                return tables
+    except (OSError, ValueError):
+        pass
+    tables = _build_tables()
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        temp_path = '{}.{}'.format(path, os.getpid())
+        with open(temp_path, 'wb') as f:
+            for type_code, table in zip(_TABLE_TYPES, tables):
+                array(type_code, table).tofile(f)
+        os.replace(temp_path, path)     # atomic, processes starting at the same time never read a partial file
+        _remove_stale_tables(path)
+    except (OSError, OverflowError):
+        pass    # read-only install, build again next time
+    return tables
+
+
+_row_left, _row_right, _col_up, _col_down, _score_left, _score_right = _load_tables()
+
+
+def transpose(board):
+    """
+    Swap cell (x, y) with cell (y, x)
+    :param board: packed board
+    :return: transposed packed board
+    """
+    a1 = board & 0xF0F00F0FF0F00F0F
+    a2 = board & 0x0000F0F00000F0F0
+    a3 = board & 0x0F0F00000F0F0000
+    a = a1 | (a2 << 12) | (a3 >> 12)
+    b1 = a & 0xFF00FF0000FF00FF
+    b2 = a & 0x00FF00FF00000000
+    b3 = a & 0x00000000FF00FF00
+    return b1 | (b2 >> 24) | (b3 << 24)
+
+
+def from_matrix(matrix):
+    """
+    Pack a 4x4 ``Game.matrix`` into a bitboard
+    :param matrix: list of columns, matrix[x][y] is the tile value or 0
+    :return: packed board
+    """
+    board = 0
+    for x in range(SIZE):
+        column = matrix[x]
+        for y in range(SIZE):
+            value = column[y]
+            if value:
+                board |= (value.bit_length() - 1) << (4 * (SIZE * y + x))
+    return board
+
+
+def to_matrix(board):
+    """
+    Unpack a bitboard into a ``Game.matrix`` compatible list of columns
+    :param board: packed board
+    :return: matrix[x][y] of tile values
+    """
+    matrix = [[0] * SIZE for _ in range(SIZE)]
+    for y in range(SIZE):
+        for x in range(SIZE):
+            exponent = (board >> (4 * (SIZE * y + x))) & 0xF
+            if exponent:
+                matrix[x][y] = 1 << exponent
+    return matrix
+
+
+def get_exponent(board, x, y):
+    return (board >> (4 * (SIZE * y + x))) & 0xF
+
+
+def set_exponent(board, x, y, exponent):
+    shift = 4 * (SIZE * y + x)
+    return (board & ~(0xF << shift)) | (exponent << shift)
+
+
+def count_empty(board):
+    """
+    Count empty cells of a packed board
+    :param board: packed board
+    :return: number of empty cells
+    """
+    board |= (board >> 2) & 0x3333333333333333
+    board |= board >> 1
+    return (~board & 0x1111111111111111).bit_count()
+
+
+def empty_cells(board):
+    """
+    List empty cells of a packed board in the same order as the matrix scan in ``Game``
+    :param board: packed board
+    :return: list of (x, y)
+    """
+    return [(x, y) for x in range(SIZE) for y in range(SIZE) if not (board >> (4 * (SIZE * y + x))) & 0xF]
+
+
+def max_exponent(board):
+    result = 0
+    while board:
+        result = max(result, board & 0xF)
+        board >>= 4
+    return result
+
+
+def count_exponent(board, exponent):
+    count = 0
+    while board:
+        if board & 0xF == exponent:
+            count += 1
+        board >>= 4
+    return count
+
+
+def move_left(board):
+    return (_row_left[board & _ROW_MASK] |
+            _row_left[(board >> 16) & _ROW_MASK] << 16 |
+            _row_left[(board >> 32) & _ROW_MASK] << 32 |
+            _row_left[(board >> 48) & _ROW_MASK] << 48), \
+           (_score_left[board & _ROW_MASK] +
+            _score_left[(board >> 16) & _ROW_MASK] +
+            _score_left[(board >> 32) & _ROW_MASK] +
+            _score_left[(board >> 48) & _ROW_MASK])
+
+
+def move_right(board):
+    return (_row_right[board & _ROW_MASK] |
+            _row_right[(board >> 16) & _ROW_MASK] << 16 |
+            _row_right[(board >> 32) & _ROW_MASK] << 32 |
+            _row_right[(board >> 48) & _ROW_MASK] << 48), \
+           (_score_right[board & _ROW_MASK] +
+            _score_right[(board >> 16) & _ROW_MASK] +
+            _score_right[(board >> 32) & _ROW_MASK] +
+            _score_right[(board >> 48) & _ROW_MASK])
+
+
+def move_up(board):
+    a = (board & 0xF0F00F0FF0F00F0F) | (board & 0x0000F0F00000F0F0) << 12 | (board & 0x0F0F00000F0F0000) >> 12
+    t = (a & 0xFF00FF0000FF00FF) | (a & 0x00FF00FF00000000) >> 24 | (a & 0x00000000FF00FF00) << 24  # transpose
+    return (_col_up[t & _ROW_MASK] |
+            _col_up[(t >> 16) & _ROW_MASK] << 4 |
+            _col_up[(t >> 32) & _ROW_MASK] << 8 |
+            _col_up[(t >> 48) & _ROW_MASK] << 12), \
+           (_score_left[t & _ROW_MASK] +
+            _score_left[(t >> 16) & _ROW_MASK] +
+            _score_left[(t >> 32) & _ROW_MASK] +
+            _score_left[(t >> 48) & _ROW_MASK])
+
+
+def move_down(board):
+    a = (board & 0xF0F00F0FF0F00F0F) | (board & 0x0000F0F00000F0F0) << 12 | (board & 0x0F0F00000F0F0000) >> 12
+    t = (a & 0xFF00FF0000FF00FF) | (a & 0x00FF00FF00000000) >> 24 | (a & 0x00000000FF00FF00) << 24  # transpose
+    return (_col_down[t & _ROW_MASK] |
+            _col_down[(t >> 16) & _ROW_MASK] << 4 |
+            _col_down[(t >> 32) & _ROW_MASK] << 8 |
+            _col_down[(t >> 48) & _ROW_MASK] << 12), \
+           (_score_right[t & _ROW_MASK] +
+            _score_right[(t >> 16) & _ROW_MASK] +
+            _score_right[(t >> 32) & _ROW_MASK] +
+            _score_right[(t >> 48) & _ROW_MASK])
+
+
+MOVES = {
+    Directions.Up: move_up,
+    Directions.Down: move_down,
+    Directions.Left: move_left,
+    Directions.Right: move_right,
+}
+
+
+def move(board, direction: Directions):
+    """
+    Move a packed board
+    :param board: packed board
+    :param direction: move direction
+    :return: Tuple of (new board, score gained), the board is unchanged if nothing can move
+    """
+    return MOVES[direction](board)
@@ -0,0 +1,114 @@
+#!/usr/bin/env python
+# coding: UTF-8
+# author: Sylphia
+# created:  13:20
+
+
+class CellIndex(object):
+    """
+    Set of cells of a square board, ordered like a scan of Game.matrix (x first, then y).
+
+    Backed by a Fenwick tree, add, remove and picking the n-th cell are O(log(size * size)). Keeping the scan order means
+    the cell a spawn picks only depends on the board and the random number, not on the order the cells were emptied in,
+    so every move engine spawns the same tiles for the same seed.
+    """
+
+    def __init__(self, size, cells=()):
+        """
+        Create an index
+        :param size: board size
+        :param cells: iterable of (x, y) cells to start with
+        """
+        self.size = size
+        self.__capacity = size * size
+        self.__present = bytearray(self.__capacity)
+        self.__count = 0
+        self.__tree = None
+        self.__top = 1 << (self.__capacity.bit_length() - 1) if self.__capacity else 0
+        for x, y in cells:
+            self.__present[x * size + y] = 1
+        self.__rebuild()
+
+    def __rebuild(self):
+        tree = [0] * (self.__capacity + 1)
+        for i, present in enumerate(self.__present, 1):
+            tree[i] += present
+            parent = i + (i & -i)
+            if parent <= self.__capacity:
+                tree[parent] += tree[i]
+        self.__tree = tree
+        self.__count = sum(self.__present)
+
+    def __update(self, slot, delta):
+        tree = self.__tree
+        i = slot + 1
+        while i <= self.__capacity:
+            tree[i] += delta
+            i += i & -i
+        self.__count += delta
+
+    def add(self, cell):
+        slot = cell[0] * self.size + cell[1]
+        if self.__present[slot]:
+            return
+        self.__present[slot] = 1
+        self.__update(slot, 1)
+
+    def remove(self, cell):
+        slot = cell[0] * self.size + cell[1]
+        if not self.__present[slot]:
+            raise KeyError(cell)
+        self.__present[slot] = 0
+        self.__update(slot, -1)
+
+    def discard(self, cell):
+        if cell in self:
+            self.remove(cell)
+
+    def pop_at(self, index):
+        """
+        Remove the cell at a position of the scan order
+        :param index: 0 <= index < len(self)
+        :return: the removed cell
+        """
+        if not 0 <= index < self.__count:
+            raise IndexError(index)
+        tree = self.__tree
+        slot = 0
+        remaining = index + 1
+        step = self.__top
+        while step:
+            following = slot + step
+            if following <= self.__capacity and tree[following] < remaining:
+                slot = following
+                remaining -= tree[following]
+            step >>= 1
+        cell = divmod(slot, self.size)
+        self.__present[slot] = 0
+        self.__update(slot, -1)
+        return cell
+
+    def rank(self, cell):
+        """
+        Get the position a cell has, or would have, in the scan order
+        :param cell: (x, y)
+        :return: number of cells before it
+        """
+        tree = self.__tree
+        i = cell[0] * self.size + cell[1]
+        count = 0
+        while i > 0:
+            count += tree[i]
+            i -= i & -i
+        return count
+
+    def __len__(self):
+        return self.__count
+
+    def __contains__(self, cell):
+        x, y = cell
+        return 0 <= x < self.size and 0 <= y < self.size and bool(self.__present[x * self.size + y])
+
+    def __iter__(self):
+        size = self.size
+        return iter([divmod(slot, size) for slot, present in enumerate(self.__present) if present])
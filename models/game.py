@@ -4,11 +4,21 @@
 # created:  14:28
 import logging
 import random
-from copy import deepcopy
+from collections import deque, namedtuple
+from time import perf_counter_ns
 
 from common.multicast_delegate import MulticastDelegate
+from models import bitboard
+from models.cell_index import CellIndex
 from models.directions import Directions
-from models.tile_event import TileSpawnEvent, TileMoveAndMergeEvent, TileMoveEvent
+from models.metrics import GameMetrics
+from models.random_stream import RandomStream
+from models.tile_event import TileEventBuffer, TileEventTypes, create_tile_event
+
+# Undo history entries. tiles holds (x, y, dest_x, dest_y, merged value or 0) in move order, spawns holds (x, y, value)
+MoveDelta = namedtuple('MoveDelta', ['score', 'tiles', 'spawns'])
+# Undo history entry of a bitboard move, the packed boards before the move and after the spawn
+BoardDelta = namedtuple('BoardDelta', ['score', 'before', 'after'])
 
 
 class Game(object):
@@ -19,61 +29,255 @@ class Game(object):
         Directions.Right: (1, 0),
     }
 
-    def __init__(self, size=4, target=2048):
+    def __init__(self, size=4, target=2048, use_bitboard=None, history_depth=1000, seed=None, rng=None,
+                 bulk_random=False):
         """
         Initialize a game
         :param size: the size of the square board
         :param target: the target tile value to win a game
+        :param use_bitboard: move with the bitboard engine while nobody listens to tile_event or tile_batch_event,
+                             None to enable it whenever the board is 4x4
+        :param history_depth: maximal number of moves that can be undone, None for unlimited
+        :param seed: seed of the spawn random generator, None to draw one from the random module.
+                     A seed and the list of moves fully determine a game
+        :param rng: random generator to use instead of a seeded one, needs randrange and choice, and seed for
+                    new_game to restart it
+        :param bulk_random: pre-generate random numbers in chunks (RandomStream) instead of using random.Random
         """
         self.tile_event = MulticastDelegate(None)   # Tile state change event (Movement, Creation, Merge)
-        self.score_event = MulticastDelegate(None)  # Score change event
+        # All tile changes of a move (or new game) at once as a TileEventBuffer, only valid during the call.
+        # tile_event is batched the same way, per-tile handlers are called in order once the move is done and
+        # tile_event.add_batch_handler receives the whole list of events
+        self.tile_batch_event = MulticastDelegate(None)
+        self.score_event = MulticastDelegate(None, coalesce=True)   # Score change event, once per move
         self.game_over_event = MulticastDelegate(None)  # Game over event, True for won, False for lost
         self.move_complete_event = MulticastDelegate(None)  # Fully completed a move, matrix is the final state
         self.undo_event = MulticastDelegate(None)   # Undo triggered event
+        self.redo_event = MulticastDelegate(None)   # Redo triggered event
 
         self.size = size
         self.target = target
+        self.history_depth = history_depth
+        self.seed = seed if seed is not None else random.getrandbits(63)
+        self.random = rng or (RandomStream(self.seed) if bulk_random else random.Random(self.seed))
+        if use_bitboard is None:
+            use_bitboard = size == bitboard.SIZE and target <= 1 << bitboard.MAX_EXPONENT
+        self.use_bitboard = use_bitboard
+        # exponent of the target tile on a bitboard, None if the target can never be reached by merging
+        self.__target_exponent = target.bit_length() - 1 if target > 1 and not target & (target - 1) else None
 
-        self.matrix = None
-        self.empty_cell_count = 0
+        self.matrix = None  # matrix[x][y] of tile values, replace it with load, the game keeps derived state of it
+        self.empty_cells = None     # index of empty cells, kept up to date by every change of the matrix
+        self.__packed = None    # the matrix as a bitboard after a bitboard move, None once a cell changes otherwise
+        self.__tile_buffer = TileEventBuffer()
+        self.__tile_batch = None    # __tile_buffer while a move collects events for tile_batch_event
         self.score = 0
         self.undo_history = None
+        self.redo_history = None
         self.game_over = False
+        self.metrics = None     # GameMetrics while enabled, see enable_metrics
 
         self.__clear_game_states()
         pass
 
+    def enable_metrics(self, metrics: GameMetrics = None):
+        """
+        Start timing moves, spawns, game over checks and event delivery. Until then the game pays no timing cost
+        :param metrics: GameMetrics to record into, e.g. one shared by several games, None for a new one
+        :return: the GameMetrics
+        """
+        self.metrics = metrics or GameMetrics()
+        self.move = self.__timed_move   # shadows the method, the untimed path stays free of checks
+        return self.metrics
+
+    def disable_metrics(self):
+        """
+        Stop recording metrics
+        :return: the GameMetrics recorded so far, or None
+        """
+        metrics, self.metrics = self.metrics, None
+        self.__dict__.pop('move', None)
+        return metrics
+
+    def __timed_move(self, direction: Directions):
+        metrics = self.metrics
+        moves = metrics.moves
+        start = perf_counter_ns()
+        type(self).move(self, direction)
+        metrics.timers['move'].add(perf_counter_ns() - start)
+        if metrics.moves == moves:
+            metrics.noop_moves += 1
+
+    @property
+    def empty_cell_count(self):
+        return len(self.empty_cells)
+
     def __clear_game_states(self):
         self.matrix = [[0 for _ in range(self.size)] for __ in range(self.size)]
-        self.empty_cell_count = self.size * self.size
+        self.__rebuild_cell_states()
         self.score = 0
-        self.undo_history = []
+        self.undo_history = deque(maxlen=self.history_depth)
+        self.redo_history = []
         self.game_over = False
 
+    def __rebuild_cell_states(self):
+        """
+        Rebuild the empty cell index from the matrix
+        :return: None
+        """
+        self.empty_cells = CellIndex(self.size, ((i, j) for i in range(self.size) for j in range(self.size)
+                                                 if not self.matrix[i][j]))
+        self.__packed = None
+
+    def __set_cell(self, x, y, value):
+        """
+        Change a cell and keep the empty cell index up to date
+        """
+        self.__packed = None
+        self.matrix[x][y] = value
+        if value:
+            self.empty_cells.discard((x, y))
+        else:
+            self.empty_cells.add((x, y))
+
+    def legal_moves(self):
+        """
+        Get the directions that would change the board. Computed on demand, 4x4 games look them up in the bitboard
+        row tables
+        :return: set of Directions, empty when the game is over
+        """
+        if self.game_over:
+            return set()
+        if self.use_bitboard:
+            board = self.__packed
+            if board is None:
+                board = bitboard.from_matrix(self.matrix)
+            return {direction for direction, move in bitboard.MOVES.items() if move(board)[0] != board}
+        legal = set()
+        matrix = self.matrix
+        size = self.size
+        for i in range(size):
+            column = matrix[i]
+            for j in range(size):
+                first = column[j]
+                if i + 1 < size:
+                    self.__add_pair_moves(legal, first, matrix[i + 1][j], Directions.Left, Directions.Right)
+                if j + 1 < size:
+                    self.__add_pair_moves(legal, first, column[j + 1], Directions.Up, Directions.Down)
+            if len(legal) == len(Directions):
+                break
+        return legal
+
+    @staticmethod
+    def __add_pair_moves(legal, first, second, towards_first, towards_second):
+        """
+        Add the moves a pair of neighbour cells allows
+        :param first: value of the cell closer to the top left
+        :param second: value of the other cell
+        :param towards_first: direction that moves second onto first
+        :param towards_second: direction that moves first onto second
+        """
+        if second and (not first or first == second):
+            legal.add(towards_first)
+        if first and (not second or first == second):
+            legal.add(towards_second)
+
     def __create_random_tile(self, count, values):
+        """
+        Place tiles on random empty cells
+        :return: list of spawned (x, y, value)
+        """
+        metrics = self.metrics
+        start = perf_counter_ns() if metrics is not None else 0
         count = min(self.empty_cell_count, count)
-        if not count:
-            return
-        empty_cells = []
-        for i in range(self.size):
-            for j in range(self.size):
-                if not self.matrix[i][j]:
-                    empty_cells.append((i, j))
+        spawns = []
         for _ in range(count):
-            empty_index = random.randint(0, len(empty_cells) - 1)
-            x, y = empty_cells.pop(empty_index)
-            value = random.choice(values)
-            self.matrix[x][y] = value
-            self.tile_event(TileSpawnEvent(x, y, value))
-        self.empty_cell_count -= count
+            x, y = self.empty_cells.pop_at(self.random.randrange(len(self.empty_cells)))
+            value = self.random.choice(values)
+            self.__set_cell(x, y, value)
+            spawns.append((x, y, value))
+            self.__notify_tile(TileEventTypes.Spawn, x, y, x, y, value)
+        if metrics is not None:
+            metrics.timers['spawn'].add(perf_counter_ns() - start)
+        return spawns
+
+    def __notify_tile(self, event_type, x, y, dest_x, dest_y, value):
+        if self.__tile_batch is not None:
+            self.__tile_batch.append(event_type.value, x, y, dest_x, dest_y, value)
+        if self.tile_event:
+            self.tile_event.fire(create_tile_event(event_type.value, x, y, dest_x, dest_y, value))
+
+    def __begin_batch(self):
+        """
+        Start collecting the tile and score events of a move
+        """
+        self.tile_event.begin_batch()
+        self.score_event.begin_batch()
+        if self.tile_batch_event:
+            self.__tile_batch = self.__tile_buffer
+            self.__tile_batch.clear()
+
+    def __end_batch(self, deliver=True, record=True):
+        """
+        Deliver the collected events of a move
+        :param deliver: False to drop the packed tile events (nothing moved)
+        :param record: False to return the delivery time instead of recording it, __complete_move records it together
+                       with the move complete event
+        :return: delivery time in ns if not recorded, otherwise 0
+        """
+        metrics = self.metrics
+        start = perf_counter_ns() if metrics is not None else 0
+        batch, self.__tile_batch = self.__tile_batch, None
+        try:
+            self.tile_event.end_batch()
+            if batch and deliver:
+                self.tile_batch_event.fire(batch)
+        finally:    # a raising tile handler must not leave the score events batched for good
+            self.score_event.end_batch()
+        if metrics is None:
+            return 0
+        if not record:
+            return perf_counter_ns() - start
+        metrics.timers['dispatch'].add(perf_counter_ns() - start)
+        return 0
 
-    def new_game(self):
+    def new_game(self, seed=None):
         """
         Start a new game, clears old score and tiles, place two random tile of 2 or 4 on board
+        :param seed: restart the random generator from this seed, None to continue the current sequence. Ignored if an
+                     injected rng has no seed method
         :return:
         """
+        if seed is not None and hasattr(self.random, 'seed'):
+            self.seed = seed
+            self.random.seed(seed)
         self.__clear_game_states()
-        self.__create_random_tile(2, [2, 4])
+        self.__begin_batch()
+        try:
+            self.__create_random_tile(2, [2, 4])
+        finally:
+            self.__end_batch()
+
+    def load(self, matrix, score=0):
+        """
+        Replace the board with a given state, clears the undo history. A tile above the largest bitboard tile switches
+        the game to the vector engine for good
+        :param matrix: matrix[x][y] of tile values, 0 for empty cells, copied
+        :param score: the score of the state
+        :return: None
+        """
+        highest = 0
+        for column in matrix:
+            for value in column:
+                if value and (value < 2 or value & (value - 1)):
+                    raise ValueError("Tile value {} is not a power of two".format(value))
+                highest = max(highest, value)
+        if highest > 1 << bitboard.MAX_EXPONENT:
+            self.use_bitboard = False
+        self.__clear_game_states()
+        self.matrix = [list(column) for column in matrix]
+        self.__rebuild_cell_states()
+        self.score = score
 
     def undo(self):
         """
@@ -84,14 +288,74 @@ class Game(object):
             return
         if not self.undo_history:
             return
-        last_score, last_empty_cell_count, last_matrix = self.undo_history.pop()
-        self.score = last_score
-        self.empty_cell_count = last_empty_cell_count
-        self.matrix = deepcopy(last_matrix)
-        self.undo_event(self.score, self.matrix)
+        delta = self.undo_history.pop()
+        if isinstance(delta, BoardDelta):
+            self.__set_board(delta.before)
+        else:
+            self.__revert_tiles(delta)
+        self.score -= delta.score
+        self.redo_history.append(delta)
+        self.undo_event.fire(self.score, self.matrix)
+
+    def redo(self):
+        """
+        Redo the last undone move, no effect if nothing was undone since the last move
+        :return:
+        """
+        if self.game_over:
+            return
+        if not self.redo_history:
+            return
+        delta = self.redo_history.pop()
+        if isinstance(delta, BoardDelta):
+            self.__set_board(delta.after)
+        else:
+            self.__apply_tiles(delta)
+        self.score += delta.score
+        self.undo_history.append(delta)
+        self.redo_event.fire(self.score, self.matrix)
+
+    def __set_board(self, board, previous=None):
+        """
+        Bring the matrix to a packed board by writing only the cells that differ
+        :param board: packed board
+        :param previous: packed form of the current matrix, None to pack it
+        """
+        if previous is None:
+            previous = self.__packed if self.__packed is not None else bitboard.from_matrix(self.matrix)
+        changed = board ^ previous
+        set_cell = self.__set_cell
+        while changed:
+            shift = ((changed & -changed).bit_length() - 1) & ~3     # lowest nibble that differs
+            exponent = (board >> shift) & 0xF
+            cell = shift >> 2
+            set_cell(cell & 3, cell >> 2, 1 << exponent if exponent else 0)
+            changed &= ~(0xF << shift)
+        self.__packed = board
+
+    def __revert_tiles(self, delta: MoveDelta):
+        for x, y, value in delta.spawns:
+            self.__set_cell(x, y, 0)
+        for x, y, dest_x, dest_y, merged_value in reversed(delta.tiles):
+            if merged_value:
+                self.__set_cell(x, y, merged_value // 2)
+                self.__set_cell(dest_x, dest_y, merged_value // 2)
+            else:
+                self.__set_cell(x, y, self.matrix[dest_x][dest_y])
+                self.__set_cell(dest_x, dest_y, 0)
+
+    def __apply_tiles(self, delta: MoveDelta):
+        for x, y, dest_x, dest_y, merged_value in delta.tiles:
+            self.__set_cell(dest_x, dest_y, merged_value or self.matrix[x][y])
+            self.__set_cell(x, y, 0)
+        for x, y, value in delta.spawns:
+            self.__set_cell(x, y, value)
 
     def move(self, direction: Directions):
-        self.__move_with_vector(self.__direction_vectors[direction])
+        if self.use_bitboard and not self.tile_event and not self.tile_batch_event:
+            self.__move_with_bitboard(direction)
+        else:
+            self.__move_with_vector(self.__direction_vectors[direction])
 
     def __get_traversal_range(self, direction):
         """
@@ -146,64 +410,131 @@ class Game(object):
         moved = False  # Do not create new tile if nothing has been moved
         game_won = False
         merge_info = [[False for _ in range(self.size)] for __ in range(self.size)]  # saves which cell was merged
-        last_state = self.score, self.empty_cell_count, deepcopy(self.matrix)  # save current state for undo
-        for i in self.__get_traversal_range(vector_x):
-            for j in self.__get_traversal_range(vector_y):
-                tile = self.__get_matrix_value_at(self.matrix, i, j)
-                if not tile:
-                    continue
-                farthest_cell_x, farthest_cell_y, next_cell_x, next_cell_y = self.__get_farthest_available_cell(
-                    i, j, vector_x, vector_y
-                )
-                try_merge_with_tile = self.__get_matrix_value_at(self.matrix, next_cell_x, next_cell_y)
-                if not self.__get_matrix_value_at(
-                        merge_info, next_cell_x,
-                        next_cell_y) and try_merge_with_tile and try_merge_with_tile == tile:
-                    # can be merged with next cell
-                    merge_info[next_cell_x][next_cell_y] = True
-                    new_tile_value = tile * 2
-                    self.empty_cell_count += 1
-                    self.matrix[next_cell_x][next_cell_y] = new_tile_value
-                    self.matrix[i][j] = 0
-                    self.score += new_tile_value
-                    self.tile_event(TileMoveAndMergeEvent(i, j, next_cell_x, next_cell_y, new_tile_value))
-                    self.score_event(self.score)
-                    game_won = new_tile_value == self.target
-                    moved = True
-                else:
-                    if (farthest_cell_x, farthest_cell_y) == (i, j):
+        score_before = self.score
+        tiles = []  # tile changes of this move for undo
+        self.__begin_batch()
+        try:
+            for i in self.__get_traversal_range(vector_x):
+                for j in self.__get_traversal_range(vector_y):
+                    tile = self.__get_matrix_value_at(self.matrix, i, j)
+                    if not tile:
                         continue
-                    self.matrix[farthest_cell_x][farthest_cell_y] = tile
-                    self.matrix[i][j] = 0
-                    self.tile_event(TileMoveEvent(i, j, farthest_cell_x, farthest_cell_y))
-                    moved = True
+                    farthest_cell_x, farthest_cell_y, next_cell_x, next_cell_y = self.__get_farthest_available_cell(
+                        i, j, vector_x, vector_y
+                    )
+                    try_merge_with_tile = self.__get_matrix_value_at(self.matrix, next_cell_x, next_cell_y)
+                    if not self.__get_matrix_value_at(
+                            merge_info, next_cell_x,
+                            next_cell_y) and try_merge_with_tile and try_merge_with_tile == tile:
+                        # can be merged with next cell
+                        merge_info[next_cell_x][next_cell_y] = True
+                        new_tile_value = tile * 2
+                        self.__set_cell(next_cell_x, next_cell_y, new_tile_value)
+                        self.__set_cell(i, j, 0)
+                        tiles.append((i, j, next_cell_x, next_cell_y, new_tile_value))
+                        self.score += new_tile_value
+                        self.__notify_tile(TileEventTypes.MoveAndMerge, i, j, next_cell_x, next_cell_y, new_tile_value)
+                        self.score_event.fire(self.score)
+                        game_won = game_won or new_tile_value == self.target
+                        moved = True
+                    else:
+                        if (farthest_cell_x, farthest_cell_y) == (i, j):
+                            continue
+                        self.__set_cell(farthest_cell_x, farthest_cell_y, tile)
+                        self.__set_cell(i, j, 0)
+                        tiles.append((i, j, farthest_cell_x, farthest_cell_y, 0))
+                        self.__notify_tile(TileEventTypes.Move, i, j, farthest_cell_x, farthest_cell_y, 0)
+                        moved = True
+            if moved:   # recorded before delivery, a raising handler can't leave the board ahead of the history
+                spawns = self.__create_random_tile(1, [2])
+                self.__push_history(MoveDelta(self.score - score_before, tiles, spawns))
+        finally:
+            dispatch_ns = self.__end_batch(deliver=moved, record=False)
         if moved:
-            self.__create_random_tile(1, [2])
-            self.undo_history.append(last_state)
-            self.move_complete_event()
+            self.__complete_move(game_won, dispatch_ns)
+
+    def __move_with_bitboard(self, direction):
+        """
+        Move the game with the 4x4 bitboard engine, no tile events are sent
+        :param direction: the move direction
+        :return: None
+        """
+        if self.game_over:
+            return
+
+        board = self.__packed
+        if board is None:
+            board = bitboard.from_matrix(self.matrix)
+        new_board, score_gained = bitboard.move(board, direction)
+        if new_board == board:
+            self.__packed = board
+            return
+        # merging the target tile scores at least the target
+        game_won = score_gained >= self.target and self.__target_exponent is not None and \
+            bitboard.count_exponent(new_board, self.__target_exponent) > \
+            bitboard.count_exponent(board, self.__target_exponent)
+        self.__set_board(new_board, board)
+        self.score += score_gained
+        for x, y, value in self.__create_random_tile(1, [2]):
+            new_board = bitboard.set_exponent(new_board, x, y, value.bit_length() - 1)
+        self.__packed = new_board
+        self.__push_history(BoardDelta(score_gained, board, new_board))
+        dispatch_ns = 0     # the score is delivered after the spawn and timed as dispatch, like on the vector engine
+        if score_gained:
+            metrics = self.metrics
+            start = perf_counter_ns() if metrics is not None else 0
+            self.score_event.fire(self.score)
+            if metrics is not None:
+                dispatch_ns = perf_counter_ns() - start
+        self.__complete_move(game_won, dispatch_ns)
+
+    def __push_history(self, delta):
+        self.undo_history.append(delta)
+        self.redo_history.clear()
+        if self.metrics is not None:
+            tile_events = len(delta.tiles) + len(delta.spawns) if isinstance(delta, MoveDelta) else 0
+            self.metrics.add_move(tile_events, len(self.undo_history))
+
+    def __complete_move(self, game_won, dispatch_ns=0):
+        """
+        Finish a move that changed the board
+        :param game_won: the move merged the target tile
+        :param dispatch_ns: time spent delivering the tile and score events of the move, recorded as one dispatch with
+                            the move complete event
+        """
+        metrics = self.metrics
+        if metrics is None:
+            self.move_complete_event.fire()
+        else:
+            start = perf_counter_ns()
+            self.move_complete_event.fire()
+            metrics.timers['dispatch'].add(dispatch_ns + perf_counter_ns() - start)
+        if logging.root.isEnabledFor(logging.DEBUG):   # a cached level check instead of a logging call per move
             logging.debug(self.matrix)
-            if game_won:
-                self.__trigger_game_over(True)
-            elif self.__is_game_over():
-                self.__trigger_game_over(False)
+        if metrics is None:
+            over = game_won or self.__is_game_over()
+        else:
+            start = perf_counter_ns()
+            over = game_won or self.__is_game_over()
+            metrics.timers['game_over_check'].add(perf_counter_ns() - start)
+        if over:
+            self.__trigger_game_over(game_won)
 
     def __trigger_game_over(self, won):
         self.game_over = True
-        self.game_over_event(won)
+        self.game_over_event.fire(won)
 
     def __is_game_over(self):
-        return self.empty_cell_count == 0 and not self.__has_mergeable_tile()
-
-    def __has_mergeable_tile(self):
+        """
+        A game can only be stuck once the board is full, then it's stuck if no neighbours are equal
+        """
+        if self.empty_cells:
+            return False
+        matrix = self.matrix
+        last = self.size - 1
         for i in range(self.size):
+            column = matrix[i]
             for j in range(self.size):
-                tile = self.__get_matrix_value_at(self.matrix, i, j)
-                if not tile:
-                    continue
-                for direction in list(Directions):
-                    vector_x, vector_y = self.__direction_vectors[direction]
-                    neighbor_tile = self.__get_matrix_value_at(self.matrix, i + vector_x, j + vector_y)
-                    if neighbor_tile == tile:
-                        return True
-        return False
-    pass
+                if (i < last and column[j] == matrix[i + 1][j]) or (j < last and column[j] == column[j + 1]):
+                    return False
+        return True
@@ -0,0 +1,92 @@
+#!/usr/bin/env python
+# coding: UTF-8
+# author: Sylphia
+# created:  08:10
+"""
+Moving single lines of tile exponents (0 for empty, 1 for 2, 2 for 4 ...), the rules of ``Game.move`` for one row or
+column. The bitboard tables, BatchSimulator and the replay analytics all move lines with move_line.
+"""
+from models.directions import Directions
+
+
+def build_lines(size):
+    """
+    Build the cell indexes of every line, ordered from the side the tiles move towards.
+    Cell (x, y) is stored at index x * size + y, the same order as Game.matrix
+    :return: dict of direction to list of lines
+    """
+    columns = [[x * size + y for y in range(size)] for x in range(size)]
+    rows = [[x * size + y for x in range(size)] for y in range(size)]
+    return {
+        Directions.Up: columns,
+        Directions.Down: [column[::-1] for column in columns],
+        Directions.Left: rows,
+        Directions.Right: [row[::-1] for row in rows],
+    }
+
+
+def move_line(line, max_exponent=None):
+    """
+    Move a line of exponents towards index 0, every tile merges at most once
+    :param line: sequence of exponents
+    :param max_exponent: tiles of this exponent never merge, None for no limit
+    :return: Tuple of (moved line, merged exponents in merge order)
+    """
+    moved = []
+    merged = []
+    merging = False
+    for exponent in line:
+        if not exponent:
+            continue
+        if moved and not merging and moved[-1] == exponent and (max_exponent is None or exponent < max_exponent):
+            moved[-1] += 1
+            merged.append(moved[-1])
+            merging = True
+        else:
+            moved.append(exponent)
+            merging = False
+    moved.extend([0] * (len(line) - len(moved)))
+    return tuple(moved), tuple(merged)
+
+
+class LineMover(object):
+    """
+    move_line memoized per line content. The cache is bounded: it is cleared once it holds cache_size lines, which
+    keeps boards larger than 4x4, whose lines hardly repeat, from growing it without end
+    """
+
+    def __init__(self, cache_size=1 << 18):
+        """
+        :param cache_size: maximal number of memoized lines
+        """
+        self.cache_size = cache_size
+        self.__cache = {}
+
+    def move_cells(self, cells, lines):
+        """
+        Move a flat exponent board in place
+        :param cells: mutable sequence of exponents
+        :param lines: the lines of one direction, see build_lines
+        :return: Tuple of (True if a cell changed, merged exponents)
+        """
+        cache = self.__cache
+        moved = False
+        merged = ()
+        for line in lines:
+            values = tuple([cells[i] for i in line])
+            result = cache.get(values)
+            if result is None:
+                if len(cache) >= self.cache_size:
+                    cache.clear()
+                result = cache[values] = move_line(values)
+            new_values, line_merged = result
+            if new_values == values:
+                continue
+            moved = True
+            merged += line_merged
+            for i, value in zip(line, new_values):
+                cells[i] = value
+        return moved, merged
+
+    def __len__(self):
+        return len(self.__cache)
@@ -0,0 +1,161 @@
+#!/usr/bin/env python
+# coding: UTF-8
+# author: Sylphia
+# created:  20:30
+"""
+Timing and size metrics of a Game.
+
+Game only records into a GameMetrics after Game.enable_metrics, a game without metrics pays one None check per spawn,
+game over check and event delivery. Timers use time.perf_counter_ns and keep a count, a total, a maximum and a
+histogram, so latency spikes stay visible in the aggregate.
+"""
+import json
+import os
+import time
+from bisect import bisect_left
+
+# upper bounds of the latency histogram buckets in nanoseconds, 1 us to about 67 ms, the last bucket is unbounded
+LATENCY_BUCKETS_NS = tuple(1000 << i for i in range(0, 17, 2))
+# upper bounds of the tile events per move histogram buckets
+EVENT_BUCKETS = (0, 1, 2, 4, 8, 16, 32, 64, 128, 256)
+
+TIMERS = ('move', 'spawn', 'game_over_check', 'dispatch')
+
+
+class Timer(object):
+    """
+    Durations of one operation
+    """
+    __slots__ = ('count', 'total_ns', 'max_ns', 'buckets')
+
+    def __init__(self):
+        self.count = 0
+        self.total_ns = 0
+        self.max_ns = 0
+        self.buckets = [0] * (len(LATENCY_BUCKETS_NS) + 1)
+
+    def add(self, elapsed_ns):
+        self.count += 1
+        self.total_ns += elapsed_ns
+        if elapsed_ns > self.max_ns:
+            self.max_ns = elapsed_ns
+        self.buckets[bisect_left(LATENCY_BUCKETS_NS, elapsed_ns)] += 1
+
+    def to_dict(self):
+        return {
+            'count': self.count,
+            'total_ns': self.total_ns,
+            'mean_ns': self.total_ns / self.count if self.count else 0.0,
+            'max_ns': self.max_ns,
+            'buckets': self.buckets[:],
+        }
+
+
+class GameMetrics(object):
+    """
+    Metrics of one or more games, filled by Game while enabled
+    """
+    def __init__(self):
+        self.timers = {name: Timer() for name in TIMERS}
+        self.moves = 0          # moves that changed the board
+        self.noop_moves = 0     # moves that changed nothing, game over included
+        self.tile_events = 0    # tile events (moves, merges, spawns) of the moves that changed the board
+        self.event_buckets = [0] * (len(EVENT_BUCKETS) + 1)
+        self.undo_history = 0   # undo history size after the last move
+        self.max_undo_history = 0
+        self.started = time.time()
+
+    def reset(self):
+        """
+        Clear every metric
+        :return: None
+        """
+        self.__init__()
+
+    def add_move(self, tile_events, undo_history):
+        """
+        Record a move that changed the board
+        :param tile_events: number of tile events of the move
+        :param undo_history: undo history size after the move
+        :return: None
+        """
+        self.moves += 1
+        self.tile_events += tile_events
+        self.event_buckets[bisect_left(EVENT_BUCKETS, tile_events)] += 1
+        self.undo_history = undo_history
+        if undo_history > self.max_undo_history:
+            self.max_undo_history = undo_history
+
+    def snapshot(self):
+        """
+        Get a copy of every metric
+        :return: JSON-serializable dict
+        """
+        return {
+            'started': self.started,
+            'moves': self.moves,
+            'noop_moves': self.noop_moves,
+            'tile_events': self.tile_events,
+            'tile_events_per_move': self.tile_events / self.moves if self.moves else 0.0,
+            'tile_event_buckets': self.event_buckets[:],
+            'undo_history': self.undo_history,
+            'max_undo_history': self.max_undo_history,
+            'timers': {name: timer.to_dict() for name, timer in self.timers.items()},
+        }
+
+    def to_json(self):
+        return json.dumps(self.snapshot())
+
+    def to_prometheus(self, prefix='game2048'):
+        """
+        Render the metrics in the Prometheus text exposition format
+        :param prefix: metric name prefix
+        :return: str
+        """
+        lines = []
+
+        def metric(name, kind, description, samples):
+            # samples are (text after the name, value), the text holds labels and the histogram series suffixes
+            lines.append('# HELP {}_{} {}'.format(prefix, name, description))
+            lines.append('# TYPE {}_{} {}'.format(prefix, name, kind))
+            for labels, value in samples:
+                lines.append('{}_{}{} {}'.format(prefix, name, labels, value))
+
+        def histogram(name, description, bounds, buckets, total, scale=1):
+            samples = []
+            cumulative = 0
+            for bound, count in zip(bounds, buckets):
+                cumulative += count
+                samples.append(('_bucket{{le="{}"}}'.format(bound / scale), cumulative))
+            samples.append(('_bucket{le="+Inf"}', cumulative + buckets[-1]))
+            samples.append(('_sum', total / scale))
+            samples.append(('_count', cumulative + buckets[-1]))
+            metric(name, 'histogram', description, samples)
+
+        metric('moves_total', 'counter', 'Moves that changed the board', [('', self.moves)])
+        metric('noop_moves_total', 'counter', 'Moves that changed nothing', [('', self.noop_moves)])
+        metric('undo_history', 'gauge', 'Undo history size after the last move', [('', self.undo_history)])
+        metric('undo_history_max', 'gauge', 'Largest undo history size', [('', self.max_undo_history)])
+        histogram('tile_events_per_move', 'Tile events sent by a move', EVENT_BUCKETS, self.event_buckets,
+                  self.tile_events)
+        for name, timer in self.timers.items():
+            histogram('{}_seconds'.format(name), 'Duration of {}'.format(name.replace('_', ' ')), LATENCY_BUCKETS_NS,
+                      timer.buckets, timer.total_ns, 1e9)
+            metric('{}_seconds_max'.format(name), 'gauge', 'Longest {}'.format(name.replace('_', ' ')),
+                   [('', timer.max_ns / 1e9)])
+        return '\n'.join(lines) + '\n'
+
+    def dump(self, path, fmt='prometheus'):
+        """
+        Write the metrics to a file, replaced atomically so a scraper never reads a partial file
+        :param path: file name
+        :param fmt: "prometheus" or "json"
+        :return: None
+        """
+        if fmt not in ('prometheus', 'json'):
+            raise ValueError("Unknown metrics format '{}', expected prometheus or json".format(fmt))
+        content = self.to_prometheus() if fmt == 'prometheus' else self.to_json() + '\n'
+        temp_path = '{}.{}'.format(path, os.getpid())
+        with open(temp_path, 'w') as f:
+            f.write(content)
+        os.replace(temp_path, path)
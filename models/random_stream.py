@@ -0,0 +1,65 @@
+#!/usr/bin/env python
+# coding: UTF-8
+# author: Sylphia
+# created:  19:40
+import random
+import sys
+from array import array
+
+
+class RandomStream(object):
+    """
+    Seeded random source that generates its numbers in bulk.
+
+    Random 32-bit words are drawn from ``random.Random`` a chunk at a time and handed out one by one, which is much
+    cheaper than a ``random.Random`` call per spawn. Supports the part of the ``random.Random`` interface ``Game`` uses.
+    """
+
+    def __init__(self, seed=None, chunk_size=4096):
+        """
+        Create a stream
+        :param seed: seed of the underlying generator, None for a random seed
+        :param chunk_size: number of words generated at once
+        """
+        self.chunk_size = chunk_size
+        self.__random = random.Random(seed)
+        self.__words = array('I')
+        self.__position = 0
+
+    def seed(self, seed):
+        """
+        Restart the stream from a seed, drops the pre-generated words
+        :param seed: new seed
+        :return: None
+        """
+        self.__random.seed(seed)
+        self.__words = array('I')
+        self.__position = 0
+
+    def __refill(self):
+        words = array('I')
+        bits = self.__random.getrandbits(32 * self.chunk_size)
+        # native byte order, so word i is always bits 32 * i .. 32 * i + 31 ('I' is 32-bit on supported platforms)
+        words.frombytes(bits.to_bytes(4 * self.chunk_size, sys.byteorder))
+        self.__words = words
+        self.__position = 0
+
+    def next_word(self):
+        """
+        Get the next random 32-bit word
+        :return: 0 <= word < 2 ** 32
+        """
+        if self.__position >= len(self.__words):
+            self.__refill()
+        word = self.__words[self.__position]
+        self.__position += 1
+        return word
+
+    def randrange(self, stop):
+        """
+        Get a random integer 0 <= n < stop, stop must be at most 2 ** 32
+        """
+        return (self.next_word() * stop) >> 32
+
+    def choice(self, seq):
+        return seq[self.randrange(len(seq))]
@@ -0,0 +1,298 @@
+#!/usr/bin/env python
+# coding: UTF-8
+# author: Sylphia
+# created:  22:10
+"""
+Binary game log.
+
+An archive is a plain concatenation of game records, each one is a fixed header followed by one action per move:
+
+    header   magic b'GR', version, size, action width, flags, target, seed, score, action count, two initial spawns
+    actions  action count little endian integers of action width bytes
+
+A move action packs the direction value in bits 0-1, whether it spawned a 4 in bit 2 and the spawned cell
+(x * size + y) from bit 3 on, so a 4x4 move takes a single byte. Undo and redo set the top bit of the action.
+An initial spawn is packed as cell << 1 | spawned a 4, NO_SPAWN if the board had no room for it.
+Because every spawn is stored, a record replays without the random generator, the seed is kept for reference.
+"""
+import mmap
+import struct
+import sys
+from collections import namedtuple
+
+from models.directions import Directions
+from models.game import Game
+from models.tile_event import TileEventTypes
+
+
+MAGIC = b'GR'
+VERSION = 1
+HEADER = struct.Struct('<2sBBBBIQQIHH')
+NO_SPAWN = 0xffff
+
+FINISHED = 1    # flags, the game reached game over
+WON = 2
+
+UNDO = 0    # action codes of control actions
+REDO = 1
+
+GameRecord = namedtuple('GameRecord', ['size', 'target', 'seed', 'score', 'flags', 'spawns', 'width', 'actions'])
+GameRecord.__doc__ = """
+One recorded game, spawns is a tuple of initial (x, y, value), actions the raw action bytes (a memoryview when read
+from an archive)
+"""
+
+
+def action_width(size):
+    """
+    Get the number of bytes an action of a board size takes
+    """
+    cell_bits = max(1, (size * size - 1).bit_length())
+    for width in (1, 2, 4):
+        if 3 + cell_bits < 8 * width:
+            return width
+    raise ValueError("Board size {} is too large to record".format(size))
+
+
+def encode_move(direction, x, y, value, size):
+    return direction.value | (value == 4) << 2 | (x * size + y) << 3
+
+
+def decode_actions(record: GameRecord):
+    """
+    Iterate the actions of a record lazily
+    :param record: GameRecord
+    :return: generator of (Directions, x, y, value) for moves and (None, UNDO or REDO, None, None) for undo and redo
+    """
+    width = record.width
+    control = 1 << (8 * width - 1)
+    size = record.size
+    directions = list(Directions)
+    actions = record.actions
+    if width > 1 and sys.byteorder == 'little':
+        actions = memoryview(actions).cast('B').cast('H' if width == 2 else 'I')
+    elif width > 1:
+        actions = (int.from_bytes(actions[i:i + width], 'little') for i in range(0, len(actions), width))
+    for action in actions:
+        if action & control:
+            yield None, action & ~control, None, None
+        else:
+            x, y = divmod(action >> 3, size)
+            yield directions[action & 3], x, y, 4 if action & 4 else 2
+
+
+class GameRecorder(object):
+    """
+    Record the games played by a Game into a binary log.
+
+    Listens to tile_batch_event (the packed tile_event of a move) to learn the direction of each move and the tile it
+    spawned, and to undo_event, redo_event and game_over_event. A record is written once its game ends, or when the
+    next game starts or the recorder is closed. Listening to tile events keeps the game on its vector move engine.
+    """
+
+    def __init__(self, game: Game, output):
+        """
+        Start recording
+        :param game: the game to record
+        :param output: binary file object, or a callable receiving the bytes of every finished record
+        """
+        self.game = game
+        self.__write = output if callable(output) else output.write
+        self.__width = action_width(game.size)
+        self.__control = 1 << (8 * self.__width - 1)
+        self.__actions = bytearray()
+        self.__spawns = None    # initial spawns of the running game, None until a game starts
+        self.__seed = 0
+        self.__score = 0    # score of the running game, the game resets its own before a new game is announced
+        self.records = 0    # number of records written
+        game.tile_batch_event += self.__on_tiles
+        game.undo_event += self.__on_undo
+        game.redo_event += self.__on_redo
+        game.game_over_event += self.__on_game_over
+
+    def __on_tiles(self, buffer):
+        direction = None
+        spawns = []
+        for event_type, x, y, dest_x, dest_y, value in buffer:
+            if event_type == TileEventTypes.Spawn.value:
+                spawns.append((x, y, value))
+            elif direction is None:
+                if dest_x != x:
+                    direction = Directions.Left if dest_x < x else Directions.Right
+                else:
+                    direction = Directions.Up if dest_y < y else Directions.Down
+        if direction is None:
+            # only spawns, a new game started
+            self.flush()
+            self.__seed = self.game.seed
+            self.__score = 0
+            self.__spawns = spawns
+            return
+        if self.__spawns is None:
+            return  # started recording in the middle of a game
+        self.__score = self.game.score
+        x, y, value = spawns[0]
+        self.__append(encode_move(direction, x, y, value, self.game.size))
+
+    def __append(self, action):
+        self.__actions += action.to_bytes(self.__width, 'little')
+
+    def __on_undo(self, score, matrix):
+        if self.__spawns is not None:
+            self.__append(self.__control | UNDO)
+            self.__score = score
+
+    def __on_redo(self, score, matrix):
+        if self.__spawns is not None:
+            self.__append(self.__control | REDO)
+            self.__score = score
+
+    def __on_game_over(self, won):
+        self.flush(FINISHED | (WON if won else 0))
+
+    def flush(self, flags=0):
+        """
+        Write the running game, if any, and stop recording it
+        :param flags: FINISHED and WON flags of the game
+        :return: None
+        """
+        if self.__spawns is None:
+            return
+        game = self.game
+        packed = [x * game.size + y << 1 | (value == 4) for x, y, value in self.__spawns]
+        packed += [NO_SPAWN] * (2 - len(packed))
+        header = HEADER.pack(MAGIC, VERSION, game.size, self.__width, flags, game.target,
+                             self.__seed & 0xffffffffffffffff, self.__score, len(self.__actions) // self.__width, *packed)
+        self.__write(header + self.__actions)
+        self.__actions = bytearray()
+        self.__spawns = None
+        self.records += 1
+
+    def close(self):
+        """
+        Write the running game and stop listening to the game
+        :return: None
+        """
+        self.flush()
+        self.game.tile_batch_event -= self.__on_tiles
+        self.game.undo_event -= self.__on_undo
+        self.game.redo_event -= self.__on_redo
+        self.game.game_over_event -= self.__on_game_over
+
+
+def parse_records(buffer, offset=0, end=None):
+    """
+    Iterate the game records of a buffer lazily, actions are views into the buffer
+    :param buffer: bytes-like archive content
+    :param offset: position of the first record
+    :param end: stop at this position, None for the end of the buffer
+    :return: generator of (offset, GameRecord)
+    """
+    view = memoryview(buffer)
+    end = len(view) if end is None else end
+    while offset < end:
+        if end - offset < HEADER.size:
+            raise ValueError("Truncated game record at {}".format(offset))
+        magic, version, size, width, flags, target, seed, score, count, first, second = \
+            HEADER.unpack_from(view, offset)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError("Not a game record at {}".format(offset))
+        start = offset + HEADER.size
+        stop = start + count * width
+        if stop > end:
+            raise ValueError("Truncated game record at {}".format(offset))
+        spawns = tuple(((packed >> 1) // size, (packed >> 1) % size, 4 if packed & 1 else 2)
+                       for packed in (first, second) if packed != NO_SPAWN)
+        yield offset, GameRecord(size, target, seed, score, flags, spawns, width, view[start:stop])
+        offset = stop
+
+
+class ReplayReader(object):
+    """
+    Memory-mapped game archive, iterating it only parses record headers, actions stay in the mapping
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.__file = open(path, 'rb')
+        try:
+            self.__map = mmap.mmap(self.__file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:  # empty file
+            self.__map = b''
+
+    def __iter__(self):
+        return (record for _, record in parse_records(self.__map))
+
+    def records(self, offset=0, end=None):
+        """
+        Iterate the records of a part of the archive
+        :param offset: position of the first record, must be the start of a record
+        :param end: stop at this position
+        :return: generator of (offset, GameRecord)
+        """
+        return parse_records(self.__map, offset, end)
+
+    def __len__(self):
+        return len(self.__map)
+
+    def close(self):
+        if isinstance(self.__map, mmap.mmap):
+            try:
+                self.__map.close()
+            except BufferError:
+                pass    # records are still referenced, the mapping goes away with the last of them
+        self.__file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+class _ScriptedSpawns(object):
+    """
+    Random generator stand-in that makes a game spawn recorded tiles
+    """
+
+    def __init__(self, game: Game):
+        self.game = game
+        self.spawns = []
+
+    def seed(self, seed):
+        pass
+
+    def randrange(self, stop):
+        x, y, value = self.spawns[-1]
+        return self.game.empty_cells.rank((x, y))
+
+    def choice(self, seq):
+        x, y, value = self.spawns.pop()
+        return value
+
+
+def replay(record: GameRecord, game: Game = None):
+    """
+    Replay a record on a Game, lazily
+    :param record: GameRecord
+    :param game: Game with the size of the record to replay on, None to create one. Its handlers see the replay like a
+                 game being played
+    :return: generator of (direction or None, control code or None) per action, game holds the state after the action
+    """
+    if game is None:
+        game = Game(record.size, record.target, history_depth=None)
+    script = _ScriptedSpawns(game)
+    game.random = script
+    script.spawns = list(reversed(record.spawns))
+    game.new_game()
+    for direction, x, y, value in decode_actions(record):
+        if direction is None:
+            if x == UNDO:
+                game.undo()
+            else:
+                game.redo()
+            yield None, x
+        else:
+            script.spawns.append((x, y, value))
+            game.move(direction)
+            yield direction, None
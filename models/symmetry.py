@@ -0,0 +1,224 @@
+#!/usr/bin/env python
+# coding: UTF-8
+# author: Sylphia
+# created:  22:15
+"""
+The 8 symmetries of a square board (rotations and reflections) and a shared evaluation cache keyed on them.
+
+A transform is a (transpose, flip_x, flip_y) tuple: cell (x, y) first swaps to (y, x) if transpose is set, then x
+becomes size - 1 - x if flip_x is set and y becomes size - 1 - y if flip_y is set. Moves commute with the transforms,
+moving the transformed board in the transformed direction gives the transformed result with the same score, so
+anything computed for one board holds for its 8 images once directions are mapped back.
+"""
+import threading
+from collections import OrderedDict
+
+from models import bitboard
+from models.directions import Directions
+
+TRANSFORMS = tuple((transpose, flip_x, flip_y) for transpose in (False, True) for flip_x in (False, True)
+                   for flip_y in (False, True))
+IDENTITY = TRANSFORMS[0]
+
+_vectors = {
+    Directions.Up: (0, -1),
+    Directions.Down: (0, 1),
+    Directions.Left: (-1, 0),
+    Directions.Right: (1, 0),
+}
+_directions_by_vector = {vector: direction for direction, vector in _vectors.items()}
+
+
+def _transform_vector(vector, transform):
+    transpose, flip_x, flip_y = transform
+    dx, dy = vector
+    if transpose:
+        dx, dy = dy, dx
+    return -dx if flip_x else dx, -dy if flip_y else dy
+
+
+def _inverse_vector(vector, transform):
+    transpose, flip_x, flip_y = transform
+    dx, dy = vector
+    dx, dy = -dx if flip_x else dx, -dy if flip_y else dy
+    return (dy, dx) if transpose else (dx, dy)
+
+
+# transform -> list of directions by direction value
+_forward = {transform: [_directions_by_vector[_transform_vector(_vectors[direction], transform)]
+                        for direction in Directions] for transform in TRANSFORMS}
+_backward = {transform: [_directions_by_vector[_inverse_vector(_vectors[direction], transform)]
+                         for direction in Directions] for transform in TRANSFORMS}
+
+
+def transform_direction(direction: Directions, transform):
+    """
+    Get the direction on the transformed board that does what direction does on the original one
+    """
+    return _forward[transform][direction.value]
+
+
+def inverse_direction(direction: Directions, transform):
+    """
+    Get the direction on the original board that does what direction does on the transformed one
+    """
+    return _backward[transform][direction.value]
+
+
+def transform_matrix(matrix, transform):
+    """
+    Transform a Game.matrix
+    :param matrix: matrix[x][y] of tile values
+    :param transform: one of TRANSFORMS
+    :return: new matrix
+    """
+    transpose, flip_x, flip_y = transform
+    size = len(matrix)
+    result = [[0] * size for _ in range(size)]
+    last = size - 1
+    for x in range(size):
+        column = matrix[x]
+        for y in range(size):
+            new_x, new_y = (y, x) if transpose else (x, y)
+            result[last - new_x if flip_x else new_x][last - new_y if flip_y else new_y] = column[y]
+    return result
+
+
+def canonical_matrix(matrix):
+    """
+    Get the canonical form of a board of any size, the smallest flattened image of its 8 images
+    :param matrix: matrix[x][y] of tile values
+    :return: Tuple of (key, transform), key is a tuple of tile values, transform maps the matrix onto the key
+    """
+    best = None
+    best_transform = IDENTITY
+    for transform in TRANSFORMS:
+        key = tuple(value for column in transform_matrix(matrix, transform) for value in column)
+        if best is None or key < best:
+            best = key
+            best_transform = transform
+    return best, best_transform
+
+
+def _flip_rows(board):
+    """
+    Mirror a packed 4x4 board left to right, x becomes 3 - x
+    """
+    board = (board & 0x0F0F0F0F0F0F0F0F) << 4 | (board >> 4) & 0x0F0F0F0F0F0F0F0F
+    return (board & 0x00FF00FF00FF00FF) << 8 | (board >> 8) & 0x00FF00FF00FF00FF
+
+
+def _flip_columns(board):
+    """
+    Mirror a packed 4x4 board top to bottom, y becomes 3 - y
+    """
+    return (board & 0xFFFF) << 48 | (board & 0xFFFF0000) << 16 | (board >> 16) & 0xFFFF0000 | board >> 48
+
+
+def transform_board(board, transform):
+    """
+    Transform a packed 4x4 board
+    :param board: packed board
+    :param transform: one of TRANSFORMS
+    :return: packed board
+    """
+    transpose, flip_x, flip_y = transform
+    if transpose:
+        board = bitboard.transpose(board)
+    if flip_x:
+        board = _flip_rows(board)
+    if flip_y:
+        board = _flip_columns(board)
+    return board
+
+
+def canonical_board(board):
+    """
+    Get the canonical form of a packed 4x4 board, the smallest of its 8 images
+    :param board: packed board
+    :return: Tuple of (canonical packed board, transform mapping board onto it)
+    """
+    transposed = bitboard.transpose(board)
+    best = board
+    best_transform = IDENTITY
+    for transpose, image in ((False, board), (True, transposed)):
+        rows = _flip_rows(image)
+        for flip_x, flipped in ((False, image), (True, rows)):
+            for flip_y, candidate in ((False, flipped), (True, _flip_columns(flipped))):
+                if candidate < best:
+                    best = candidate
+                    best_transform = (transpose, flip_x, flip_y)
+    return best, best_transform
+
+
+def canonical_key(board):
+    """
+    Get the canonical key of a board
+    :param board: packed 4x4 board (int) or matrix[x][y] of any size
+    :return: Tuple of (hashable key, transform mapping board onto it)
+    """
+    if isinstance(board, int):
+        return canonical_board(board)
+    return canonical_matrix(board)
+
+
+class EvaluationCache(object):
+    """
+    Bounded, thread-safe board -> result cache shared by the 8 images of a board, least recently used entries are
+    evicted. Results may carry a best direction, which is stored for the canonical board and mapped back to the board
+    asked about.
+    """
+
+    def __init__(self, capacity=1 << 18):
+        """
+        :param capacity: maximal number of canonical boards kept
+        """
+        self.capacity = capacity
+        self.hits = 0
+        self.misses = 0
+        self.__entries = OrderedDict()
+        self.__lock = threading.Lock()
+
+    def get(self, board):
+        """
+        Get the result cached for a board or any of its images
+        :param board: packed 4x4 board or matrix[x][y]
+        :return: Tuple of (best direction for this board or None, value), None if nothing is cached
+        """
+        key, transform = canonical_key(board)
+        with self.__lock:
+            entry = self.__entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self.__entries.move_to_end(key)
+            self.hits += 1
+        direction, value = entry
+        return (inverse_direction(direction, transform) if direction is not None else None), value
+
+    def put(self, board, direction, value):
+        """
+        Cache the result of a board
+        :param board: packed 4x4 board or matrix[x][y]
+        :param direction: best Directions for this board, or None
+        :param value: anything that is the same for every image of the board, e.g. a heuristic value or a score
+        :return: None
+        """
+        key, transform = canonical_key(board)
+        if direction is not None:
+            direction = transform_direction(direction, transform)
+        with self.__lock:
+            entries = self.__entries
+            entries[key] = (direction, value)
+            entries.move_to_end(key)
+            if len(entries) > self.capacity:
+                entries.popitem(last=False)
+
+    def clear(self):
+        with self.__lock:
+            self.__entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def __len__(self):
+        return len(self.__entries)
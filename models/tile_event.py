@@ -2,6 +2,7 @@
 # coding: UTF-8
 # author: Sylphia
 # created:  14:53
+from array import array
 from enum import Enum
 
 
@@ -13,6 +14,8 @@ class TileEventTypes(Enum):
 
 
 class TileEvent(object):
+    __slots__ = ('x', 'y', 'value', 'event_type')
+
     def __init__(self, x, y):
         self.x = x
         self.y = y
@@ -22,6 +25,8 @@ class TileEvent(object):
 
 
 class TileSpawnEvent(TileEvent):
+    __slots__ = ()
+
     def __init__(self, x, y, value):
         super().__init__(x, y)
         self.event_type = TileEventTypes.Spawn
@@ -32,6 +37,8 @@ class TileSpawnEvent(TileEvent):
 
 
 class TileMoveEvent(TileEvent):
+    __slots__ = ('dest_x', 'dest_y')
+
     def __init__(self, x, y, dest_x, dest_y):
         super().__init__(x, y)
         self.event_type = TileEventTypes.Move
@@ -43,9 +50,11 @@ class TileMoveEvent(TileEvent):
 
 
 class TileMoveAndMergeEvent(TileEvent):
+    __slots__ = ('dest_x', 'dest_y')
+
     def __init__(self, x, y, dest_x, dest_y, value):
         super().__init__(x, y)
-        self.event_type = TileEventTypes.Move
+        self.event_type = TileEventTypes.MoveAndMerge
         self.dest_x = dest_x
         self.dest_y = dest_y
         self.value = value
@@ -53,3 +62,60 @@ class TileMoveAndMergeEvent(TileEvent):
     def __repr__(self):
         return 'Merge tile {} from ({}, {}) to ({}, {})'.format(self.value, self.x + 1, self.y + 1, self.dest_x + 1,
                                                                 self.dest_y + 1)
+
+
+def create_tile_event(event_type, x, y, dest_x, dest_y, value):
+    """
+    Create a tile event object from its packed fields
+    :param event_type: TileEventTypes value (int)
+    :return: TileEvent
+    """
+    if event_type == TileEventTypes.Spawn.value:
+        return TileSpawnEvent(x, y, value)
+    if event_type == TileEventTypes.Move.value:
+        return TileMoveEvent(x, y, dest_x, dest_y)
+    return TileMoveAndMergeEvent(x, y, dest_x, dest_y, value)
+
+
+class TileEventBuffer(object):
+    """
+    Packed tile events of one move, stored as flat (type, x, y, dest_x, dest_y, value) int records.
+    Spawn events repeat x, y as destination, move events have a value of 0.
+    """
+    __slots__ = ('__records',)
+    record_size = 6
+
+    def __init__(self):
+        self.__records = array('i')
+
+    def append(self, event_type, x, y, dest_x, dest_y, value):
+        """
+        Add an event
+        :param event_type: TileEventTypes value (int)
+        """
+        self.__records.extend((event_type, x, y, dest_x, dest_y, value))
+
+    def clear(self):
+        del self.__records[:]
+
+    def copy(self):
+        buffer = TileEventBuffer()
+        buffer.__records.extend(self.__records)
+        return buffer
+
+    def to_events(self):
+        """
+        Unpack the buffer into tile event objects
+        :return: list of TileEvent
+        """
+        return [create_tile_event(*record) for record in self]
+
+    def __len__(self):
+        return len(self.__records) // TileEventBuffer.record_size
+
+    def __iter__(self):
+        records = iter(self.__records)
+        return zip(records, records, records, records, records, records)
+
+    def __repr__(self):
+        return '; '.join(repr(event) for event in self.to_events())
@@ -0,0 +1,81 @@
+#!/usr/bin/env python
+# coding: UTF-8
+# author: Sylphia
+# created:  22:40
+"""
+NumPy move kernel for batches of boards of any size.
+
+Boards are stacked into a ``(batch, size, size)`` integer array laid out like ``Game.matrix`` (``boards[i, x, y]`` is
+the tile value of cell (x, y) of board i, 0 for empty). All boards are moved in one direction at once with the same
+rules as ``Game.move``: tiles slide as far as possible, a cell takes part in at most one merge per move and merges
+closer to the moving side happen first.
+
+NumPy is an optional dependency, it is only needed when this module is imported.
+"""
+import numpy as np
+
+from models.directions import Directions
+
+
+def from_matrices(matrices):
+    """
+    Stack Game.matrix lists into a board array
+    :param matrices: iterable of matrix[x][y] lists
+    :return: (batch, size, size) int64 array
+    """
+    return np.array(list(matrices), dtype=np.int64)
+
+
+def _orient(boards, direction):
+    """
+    Get a view of the boards with every line along the last axis, ordered from the side the tiles move towards
+    """
+    if direction == Directions.Up:
+        return boards
+    if direction == Directions.Down:
+        return boards[:, :, ::-1]
+    if direction == Directions.Left:
+        return boards.transpose(0, 2, 1)
+    return boards.transpose(0, 2, 1)[:, :, ::-1]
+
+
+def _compress(lines):
+    """
+    Slide every non-empty tile towards index 0, keeping their order
+    :param lines: (n, size) array
+    :return: compressed copy
+    """
+    order = np.argsort(lines == 0, axis=1, kind='stable')
+    return np.take_along_axis(lines, order, axis=1)
+
+
+def move(boards, direction: Directions):
+    """
+    Move a batch of boards
+    :param boards: (batch, size, size) integer array of tile values, not modified
+    :param direction: move direction for all boards
+    :return: Tuple of (new boards, score gained per board, bool array of boards that changed)
+    """
+    batch, size = boards.shape[0], boards.shape[1]
+    lines = np.ascontiguousarray(_orient(boards, direction)).reshape(batch * size, size)
+    lines = _compress(lines)
+
+    # a tile merges with the next one when they are equal and it was not consumed by the merge before it
+    equal = (lines[:, :-1] == lines[:, 1:]) & (lines[:, :-1] != 0)
+    merges = np.zeros_like(equal)
+    previous = np.zeros(lines.shape[0], dtype=bool)
+    for i in range(size - 1):
+        previous = equal[:, i] & ~previous
+        merges[:, i] = previous
+
+    merged_values = np.where(merges, lines[:, :-1] * 2, 0)
+    lines[:, :-1] += np.where(merges, lines[:, :-1], 0)
+    lines[:, 1:][merges] = 0
+    lines = _compress(lines)
+
+    scores = merged_values.reshape(batch, -1).sum(axis=1)
+    new_boards = np.empty_like(boards)
+    _orient(new_boards, direction)[...] = lines.reshape(batch, size, size)
+    changed = (new_boards != boards).reshape(batch, -1).any(axis=1)
+    return new_boards, scores, changed
+
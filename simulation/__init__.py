@@ -0,0 +1,4 @@
+#!/usr/bin/env python
+# coding: UTF-8
+# author: Sylphia
+# created:  20:31
\ No newline at end of file
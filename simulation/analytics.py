@@ -0,0 +1,248 @@
+#!/usr/bin/env python
+# coding: UTF-8
+# author: Sylphia
+# created:  23:05
+import multiprocessing
+import os
+from array import array
+from collections import Counter, deque, namedtuple
+
+from models.directions import Directions
+from models.lines import LineMover, build_lines
+from models.replay import FINISHED, REDO, WON, ReplayReader, decode_actions
+
+# One action of a replayed game. direction is None for undo and redo (control holds UNDO or REDO), moves is the number
+# of moves on the board after the action and merged the tile values merged by a move (empty for undo and redo)
+Step = namedtuple('Step', ['direction', 'control', 'moves', 'score', 'merged'])
+
+
+class Replayer(object):
+    """
+    Lightweight replay of recorded games on exponent boards, without Game or its events.
+    Lines are moved through a models.lines.LineMover shared by every game of the replayer, its cache holds at most
+    cache_size lines. Only the boards undo can go back to are kept, memory does not grow with the length of a game.
+    """
+
+    def __init__(self, cache_size=1 << 18, history_depth=1000):
+        """
+        :param cache_size: maximal number of memoized line moves
+        :param history_depth: undo depth of the recorded games (Game's default is 1000), None for unlimited
+        """
+        self.cache_size = cache_size
+        self.history_depth = history_depth
+        self.__lines = {}
+        self.__line_mover = LineMover(cache_size)
+
+    def steps(self, record):
+        """
+        Replay a record lazily
+        :param record: models.replay.GameRecord
+        :return: generator of Step
+        """
+        size = record.size
+        lines = self.__lines.get(size)
+        if lines is None:
+            lines = self.__lines[size] = build_lines(size)
+        cells = bytearray(size * size)
+        for x, y, value in record.spawns:
+            cells[x * size + y] = value.bit_length() - 1
+        score = 0
+        moves = 0   # moves on the board, undo may only reach back history_depth of them
+        history = deque(maxlen=self.history_depth)    # (cells, score) before the last moves on the board, for undo
+        undone = []     # (cells, score) after every undone move, for redo
+        for direction, x, y, value in decode_actions(record):
+            if direction is None:
+                if x == REDO:
+                    if not undone:
+                        continue
+                    history.append((bytes(cells), score))
+                    cells, score = undone.pop()
+                    moves += 1
+                else:
+                    if not history:
+                        continue
+                    undone.append((bytes(cells), score))
+                    cells, score = history.pop()
+                    moves -= 1
+                cells = bytearray(cells)
+                yield Step(None, x, moves, score, ())
+                continue
+            history.append((bytes(cells), score))
+            undone.clear()
+            _, merged = self.__line_mover.move_cells(cells, lines[direction])
+            merged = tuple(1 << exponent for exponent in merged)
+            score += sum(merged)
+            cells[x * size + y] = value.bit_length() - 1
+            moves += 1
+            yield Step(direction, None, moves, score, merged)
+
+
+class GameStats(object):
+    """
+    Single pass aggregate over recorded games, memory only grows with the longest game, not with the number of games
+    """
+
+    def __init__(self, length_bucket=100):
+        """
+        :param length_bucket: width of a game length histogram bucket, in moves
+        """
+        self.length_bucket = length_bucket
+        self.games = 0
+        self.finished = 0
+        self.wins = 0
+        self.moves = 0
+        self.undos = 0
+        self.redos = 0
+        self.directions = Counter()         # Directions name -> moves
+        self.merges = Counter()             # merged tile value -> merges
+        self.lengths = Counter()            # bucket start -> finished games lasting that many moves
+        self.score_sums = array('d')        # by number of moves on the board, sum of scores
+        self.score_counts = array('L')      # by number of moves on the board, number of scores summed
+
+    def add(self, record, steps):
+        """
+        Add a game
+        :param record: models.replay.GameRecord
+        :param steps: the Steps of the game, consumed lazily
+        :return: None
+        """
+        directions = [0] * len(Directions)
+        merges = self.merges
+        score_sums = self.score_sums
+        score_counts = self.score_counts
+        moves = 0
+        for step in steps:
+            moves = step.moves
+            if step.direction is None:
+                if step.control == REDO:
+                    self.redos += 1
+                else:
+                    self.undos += 1
+                continue
+            directions[step.direction.value] += 1
+            for value in step.merged:
+                merges[value] += 1
+            if moves >= len(score_sums):
+                score_sums.extend([0.0] * (moves + 1 - len(score_sums)))
+                score_counts.extend([0] * (moves + 1 - len(score_counts)))
+            score_sums[moves] += step.score
+            score_counts[moves] += 1
+        self.games += 1
+        self.moves += sum(directions)
+        for direction in Directions:
+            if directions[direction.value]:
+                self.directions[direction.name] += directions[direction.value]
+        if record.flags & FINISHED:
+            self.finished += 1
+            self.lengths[moves // self.length_bucket * self.length_bucket] += 1
+        if record.flags & WON:
+            self.wins += 1
+
+    def merge(self, other):
+        """
+        Add the aggregate of another chunk
+        :param other: GameStats with the same length bucket
+        :return: self
+        """
+        self.games += other.games
+        self.finished += other.finished
+        self.wins += other.wins
+        self.moves += other.moves
+        self.undos += other.undos
+        self.redos += other.redos
+        self.directions.update(other.directions)
+        self.merges.update(other.merges)
+        self.lengths.update(other.lengths)
+        missing = len(other.score_sums) - len(self.score_sums)
+        if missing > 0:
+            self.score_sums.extend([0.0] * missing)
+            self.score_counts.extend([0] * missing)
+        for i, (total, count) in enumerate(zip(other.score_sums, other.score_counts)):
+            self.score_sums[i] += total
+            self.score_counts[i] += count
+        return self
+
+    def score_curve(self):
+        """
+        Mean score after each move, over the games that got that far
+        :return: list of mean scores, index 0 is unused and holds 0
+        """
+        return [total / count if count else 0.0 for total, count in zip(self.score_sums, self.score_counts)]
+
+    def to_dict(self):
+        return {
+            'games': self.games,
+            'finished': self.finished,
+            'wins': self.wins,
+            'moves': self.moves,
+            'undos': self.undos,
+            'redos': self.redos,
+            'directions': dict(self.directions),
+            'merges': {str(value): count for value, count in sorted(self.merges.items())},
+            'game_lengths': {str(bucket): count for bucket, count in sorted(self.lengths.items())},
+            'score_curve': self.score_curve(),
+        }
+
+
+def analyze(records, length_bucket=100):
+    """
+    Aggregate an iterable of records in a single pass
+    :param records: iterable of models.replay.GameRecord, e.g. a ReplayReader
+    :param length_bucket: width of a game length histogram bucket
+    :return: GameStats
+    """
+    stats = GameStats(length_bucket)
+    replayer = Replayer()
+    for record in records:
+        stats.add(record, replayer.steps(record))
+    return stats
+
+
+def split_archive(path, chunks):
+    """
+    Split an archive into chunks of about the same size, cut at record boundaries.
+    Only record headers are read.
+    :param path: archive file
+    :param chunks: number of chunks wanted
+    :return: list of (start, end) byte ranges
+    """
+    with ReplayReader(path) as reader:
+        total = len(reader)
+        if not total:
+            return []
+        chunk_size = max(1, total // chunks)
+        ranges = []
+        start = 0
+        for offset in (offset for offset, _ in reader.records()):
+            if offset - start >= chunk_size:
+                ranges.append((start, offset))
+                start = offset
+        ranges.append((start, total))
+    return ranges
+
+
+def _analyze_chunk(task):
+    path, start, end, length_bucket = task
+    with ReplayReader(path) as reader:
+        stats = analyze((record for _, record in reader.records(start, end)), length_bucket)
+    return stats
+
+
+def analyze_archive(path, workers=None, length_bucket=100):
+    """
+    Aggregate an archive, chunks of it are processed in parallel
+    :param path: archive file written by models.replay.GameRecorder
+    :param workers: number of worker processes, None for one per core, 0 to analyze in this process
+    :param length_bucket: width of a game length histogram bucket
+    :return: GameStats
+    """
+    if workers == 0:
+        with ReplayReader(path) as reader:
+            return analyze(reader, length_bucket)
+    workers = workers or os.cpu_count() or 1
+    tasks = [(path, start, end, length_bucket) for start, end in split_archive(path, workers * 4)]
+    stats = GameStats(length_bucket)
+    with multiprocessing.Pool(workers) as pool:
+        for chunk in pool.imap_unordered(_analyze_chunk, tasks):
+            stats.merge(chunk)
+    return stats
@@ -0,0 +1,266 @@
+#!/usr/bin/env python
+# coding: UTF-8
+# author: Sylphia
+# created:  19:10
+"""
+Differential check of a move engine against the vector engine of models.game.Game.
+
+An engine is a callable taking a list of boards (matrix[x][y] lists of tile values, like Game.matrix) and a direction,
+and returning a list of (new board in the same list form, score gained), one per board, without spawning. ENGINES
+holds the engines of this repository, load_engine also accepts a "module:function" spec for anything else.
+
+The reference memoizes the move of every row or column per direction. Lines it has not seen yet are packed into
+boards, size lines at a time, and moved through a real Game (no bitboard, spawns removed again), the boards of a batch
+are then composed from known lines, which is what makes millions of comparisons affordable. Because that relies on
+lines moving independently, every full_check_every board is also moved as a whole by Game and must match.
+The first mismatch is shrunk to a minimal board by removing and lowering tiles while the engines still disagree.
+"""
+import importlib
+import random
+from collections import namedtuple
+
+from models.directions import Directions
+from models.game import Game
+from models.tile_event import TileEventTypes
+
+# A board on which an engine disagrees with the reference, boards are matrix[x][y] lists
+Mismatch = namedtuple('Mismatch', ['board', 'direction', 'expected', 'expected_score', 'actual', 'actual_score'])
+
+
+class ReferenceEngine(object):
+    """
+    Game.move on the vector engine, as an engine callable
+    """
+
+    def __init__(self, size, cache_size=1 << 20, full_check_every=1000):
+        """
+        :param size: board size
+        :param cache_size: number of memoized line moves per direction, the cache is cleared when it's full
+        :param full_check_every: move every n-th board as a whole too, 0 to never do it
+        """
+        self.size = size
+        self.cache_size = cache_size
+        self.full_check_every = full_check_every
+        self.boards = 0     # boards moved so far
+        self.__caches = {direction: {} for direction in Directions}   # direction -> line -> (moved line, score)
+        self.__spawns = []
+        self.__merges = []  # (dest x, dest y, merged value) of the last move
+        # the target is out of reach so merging never ends the game, game over is reset before every move anyway
+        self.__game = Game(size, target=1 << 62, use_bitboard=False, history_depth=1, seed=0)
+        self.__game.tile_batch_event += self.__on_tiles
+
+    def __on_tiles(self, buffer):
+        self.__spawns = []
+        self.__merges = []
+        for event_type, x, y, dest_x, dest_y, value in buffer:
+            if event_type == TileEventTypes.Spawn.value:
+                self.__spawns.append((x, y))
+            elif event_type == TileEventTypes.MoveAndMerge.value:
+                self.__merges.append((dest_x, dest_y, value))
+
+    def move_board(self, board, direction: Directions):
+        """
+        Move a whole board with Game
+        :return: Tuple of (new board, score gained)
+        """
+        game = self.__game
+        game.load(board)
+        self.__spawns = []
+        self.__merges = []
+        game.move(direction)
+        for x, y in self.__spawns:
+            game.matrix[x][y] = 0
+        return [list(column) for column in game.matrix], game.score
+
+    def __learn(self, lines, direction, by_rows):
+        """
+        Move unknown lines with Game, size of them per board, and memoize them. The score of a line is the sum of the
+        merges ending in it
+        :param lines: list of line tuples
+        """
+        size = self.size
+        cache = self.__caches[direction]
+        empty = (0,) * size
+        for start in range(0, len(lines), size):
+            chunk = lines[start:start + size]
+            chunk += [empty] * (size - len(chunk))
+            board = [list(column) for column in zip(*chunk)] if by_rows else [list(line) for line in chunk]
+            moved, _ = self.move_board(board, direction)
+            scores = [0] * size
+            for x, y, value in self.__merges:
+                scores[y if by_rows else x] += value
+            for index, moved_line in enumerate(zip(*moved) if by_rows else moved):
+                cache[chunk[index]] = (tuple(moved_line), scores[index])
+
+    def __call__(self, boards, direction: Directions):
+        cache = self.__caches[direction]
+        if len(cache) + len(boards) * self.size > self.cache_size:
+            cache.clear()
+        by_rows = direction in (Directions.Left, Directions.Right)
+        board_lines = [list(zip(*board)) if by_rows else list(map(tuple, board)) for board in boards]
+        missing = {line: None for lines in board_lines for line in lines if line not in cache}
+        if missing:
+            self.__learn(list(missing), direction, by_rows)
+        full_check_every = self.full_check_every
+        results = []
+        for board, lines in zip(boards, board_lines):
+            self.boards += 1
+            moves = [cache[line] for line in lines]
+            if by_rows:
+                moved = list(map(list, zip(*[line for line, _ in moves])))
+            else:
+                moved = [list(line) for line, _ in moves]
+            score = sum([score for _, score in moves])
+            if full_check_every and self.boards % full_check_every == 0:
+                whole = self.move_board(board, direction)
+                if whole != (moved, score):
+                    raise AssertionError('Game moves {} {} to {}, its lines to {}'.format(
+                        board, direction.name, whole, (moved, score)))
+            results.append((moved, score))
+        return results
+
+
+def bitboard_engine(boards, direction: Directions):
+    """
+    models.bitboard, 4x4 boards with tiles up to 2 ** bitboard.MAX_EXPONENT
+    """
+    from models import bitboard
+
+    move = bitboard.MOVES[direction]
+    results = []
+    for board in boards:
+        new_board, score = move(bitboard.from_matrix(board))
+        results.append((bitboard.to_matrix(new_board), score))
+    return results
+
+
+def vectorized_engine(boards, direction: Directions):
+    """
+    models.vectorized, needs numpy
+    """
+    from models import vectorized
+
+    new_boards, scores, _ = vectorized.move(vectorized.from_matrices(boards), direction)
+    return list(zip(new_boards.tolist(), scores.tolist()))
+
+
+ENGINES = {
+    'bitboard': bitboard_engine,
+    'vectorized': vectorized_engine,
+}
+
+
+def load_engine(spec):
+    """
+    Get an engine by name
+    :param spec: name in ENGINES, or "module:function" of any engine callable
+    :return: engine callable
+    """
+    if spec in ENGINES:
+        return ENGINES[spec]
+    module_name, _, name = spec.partition(':')
+    if not name:
+        raise ValueError("Unknown engine '{}', expected one of {} or module:function".format(
+            spec, ', '.join(sorted(ENGINES))))
+    return getattr(importlib.import_module(module_name), name)
+
+
+def random_boards(rnd, size, count, max_exponent=11):
+    """
+    Generate boards of every density, each board draws its own fill and largest exponent so both sparse boards and
+    crowded boards full of merges come up
+    :return: list of matrix[x][y] lists
+    """
+    boards = []
+    cells = size * size
+    choices = rnd.choices
+    for _ in range(count):
+        top = rnd.randint(1, max_exponent)
+        values = choices([0] * rnd.randint(0, top) + [1 << exponent for exponent in range(1, top + 1)], k=cells)
+        boards.append([values[x:x + size] for x in range(0, cells, size)])
+    return boards
+
+
+def _disagree(engine, reference, board, direction):
+    return reference.move_board(board, direction) != tuple(engine([board], direction)[0])
+
+
+def shrink(engine, reference, board, direction: Directions):
+    """
+    Reduce a failing board while the engine still disagrees with the reference: halve all tiles, empty single cells,
+    halve single tiles, until no step keeps the failure, then try lower directions
+    :return: Tuple of (smallest failing board, direction)
+    """
+    board = [list(column) for column in board]
+    size = len(board)
+    progress = True
+    while progress:
+        progress = False
+        halved = [[value // 2 if value > 2 else value for value in column] for column in board]
+        if halved != board and _disagree(engine, reference, halved, direction):
+            board = halved
+            progress = True
+        for x in range(size):
+            for y in range(size):
+                value = board[x][y]
+                for smaller in (0, value // 2) if value > 2 else (0,) if value else ():
+                    board[x][y] = smaller
+                    if _disagree(engine, reference, board, direction):
+                        progress = True
+                        break
+                    board[x][y] = value
+    for other in Directions:    # prefer the lowest direction value that still fails, so reports are stable
+        if other.value < direction.value and _disagree(engine, reference, board, other):
+            return board, other
+    return board, direction
+
+
+def check(engine, size=4, count=1000000, seed=0, batch_size=4096, max_exponent=11, full_check_every=1000,
+          on_progress=None):
+    """
+    Compare an engine with the reference on random boards
+    :param engine: engine callable
+    :param size: board size
+    :param count: number of boards
+    :param seed: seed of the board generator
+    :param batch_size: boards per engine call, every batch is moved in one random direction
+    :param max_exponent: largest tile exponent of generated boards
+    :param full_check_every: see ReferenceEngine
+    :param on_progress: called with the number of boards compared after every batch, or None
+    :return: Tuple of (boards compared, minimal Mismatch or None)
+    """
+    rnd = random.Random(seed)
+    reference = ReferenceEngine(size, full_check_every=full_check_every)
+    directions = list(Directions)
+    compared = 0
+    while compared < count:
+        direction = directions[rnd.randrange(len(directions))]
+        boards = random_boards(rnd, size, min(batch_size, count - compared), max_exponent)
+        expected = reference(boards, direction)
+        actual = engine(boards, direction)
+        for board, (expected_board, expected_score), (actual_board, actual_score) in zip(boards, expected, actual):
+            compared += 1
+            if expected_board != actual_board or expected_score != actual_score:
+                board, direction = shrink(engine, reference, board, direction)
+                expected_board, expected_score = reference.move_board(board, direction)
+                actual_board, actual_score = engine([board], direction)[0]
+                return compared, Mismatch(board, direction, expected_board, expected_score, actual_board,
+                                          actual_score)
+        if on_progress:
+            on_progress(compared)
+    return compared, None
+
+
+def format_board(board):
+    """
+    Render a matrix[x][y] board as rows of text
+    """
+    width = max(len(str(value)) for column in board for value in column)
+    return '\n'.join(' '.join(str(board[x][y]).rjust(width) for x in range(len(board))) for y in range(len(board)))
+
+
+def format_mismatch(mismatch: Mismatch):
+    return 'Moving {} on\n{}\nexpected score {}\n{}\ngot score {}\n{}'.format(
+        mismatch.direction.name, format_board(mismatch.board), mismatch.expected_score,
+        format_board(mismatch.expected), mismatch.actual_score, format_board(mismatch.actual))
+
@@ -0,0 +1,85 @@
+#!/usr/bin/env python
+# coding: UTF-8
+# author: Sylphia
+# created:  20:33
+import random
+
+from models.game import Game
+
+
+class RandomPolicy(object):
+    """
+    Pick a random legal move
+    """
+
+    def __init__(self, seed=None):
+        self.random = random.Random(seed)
+
+    def reset(self, seed):
+        self.random.seed(seed)
+
+    def __call__(self, game: Game):
+        legal_moves = sorted(game.legal_moves(), key=lambda direction: direction.value)
+        return self.random.choice(legal_moves) if legal_moves else None
+
+
+class GreedyPolicy(object):
+    """
+    Pick the move with the highest immediate score, ties are broken by the number of empty cells left
+    """
+
+    def __init__(self, seed=None):
+        self.__scratch = None
+
+    def reset(self, seed):
+        pass
+
+    def __call__(self, game: Game):
+        scratch = self.__scratch
+        if scratch is None or scratch.size != game.size:
+            scratch = self.__scratch = Game(game.size, game.target, history_depth=1, seed=0)
+        best = None
+        best_key = None
+        for direction in sorted(game.legal_moves(), key=lambda item: item.value):
+            scratch.load(game.matrix)
+            scratch.move(direction)
+            key = (scratch.score, scratch.empty_cell_count)
+            if best_key is None or key > best_key:
+                best, best_key = direction, key
+        return best
+
+
+class SolverPolicy(object):
+    """
+    Let the expectimax solver pick the move
+    """
+
+    def __init__(self, seed=None, time_budget_ms=40):
+        from ai.expectimax import ExpectimaxSolver  # builds its heuristic tables on import, only pay for it when used
+        self.solver = ExpectimaxSolver(time_budget_ms=time_budget_ms)
+
+    def reset(self, seed):
+        pass    # keeps the transposition table, positions carry over between games
+
+    def __call__(self, game: Game):
+        return self.solver.best_move(game)
+
+
+POLICIES = {
+    'random': RandomPolicy,
+    'greedy': GreedyPolicy,
+    'expectimax': SolverPolicy,
+}
+
+
+def create_policy(name, seed=None):
+    """
+    Create a policy by name
+    :param name: one of POLICIES
+    :param seed: seed for policies that use randomness
+    :return: callable taking a Game and returning a Directions value, or None when it has no move,
+             reset(seed) prepares it for the next game
+    """
+    if name not in POLICIES:
+        raise ValueError("Unknown policy '{}', expected one of {}".format(name, ', '.join(sorted(POLICIES))))
+    return POLICIES[name](seed)
@@ -0,0 +1,176 @@
+#!/usr/bin/env python
+# coding: UTF-8
+# author: Sylphia
+# created:  20:52
+import multiprocessing
+import os
+import time
+from collections import Counter, namedtuple
+
+from models.game import Game
+from models.replay import GameRecorder
+from simulation.policies import create_policy
+
+GameResult = namedtuple('GameResult', ['index', 'seed', 'score', 'max_tile', 'moves', 'won', 'seconds', 'log'])
+GameTask = namedtuple('GameTask', ['index', 'seed', 'size', 'target', 'policy', 'max_moves', 'record'])
+GameTask.__new__.__defaults__ = (False,)
+
+_worker_policies = {}     # policy instances of the current worker process, reused across games
+
+
+def play_game(task: GameTask):
+    """
+    Play a headless game to the end, runs in a worker process
+    :param task: what to play
+    :return: GameResult
+    """
+    policy = _worker_policies.get(task.policy)
+    if policy is None:
+        policy = _worker_policies[task.policy] = create_policy(task.policy)
+    policy.reset(task.seed)    # the same game plays the same moves whichever worker runs it
+    game = Game(task.size, task.target, history_depth=1, seed=task.seed)
+    won = []
+    game.game_over_event += won.append
+    logs = []
+    recorder = GameRecorder(game, logs.append) if task.record else None
+    game.new_game()
+    moves = 0
+    start = time.perf_counter()
+    while not game.game_over and (not task.max_moves or moves < task.max_moves):
+        direction = policy(game)
+        if direction is None:
+            break
+        game.move(direction)
+        moves += 1
+    seconds = time.perf_counter() - start
+    if recorder:
+        recorder.close()
+    max_tile = max(max(column) for column in game.matrix)
+    return GameResult(task.index, task.seed, game.score, max_tile, moves, bool(won and won[0]), seconds,
+                      logs[0] if logs else None)
+
+
+class TournamentStats(object):
+    """
+    Running aggregate of game results
+    """
+
+    def __init__(self, score_bucket=1000):
+        """
+        :param score_bucket: width of a score histogram bucket
+        """
+        self.score_bucket = score_bucket
+        self.games = 0
+        self.wins = 0
+        self.moves = 0
+        self.game_seconds = 0.0
+        self.total_score = 0
+        self.best_score = 0
+        self.score_histogram = Counter()    # bucket start -> games
+        self.max_tiles = Counter()          # max tile -> games
+
+    def add(self, result: GameResult):
+        self.games += 1
+        self.wins += result.won
+        self.moves += result.moves
+        self.game_seconds += result.seconds
+        self.total_score += result.score
+        self.best_score = max(self.best_score, result.score)
+        self.score_histogram[result.score // self.score_bucket * self.score_bucket] += 1
+        self.max_tiles[result.max_tile] += 1
+
+    def merge(self, other):
+        """
+        Add the results of another aggregate, e.g. of a different shard
+        :param other: TournamentStats with the same score bucket
+        :return: self
+        """
+        self.games += other.games
+        self.wins += other.wins
+        self.moves += other.moves
+        self.game_seconds += other.game_seconds
+        self.total_score += other.total_score
+        self.best_score = max(self.best_score, other.best_score)
+        self.score_histogram.update(other.score_histogram)
+        self.max_tiles.update(other.max_tiles)
+        return self
+
+    @property
+    def win_rate(self):
+        return self.wins / self.games if self.games else 0.0
+
+    @property
+    def mean_score(self):
+        return self.total_score / self.games if self.games else 0.0
+
+    def to_dict(self, wall_seconds=None):
+        data = {
+            'games': self.games,
+            'wins': self.wins,
+            'win_rate': self.win_rate,
+            'mean_score': self.mean_score,
+            'best_score': self.best_score,
+            'moves': self.moves,
+            'moves_per_second_per_worker': self.moves / self.game_seconds if self.game_seconds else 0.0,
+            'score_histogram': {str(bucket): count for bucket, count in sorted(self.score_histogram.items())},
+            'max_tiles': {str(tile): count for tile, count in sorted(self.max_tiles.items())},
+        }
+        if wall_seconds is not None:
+            data['seconds'] = wall_seconds
+            data['moves_per_second'] = self.moves / wall_seconds if wall_seconds else 0.0
+        return data
+
+    def format(self, wall_seconds=None):
+        data = self.to_dict(wall_seconds)
+        lines = ['games: {games}  wins: {wins}  win rate: {win_rate:.2%}'.format(**data),
+                 'mean score: {mean_score:.1f}  best score: {best_score}'.format(**data)]
+        if wall_seconds is not None:
+            lines.append('moves: {moves}  seconds: {seconds:.2f}  moves/sec: {moves_per_second:.0f}'.format(**data))
+        lines.append('max tile:')
+        lines.extend('  {:>6}: {}'.format(tile, count) for tile, count in sorted(self.max_tiles.items()))
+        lines.append('score:')
+        lines.extend('  {:>6}-{:<6}: {}'.format(bucket, bucket + self.score_bucket - 1, count)
+                     for bucket, count in sorted(self.score_histogram.items()))
+        return '\n'.join(lines)
+
+
+def run_tournament(games, workers=None, size=4, target=2048, policy='random', seed=0, max_moves=0, chunk_size=None,
+                   on_result=None, score_bucket=1000, archive=None):
+    """
+    Play headless games across a process pool
+    :param games: number of games
+    :param workers: number of worker processes, None for one per core, 0 to play in this process
+    :param size: board size
+    :param target: target tile
+    :param policy: policy name, see simulation.policies.POLICIES
+    :param seed: seed of the first game, game i is seeded with seed + i
+    :param max_moves: stop a game after this many moves, 0 for no limit
+    :param chunk_size: games handed to a worker at once, None to pick one from the number of games and workers
+    :param on_result: called with every GameResult as soon as it arrives
+    :param score_bucket: width of a score histogram bucket
+    :param archive: binary file to append the game records to (see models.replay), None to not record
+    :return: Tuple of (TournamentStats, wall clock seconds)
+    """
+    create_policy(policy)   # fail early on unknown names
+    tasks = (GameTask(index, seed + index, size, target, policy, max_moves, archive is not None)
+             for index in range(games))
+    stats = TournamentStats(score_bucket)
+    start = time.perf_counter()
+    if workers == 0:
+        collect(map(play_game, tasks), stats, archive, on_result)
+        return stats, time.perf_counter() - start
+
+    workers = workers or os.cpu_count() or 1
+    chunk_size = chunk_size or max(1, min(64, games // (workers * 8)))
+    with multiprocessing.Pool(workers) as pool:
+        collect(pool.imap_unordered(play_game, tasks, chunk_size), stats, archive, on_result)
+    return stats, time.perf_counter() - start
+
+
+def collect(results, stats, archive, on_result):
+    for result in results:
+        stats.add(result)
+        if archive is not None:
+            archive.write(result.log)
+        if on_result:
+            on_result(result)
@@ -0,0 +1,111 @@
+#!/usr/bin/env python
+# coding: UTF-8
+# author: Sylphia
+# created:  23:40
+import os
+import random
+import tempfile
+import unittest
+
+from models.directions import Directions
+from models.game import Game
+from models.replay import GameRecorder, parse_records, replay
+from simulation.analytics import GameStats, Replayer, analyze, analyze_archive, split_archive
+
+
+def record_games(size, count, seed):
+    chunks = []
+    game = Game(size, seed=seed)
+    recorder = GameRecorder(game, chunks.append)
+    rnd = random.Random(seed)
+    directions = list(Directions)
+    for _ in range(count):
+        game.new_game()
+        while not game.game_over:
+            choice = rnd.random()
+            if choice < 0.05:
+                game.undo()
+            elif choice < 0.08:
+                game.undo()
+                game.redo()
+            else:
+                game.move(rnd.choice(directions))
+    recorder.close()
+    return b''.join(chunks)
+
+
+class TestAnalytics(unittest.TestCase):
+    def testReplayerMatchesGame(self):
+        for size in (3, 4, 5):
+            archive = record_games(size, 3, size)
+            replayer = Replayer()
+            for _, record in parse_records(archive):
+                game = Game(size, history_depth=None)
+                merged = []
+                game.tile_batch_event += lambda buffer: merged.append(
+                    sorted(value for event_type, x, y, dest_x, dest_y, value in buffer if event_type == 3))
+                for (direction, control), step in zip(replay(record, game), replayer.steps(record)):
+                    self.assertEqual((step.direction, step.control), (direction, control))
+                    self.assertEqual(step.score, game.score)
+                    self.assertEqual(step.moves, len(game.undo_history))
+                    if direction is not None:
+                        self.assertEqual(sorted(step.merged), merged.pop())
+
+    def testReplayerKeepsUndoDepth(self):
+        game = Game(4, seed=3, history_depth=5)
+        chunks = []
+        recorder = GameRecorder(game, chunks.append)
+        moved = []
+        game.move_complete_event += lambda: moved.append(True)
+        game.new_game()
+        rnd = random.Random(3)
+        while len(game.undo_history) < 5:
+            game.move(rnd.choice(list(Directions)))
+        for _ in range(20):
+            game.move(rnd.choice(list(Directions)))
+        for _ in range(5):
+            game.undo()
+        recorder.close()
+        _, record = next(parse_records(b''.join(chunks)))
+        replayed = Game(4, history_depth=5)
+        for (direction, control), step in zip(replay(record, replayed), Replayer(history_depth=5).steps(record)):
+            self.assertEqual((step.direction, step.control, step.score), (direction, control, replayed.score))
+        self.assertEqual(step.score, game.score)
+        self.assertEqual(step.moves, len(moved) - 5)     # moves beyond the undo depth still count
+
+    def testStats(self):
+        archive = record_games(4, 5, 1)
+        records = [record for _, record in parse_records(archive)]
+        stats = analyze(records, length_bucket=50)
+        self.assertEqual(stats.games, 5)
+        self.assertEqual(stats.finished, 5)
+        self.assertGreater(stats.undos, 0)
+        self.assertGreater(stats.redos, 0)
+        self.assertEqual(sum(stats.directions.values()), stats.moves)
+        self.assertEqual(sum(stats.lengths.values()), 5)
+        self.assertGreater(sum(stats.merges.values()), 0)
+        curve = stats.score_curve()
+        self.assertEqual(curve[0], 0.0)
+        self.assertTrue(all(score >= 0 for score in curve))
+
+        first = analyze(records[:2], length_bucket=50)
+        second = analyze(records[2:], length_bucket=50)
+        self.assertEqual(GameStats(50).merge(first).merge(second).to_dict(), stats.to_dict())
+
+    def testArchive(self):
+        path = os.path.join(tempfile.mkdtemp(), 'games.bin')
+        with open(path, 'wb') as archive:
+            archive.write(record_games(4, 6, 2))
+        ranges = split_archive(path, 3)
+        self.assertEqual(ranges[0][0], 0)
+        self.assertEqual(ranges[-1][1], os.path.getsize(path))
+        self.assertTrue(all(first[1] == second[0] for first, second in zip(ranges, ranges[1:])))
+        local = analyze_archive(path, workers=0)
+        pooled = analyze_archive(path, workers=2)
+        self.assertEqual(local.games, 6)
+        self.assertEqual(local.to_dict(), pooled.to_dict())
+        os.remove(path)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,78 @@
+#!/usr/bin/env python
+# coding: UTF-8
+# author: Sylphia
+# created:  14:40
+import unittest
+
+from tests.fakes import FakeRoot
+from views.animation import AnimationScheduler, Tween
+
+
+class TestAnimationScheduler(unittest.TestCase):
+    def setUp(self) -> None:
+        self.now = 0.0
+        self.root = FakeRoot()
+        self.scheduler = AnimationScheduler(self.root, clock=lambda: self.now)
+
+    def testFramesAdvanceEveryTween(self):
+        progress = {'a': [], 'b': []}
+        done = []
+        self.scheduler.start(Tween(100, progress['a'].append, lambda: done.append('a')))
+        self.scheduler.start(Tween(50, progress['b'].append, lambda: done.append('b')))
+        self.assertEqual(len(self.root.callbacks), 1)   # one frame callback for any number of tweens
+        for _ in range(5):
+            self.now += 0.03125
+            self.root.run_frame()
+        self.assertEqual(progress['a'], [0.3125, 0.625, 0.9375, 1])
+        self.assertEqual(progress['b'], [0.625, 1])
+        self.assertEqual(done, ['b', 'a'])
+        self.assertEqual(len(self.scheduler), 0)
+        self.assertEqual(self.root.callbacks, {})   # idle, no more frames
+
+    def testCancelAndFinish(self):
+        progress = []
+        done = []
+        first = self.scheduler.start(Tween(100, progress.append, lambda: done.append('first')))
+        second = self.scheduler.start(Tween(100, progress.append, lambda: done.append('second')))
+        self.scheduler.cancel(first)
+        self.scheduler.finish(second)
+        self.scheduler.finish(second)
+        self.assertEqual(progress, [1])
+        self.assertEqual(done, ['second'])
+
+    def testFinishAll(self):
+        done = []
+
+        def chain():
+            done.append('first')
+            self.scheduler.start(Tween(100, lambda progress: None, lambda: done.append('chained')))
+
+        self.scheduler.start(Tween(100, lambda progress: None, chain))
+        self.scheduler.finish_all()
+        self.assertEqual(done, ['first', 'chained'])
+        self.assertEqual(len(self.scheduler), 0)
+        self.assertEqual(self.root.callbacks, {})
+
+    def testIdleEvent(self):
+        idle = []
+        self.scheduler.idle_event += lambda: idle.append(len(self.scheduler))
+        self.scheduler.finish_all()
+        self.assertEqual(idle, [])  # nothing was running
+        self.scheduler.start(Tween(100, lambda progress: None))
+        self.scheduler.finish_all()
+        self.scheduler.start(Tween(50, lambda progress: None))
+        self.now += 0.05
+        self.root.run_frame()
+        self.assertEqual(idle, [0, 0])
+
+    def testCancelDuringFrame(self):
+        later = Tween(100, lambda progress: self.fail('cancelled tween updated'))
+        self.scheduler.start(Tween(100, lambda progress: self.scheduler.cancel(later)))
+        self.scheduler.start(later)
+        self.now += 0.01
+        self.root.run_frame()
+        self.assertEqual(len(self.scheduler), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
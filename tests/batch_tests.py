@@ -0,0 +1,55 @@
+#!/usr/bin/env python
+# coding: UTF-8
+# author: Sylphia
+# created:  22:05
+import random
+import unittest
+
+from models.batch import BatchSimulator
+from models.directions import Directions
+
+
+def random_moves(seed, steps):
+    rnd = random.Random(seed)
+    directions = list(Directions)
+    return [rnd.choice(directions) for _ in range(steps)]
+
+
+class TestBatchSimulator(unittest.TestCase):
+    def testNewGame(self):
+        batch = BatchSimulator(10, size=5, seed=1)
+        boards = batch.get_boards()
+        self.assertEqual(len(boards), 10 * 25)
+        for index in range(10):
+            tiles = [value for value in boards[index * 25:(index + 1) * 25] if value]
+            self.assertEqual(len(tiles), 2)
+            self.assertTrue(all(value in (1, 2) for value in tiles))
+
+    def testBitboardMatchesGenericEngine(self):
+        moves = random_moves(2, 300)
+        fast = BatchSimulator(20, seed=3).run(moves)
+        generic = BatchSimulator(20, seed=3, use_bitboard=False).run(moves)
+        self.assertEqual(fast.get_boards(), generic.get_boards())
+        self.assertEqual(fast.scores, generic.scores)
+        self.assertEqual(fast.move_counts, generic.move_counts)
+        self.assertEqual(fast.game_over, generic.game_over)
+
+    def testSmallLineCacheMatches(self):
+        moves = random_moves(7, 200)
+        bounded = BatchSimulator(10, size=6, seed=8, cache_size=4).run(moves)
+        unbounded = BatchSimulator(10, size=6, seed=8).run(moves)
+        self.assertEqual(bounded.get_boards(), unbounded.get_boards())
+        self.assertEqual(bounded.scores, unbounded.scores)
+
+    def testPerGameDirections(self):
+        batch = BatchSimulator(2, size=6, seed=4)
+        before = [batch.get_matrix(0), batch.get_matrix(1)]
+        batch.step([Directions.Left, Directions.Right])
+        for index, column in ((0, 0), (1, 5)):
+            values = [value for x in range(6) for value in before[index][x] if value]
+            self.assertEqual(sorted(v for v in batch.get_matrix(index)[column] if v)[-1], max(values))
+
+    def testGamesEnd(self):
+        batch = BatchSimulator(5, seed=5).run(random_moves(6, 5000))
+        self.assertEqual(bytes(batch.game_over), b'\x01' * 5)
+        self.assertTrue(all(score > 0 for score in batch.scores))
@@ -0,0 +1,130 @@
+#!/usr/bin/env python
+# coding: UTF-8
+# author: Sylphia
+# created:  20:48
+import os
+import random
+import subprocess
+import sys
+import unittest
+from unittest import mock
+
+from benchmarks.import_time import ROOT
+from models import bitboard
+from models.directions import Directions
+from models.game import Game
+from models.tile_event import TileSpawnEvent
+
+
+def random_matrix(rnd, size=4, max_exponent=11):
+    return [[rnd.choice([0, 0, 0] + [1 << e for e in range(1, max_exponent + 1)]) for _ in range(size)]
+            for __ in range(size)]
+
+
+def reference_move(matrix, direction):
+    """
+    Move a matrix with the scalar Game engine, the spawned tile is removed again
+    :return: Tuple of (new matrix, score gained)
+    """
+    spawns = []
+    game = Game(use_bitboard=False)
+    game.tile_event += lambda e: spawns.append(e) if isinstance(e, TileSpawnEvent) else None
+    game.load(matrix)
+    game.move(direction)
+    for spawn in spawns:
+        game.matrix[spawn.x][spawn.y] = 0
+    return game.matrix, game.score
+
+
+class TestBitboardPacking(unittest.TestCase):
+    def testRoundTrip(self):
+        rnd = random.Random(1)
+        for _ in range(100):
+            matrix = random_matrix(rnd, max_exponent=15)
+            self.assertEqual(bitboard.to_matrix(bitboard.from_matrix(matrix)), matrix)
+
+    def testCountEmpty(self):
+        rnd = random.Random(2)
+        self.assertEqual(bitboard.count_empty(0), 16)
+        for _ in range(100):
+            matrix = random_matrix(rnd)
+            expected = sum(1 for column in matrix for value in column if not value)
+            self.assertEqual(bitboard.count_empty(bitboard.from_matrix(matrix)), expected)
+
+    def testTranspose(self):
+        matrix = [[1 << (x * 4 + y) if x or y else 0 for y in range(4)] for x in range(4)]
+        transposed = bitboard.to_matrix(bitboard.transpose(bitboard.from_matrix(matrix)))
+        self.assertEqual(transposed, [list(row) for row in zip(*matrix)])
+
+
+class TestBitboardMoves(unittest.TestCase):
+    def testMatchesGame(self):
+        rnd = random.Random(3)
+        for _ in range(500):
+            matrix = random_matrix(rnd)
+            for direction in Directions:
+                expected_matrix, expected_score = reference_move(matrix, direction)
+                board, score = bitboard.move(bitboard.from_matrix(matrix), direction)
+                self.assertEqual(bitboard.to_matrix(board), expected_matrix, (matrix, direction))
+                self.assertEqual(score, expected_score, (matrix, direction))
+
+    def testGameSelectsBitboard(self):
+        self.assertTrue(Game().use_bitboard)
+        self.assertFalse(Game(size=5).use_bitboard)
+
+    def testGameWithBitboard(self):
+        game = Game()
+        game.load([[2, 2, 0, 0], [0, 0, 0, 0], [4, 0, 0, 4], [0, 0, 0, 0]])
+        game.move(Directions.Up)
+        self.assertEqual(game.score, 12)
+        self.assertEqual(game.matrix[0][0], 4)
+        self.assertEqual(game.matrix[2][0], 8)
+        self.assertEqual(game.empty_cell_count, 13)
+        self.assertEqual(sum(1 for column in game.matrix for value in column if not value), 13)
+        game.undo()
+        self.assertEqual(game.matrix, [[2, 2, 0, 0], [0, 0, 0, 0], [4, 0, 0, 4], [0, 0, 0, 0]])
+
+    def testWinOnAnyMerge(self):
+        for use_bitboard in (True, False):
+            game = Game(use_bitboard=use_bitboard)
+            won = []
+            game.game_over_event += won.append
+            game.load([[1024, 2, 0, 0], [1024, 2, 0, 0], [0, 0, 0, 0], [0, 0, 0, 0]])
+            game.move(Directions.Left)
+            self.assertEqual(won, [True])
+
+    def testCachedTablesMatchBuiltTables(self):
+        loaded = (bitboard._row_left, bitboard._row_right, bitboard._col_up, bitboard._col_down,
+                  bitboard._score_left, bitboard._score_right)
+        self.assertEqual(list(loaded), list(bitboard._build_tables()))
+        self.assertEqual(list(bitboard._load_tables()), list(loaded))
+
+    def testTablesPathStableAcrossProcesses(self):
+        command = [sys.executable, '-c', 'from models import bitboard; print(bitboard._tables_path())']
+        paths = [subprocess.run(command, cwd=ROOT, stdout=subprocess.PIPE, universal_newlines=True, check=True).stdout
+                 for _ in range(2)]
+        self.assertEqual(paths[0], paths[1])
+        self.assertEqual(paths[0].strip(), bitboard._tables_path())
+        tables = [name for name in os.listdir(os.path.dirname(paths[0].strip())) if name.endswith('.tables')]
+        self.assertEqual(tables, [os.path.basename(paths[0].strip())])
+
+    def testTablesKeyedByConstants(self):
+        path = bitboard._tables_path()
+        for name, value in (('MAX_EXPONENT', 11), ('SIZE', 5), ('_TABLE_TYPES', 'QQQQII')):
+            with mock.patch.object(bitboard, name, value):
+                self.assertNotEqual(bitboard._tables_path(), path, name)
+        self.assertEqual(bitboard._tables_path(), path)
+
+    def testTruncatedTablesRebuilt(self):
+        path = bitboard._tables_path()
+        with open(path, 'rb') as f:
+            data = f.read()
+        try:
+            with open(path, 'wb') as f:
+                f.write(data[:-2])
+            self.assertEqual(list(bitboard._load_tables()), list(bitboard._build_tables()))
+            with open(path, 'rb') as f:
+                self.assertEqual(f.read(), data)
+        finally:
+            with open(path, 'wb') as f:
+                f.write(data)
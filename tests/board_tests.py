@@ -0,0 +1,103 @@
+#!/usr/bin/env python
+# coding: UTF-8
+# author: Sylphia
+# created:  09:20
+import random
+import unittest
+
+from models.directions import Directions
+from models.game import Game
+from tests.fakes import FakeRoot, FakeVar, StubTile
+from views.animation import AnimationScheduler
+from views.board import Board
+
+
+class HeadlessBoard(Board):
+    """
+    The tile rendering of Board without a Tk window, tiles are StubTiles
+    """
+
+    def __init__(self, game):
+        self.cells = [[(50 + x * 100, 50 + y * 100) for y in range(game.size)] for x in range(game.size)]
+        self.tiles = [[None] * game.size for _ in range(game.size)]
+        self.score_var = FakeVar()
+        self._attach_game(game, AnimationScheduler(FakeRoot()), self.score_var)
+
+    def spawn_tile(self, x, y, value: int):
+        if self.tiles[x][y]:
+            self.tiles[x][y].destroy()
+        tile = StubTile(value, self.animations)
+        tile.spawn_at(None, *self.cells[x][y])
+        self.tiles[x][y] = tile
+
+
+class TestBoardRendering(unittest.TestCase):
+    def assertRendered(self, board, game):
+        board.animations.finish_all()
+        for x in range(game.size):
+            for y in range(game.size):
+                tile = board.tiles[x][y]
+                if not game.matrix[x][y]:
+                    self.assertIsNone(tile, (x, y))
+                    continue
+                self.assertFalse(tile.destroyed)
+                self.assertEqual(tile.value, game.matrix[x][y])
+                self.assertEqual(tile._current_position, board.cells[x][y])
+
+    def testUndoRedoDiffFuzz(self):
+        rnd = random.Random(1)
+        directions = list(Directions)
+        for sequence in range(500):
+            game = Game(size=rnd.choice((3, 4, 5)), seed=sequence)
+            board = HeadlessBoard(game)
+            game.new_game()
+            for _ in range(rnd.randrange(5, 40)):
+                action = rnd.random()
+                if action < 0.25:
+                    game.undo()
+                elif action < 0.4:
+                    game.redo()
+                else:
+                    game.move(rnd.choice(directions))
+                self.assertRendered(board, game)
+                if game.game_over:
+                    break
+
+    def testUndoSlidesTilesBack(self):
+        game = Game(size=4, seed=1)
+        board = HeadlessBoard(game)
+        game.load([[2, 0, 0, 0], [0, 0, 0, 0], [0, 0, 0, 0], [0, 0, 0, 0]])
+        board.spawn_tile(0, 0, 2)
+        game.move(Directions.Right)
+        self.assertRendered(board, game)
+        created = StubTile.created
+        game.undo()
+        self.assertRendered(board, game)
+        self.assertEqual(StubTile.created, created)    # a tile slid back to (0, 0), nothing was spawned
+        self.assertEqual(board.score_var.value, 0)
+
+    def testBatchRendersFinalBoard(self):
+        rnd = random.Random(2)
+        game = Game(size=4, seed=3)
+        board = HeadlessBoard(game)
+        game.new_game()
+        def rendered():
+            return [[tile.value if tile else 0 for tile in column] for column in board.tiles]
+
+        for _ in range(20):
+            board.animations.finish_all()
+            before = rendered()
+            board.begin_batch()
+            board.begin_batch()     # batches nest
+            for _ in range(rnd.randrange(1, 5)):
+                game.move(rnd.choice(list(Directions)))
+            board.end_batch()
+            self.assertEqual(rendered(), before)    # still inside the outer batch
+            board.end_batch()
+            self.assertRendered(board, game)
+            if game.game_over:
+                break
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,93 @@
+#!/usr/bin/env python
+# coding: UTF-8
+# author: Sylphia
+# created:  19:50
+import random
+import subprocess
+import sys
+import unittest
+
+from benchmarks.import_time import ROOT
+from models.directions import Directions
+from simulation.differential import ReferenceEngine, bitboard_engine, check, load_engine, random_boards, \
+    vectorized_engine
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+def chained_merge_engine(boards, direction):
+    """
+    A broken engine that lets a merged tile merge again, 2 2 4 moves to 8 instead of 4 4
+    """
+    results = []
+    for board in boards:
+        size = len(board)
+        lines = [[(x, y) for x in range(size)] for y in range(size)] if direction in (
+            Directions.Left, Directions.Right) else [[(x, y) for y in range(size)] for x in range(size)]
+        if direction in (Directions.Right, Directions.Down):
+            lines = [line[::-1] for line in lines]
+        moved = [[0] * size for _ in range(size)]
+        score = 0
+        for line in lines:
+            stack = []
+            for x, y in line:
+                value = board[x][y]
+                if not value:
+                    continue
+                stack.append(value)
+                while len(stack) > 1 and stack[-1] == stack[-2]:
+                    stack[-2:] = [stack[-1] * 2]
+                    score += stack[-1]
+            for (x, y), value in zip(line, stack):
+                moved[x][y] = value
+        results.append((moved, score))
+    return results
+
+
+class TestDifferential(unittest.TestCase):
+    def testReferenceMatchesWholeBoardMoves(self):
+        rnd = random.Random(3)
+        for size in (3, 4, 6):
+            reference = ReferenceEngine(size, full_check_every=1)   # raises on any composed board Game disagrees with
+            for direction in Directions:
+                boards = random_boards(rnd, size, 300)
+                for board, result in zip(boards, reference(boards, direction)):
+                    self.assertEqual(result, reference.move_board(board, direction))
+
+    def testBitboardMatchesGame(self):
+        compared, mismatch = check(bitboard_engine, count=20000, seed=1)
+        self.assertEqual(compared, 20000)
+        self.assertIsNone(mismatch)
+
+    @unittest.skipUnless(numpy, 'numpy is not installed')
+    def testVectorizedMatchesGame(self):
+        for size in (3, 5, 8):
+            compared, mismatch = check(vectorized_engine, size=size, count=3000, seed=size, batch_size=500)
+            self.assertIsNone(mismatch)
+
+    def testMismatchIsShrunk(self):
+        compared, mismatch = check(chained_merge_engine, count=10000, seed=2)
+        self.assertIsNotNone(mismatch)
+        self.assertNotEqual((mismatch.expected, mismatch.expected_score), (mismatch.actual, mismatch.actual_score))
+        tiles = sorted(value for column in mismatch.board for value in column if value)
+        self.assertIn(tiles, ([2, 2, 4], [2, 2, 2, 2]))     # the smallest boards a chained merge shows on
+
+    def testLoadEngine(self):
+        self.assertIs(load_engine('bitboard'), bitboard_engine)
+        self.assertIs(load_engine('{}:chained_merge_engine'.format(__name__)), chained_merge_engine)
+        with self.assertRaises(ValueError):
+            load_engine('nope')
+
+    def testCommandRejectsUncheckableRuns(self):
+        for args in (['bitboard', '--size', '5'], ['bitboard', '--max-exponent', '15']):
+            result = subprocess.run([sys.executable, '.', 'verify-engine'] + args, cwd=ROOT, stdout=subprocess.PIPE,
+                                    stderr=subprocess.PIPE, universal_newlines=True)
+            self.assertEqual(result.returncode, 1, args)
+            self.assertIn('The bitboard engine', result.stderr)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,85 @@
+#!/usr/bin/env python
+# coding: UTF-8
+# author: Sylphia
+# created:  11:02
+import time
+import unittest
+
+from ai.expectimax import ExpectimaxSolver, TranspositionTable
+from models import bitboard
+from models.directions import Directions
+from models.game import Game
+from models.symmetry import TRANSFORMS, EvaluationCache, inverse_direction, transform_board, transform_direction
+
+
+class TestTranspositionTable(unittest.TestCase):
+    def testDepth(self):
+        table = TranspositionTable(10)
+        table.put(1, 2, 5.0)
+        self.assertEqual(table.get(1, 2), 5.0)
+        self.assertEqual(table.get(1, 1), 5.0)
+        self.assertIsNone(table.get(1, 3))
+
+    def testLeastRecentlyUsedEviction(self):
+        table = TranspositionTable(2)
+        table.put(1, 1, 1.0)
+        table.put(2, 1, 2.0)
+        table.get(1, 1)
+        table.put(3, 1, 3.0)
+        self.assertEqual(len(table), 2)
+        self.assertIsNone(table.get(2, 1))
+        self.assertEqual(table.get(1, 1), 1.0)
+
+
+class TestExpectimaxSolver(unittest.TestCase):
+    def testOnlyLegalMove(self):
+        game = Game()
+        game.load([[2, 4, 2, 4], [4, 2, 4, 2], [2, 4, 2, 4], [4, 2, 4, 0]])
+        self.assertIn(ExpectimaxSolver().best_move(game), (Directions.Down, Directions.Right))
+
+    def testForcedMoveIsCached(self):
+        cache = EvaluationCache()
+        board = bitboard.from_matrix([[0, 2, 4, 2], [0, 4, 2, 4], [0, 2, 4, 2], [0, 4, 2, 4]])
+        self.assertEqual(ExpectimaxSolver(max_depth=3, cache=cache).best_move_for_board(board), Directions.Up)
+        self.assertEqual(cache.get(board), (Directions.Up, 3))
+
+    def testNoMoves(self):
+        board = bitboard.from_matrix([[2, 4, 2, 4], [4, 2, 4, 2], [2, 4, 2, 4], [4, 2, 4, 2]])
+        self.assertIsNone(ExpectimaxSolver().best_move_for_board(board))
+
+    def testTimeBudget(self):
+        solver = ExpectimaxSolver(max_depth=8, time_budget_ms=20)
+        board = bitboard.from_matrix([[2, 0, 0, 0], [4, 0, 0, 0], [8, 0, 0, 0], [0, 0, 0, 2]])
+        start = time.monotonic()
+        self.assertIsNotNone(solver.best_move_for_board(board))
+        self.assertLess(time.monotonic() - start, 0.2)
+
+    def testStop(self):
+        cache = EvaluationCache()
+        solver = ExpectimaxSolver(max_depth=8, time_budget_ms=10 ** 6, cache=cache)
+        board = bitboard.from_matrix([[2, 0, 0, 0], [4, 0, 0, 0], [8, 0, 0, 0], [0, 0, 0, 2]])
+        calls = []
+        self.assertIsNotNone(solver.best_move_for_board(board, lambda: calls.append(1) or len(calls) > 50))
+        self.assertEqual(len(calls), 51)
+        self.assertEqual(len(cache), 0)    # a stopped search is not cached
+
+    def testPrefersMerge(self):
+        board = bitboard.from_matrix([[1024, 0, 0, 0], [1024, 0, 0, 0], [0, 0, 0, 0], [0, 0, 0, 0]])
+        self.assertEqual(ExpectimaxSolver(max_depth=1).best_move_for_board(board), Directions.Left)
+
+    def testOnlySupportsBitboardSize(self):
+        with self.assertRaises(ValueError):
+            ExpectimaxSolver().best_move(Game(size=5))
+
+    def testSharedCacheMapsDirections(self):
+        cache = EvaluationCache()
+        board = bitboard.from_matrix([[2, 4, 8, 0], [0, 2, 16, 0], [0, 0, 2, 4], [0, 0, 0, 2]])
+        solver = ExpectimaxSolver(max_depth=2, time_budget_ms=10 ** 6, cache=cache)
+        direction = solver.best_move_for_board(board)
+        self.assertEqual(len(cache), 1)
+        for transform in TRANSFORMS:
+            image = transform_board(board, transform)
+            cached = ExpectimaxSolver(max_depth=2, cache=cache).best_move_for_board(image)
+            self.assertEqual(cached, transform_direction(direction, transform))
+            self.assertEqual(inverse_direction(cached, transform), direction)
+        self.assertEqual(cache.hits, len(TRANSFORMS))
@@ -0,0 +1,77 @@
+#!/usr/bin/env python
+# coding: UTF-8
+# author: Sylphia
+# created:  11:20
+"""
+Stand-ins for Tk and the game config shared by the view and controller tests
+"""
+from views.tile_base import TileBase
+
+
+class FakeRoot(object):
+    """
+    Stand-in for the Tk after loop, frames only run when a test calls run_frame
+    """
+
+    def __init__(self):
+        self.callbacks = {}
+        self.next_id = 0
+
+    def after(self, delay_ms, callback):
+        self.next_id += 1
+        self.callbacks[self.next_id] = callback
+        return self.next_id
+
+    def after_cancel(self, after_id):
+        del self.callbacks[after_id]
+
+    def run_frame(self):
+        callbacks, self.callbacks = self.callbacks, {}
+        for callback in callbacks.values():
+            callback()
+
+
+class FakeVar(object):
+    """
+    Stand-in for a Tk variable
+    """
+
+    def __init__(self):
+        self.value = None
+
+    def set(self, value):
+        self.value = value
+
+
+class FakeConfig(object):
+    @staticmethod
+    def get_tile_colors(value):
+        return 'fg{}'.format(value), 'bg{}'.format(value)
+
+
+class StubTile(TileBase):
+    """
+    A tile that records what it would draw
+    """
+    created = 0
+
+    def __init__(self, value, animations):
+        super().__init__(10, value, FakeConfig(), animations)
+        self.placed = []
+        self.labels = []
+        self.destroyed = False
+        StubTile.created += 1
+
+    def spawn_at(self, root, x, y):
+        self._current_position = (x, y)
+        self._place()
+
+    def _place(self):
+        self.placed.append(self._current_position)
+
+    def _update_label(self):
+        self.labels.append((self.value, self.fg, self.bg))
+
+    def destroy(self):
+        super().destroy()
+        self.destroyed = True
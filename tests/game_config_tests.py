@@ -2,10 +2,12 @@
 # coding: UTF-8
 # author: Sylphia
 # created:  0:40
+import json
 import os
 import unittest
 
 from game_config import GameConfig
+from models.directions import Directions
 
 
 class GameConfigTestBase(unittest.TestCase):
@@ -26,6 +28,12 @@ class TestGameConfigDefaults(GameConfigTestBase):
                          (self.default_values['font']['face'], self.default_values['font']['size']))
 
         self.assertEqual(cfg.get_board_colors(), self.default_board_color)
+        self.assertEqual(cfg.get_render_mode(), self.default_values['rendering']['mode'])
+        self.assertEqual(cfg.get_input_queue_depth(), self.default_values['input']['queueDepth'])
+        self.assertEqual(cfg.get_input_full_policy(), self.default_values['input']['fullPolicy'])
+        self.assertIsNone(cfg.get_metrics_file())
+        self.assertEqual(cfg.get_metrics_format(), self.default_values['metrics']['format'])
+        self.assertEqual(cfg.get_metrics_interval_ms(), self.default_values['metrics']['intervalMs'])
 
         self.assertEqual(cfg.get_up_keys(), self.default_values['controls']['up'])
         self.assertEqual(cfg.get_down_keys(), self.default_values['controls']['down'])
@@ -36,6 +44,15 @@ class TestGameConfigDefaults(GameConfigTestBase):
         self.assertEqual(cfg.get_tile_colors(8), self.default_cell_color)
         self.assertEqual(cfg.get_tile_colors(4096), self.default_cell_color)
 
+    def testDefaultKeyMap(self):
+        cfg = GameConfig('__dummy__')
+        self.assertEqual(dict(cfg.get_key_map()), {'Up': Directions.Up, 'Down': Directions.Down,
+                                                   'Left': Directions.Left, 'Right': Directions.Right})
+        self.assertEqual(cfg.get_direction('Left'), Directions.Left)
+        self.assertIsNone(cfg.get_direction('space'))
+        with self.assertRaises(TypeError):
+            cfg.get_key_map()['space'] = Directions.Up
+
 
 class TestGameConfigWithJsonFile(GameConfigTestBase):
     def setUp(self) -> None:
@@ -52,6 +69,18 @@ class TestGameConfigWithJsonFile(GameConfigTestBase):
     "face": "SimSun",
     "size": 22
   },
+  "rendering": {
+    "mode": "widget"
+  },
+  "input": {
+    "queueDepth": 2,
+    "fullPolicy": "ignore"
+  },
+  "metrics": {
+    "file": "metrics.json",
+    "format": "json",
+    "intervalMs": 500
+  },
   "dimensions": {
     "cellSize": 150,
     "cellPadding": 5
@@ -88,6 +117,12 @@ class TestGameConfigWithJsonFile(GameConfigTestBase):
         self.assertEqual(cfg.get_cell_padding(), 5)
         self.assertEqual(cfg.get_label_font(), ("SimSun", 22))
         self.assertEqual(cfg.get_board_colors(), ("#111111", "#888888"))
+        self.assertEqual(cfg.get_render_mode(), "widget")
+        self.assertEqual(cfg.get_input_queue_depth(), 2)
+        self.assertEqual(cfg.get_input_full_policy(), "ignore")
+        self.assertEqual(cfg.get_metrics_file(), "metrics.json")
+        self.assertEqual(cfg.get_metrics_format(), "json")
+        self.assertEqual(cfg.get_metrics_interval_ms(), 500)
 
         self.assertEqual(cfg.get_up_keys(), self.default_values['controls']['up'])
         self.assertEqual(cfg.get_down_keys(), [83, 40])
@@ -97,3 +132,59 @@ class TestGameConfigWithJsonFile(GameConfigTestBase):
         self.assertEqual(cfg.get_tile_colors(2), ("#222222", "#000000"))
         self.assertEqual(cfg.get_tile_colors(8), ("#888888", "#444444"))
         self.assertEqual(cfg.get_tile_colors(4096), self.default_cell_color)
+
+    def testKeyMap(self):
+        cfg = GameConfig(self.temp_file)
+        self.assertEqual(cfg.get_direction('83'), Directions.Down)
+        self.assertEqual(cfg.get_direction('Up'), Directions.Up)
+        self.assertEqual(cfg.get_direction('65'), Directions.Left)
+        self.assertIsNone(cfg.get_direction('Down'))
+
+    def testReload(self):
+        cfg = GameConfig(self.temp_file)
+        self.assertIs(cfg.get_tile_colors(2), cfg.get_tile_colors(2))
+        with open(self.temp_file, 'w') as f:
+            f.write('{"controls": {"up": ["k"]}, "colors": {"tiles": {"2": {"background": "#123456"}}}}')
+        cfg.reload()
+        self.assertEqual(cfg.get_direction('k'), Directions.Up)
+        self.assertIsNone(cfg.get_direction('Up'))
+        self.assertEqual(cfg.get_tile_colors(2), (self.default_cell_color[0], "#123456"))
+        self.assertEqual(cfg.get_cell_size(), self.default_values['dimensions']['cellSize'])
+
+    def testHotReload(self):
+        cfg = GameConfig(self.temp_file)
+        changes = []
+        cfg.changed_event += changes.append
+        self.assertFalse(cfg.check_for_changes())
+
+        with open(self.temp_file, 'w') as f:
+            f.write('{"dimensions": {"cellSize": 80}}')
+        os.utime(self.temp_file, ns=(0, 1))     # make sure the mtime differs on coarse clocks
+        self.assertTrue(cfg.check_for_changes())
+        self.assertEqual(changes, [cfg])
+        self.assertEqual(cfg.get_cell_size(), 80)
+
+        with open(self.temp_file, 'w') as f:
+            f.write('{"dimensions": {"cellSize": "big"}, "controls": {"up": "w"}}')
+        os.utime(self.temp_file, ns=(0, 2))
+        with self.assertLogs(level='WARNING'):
+            self.assertFalse(cfg.check_for_changes())
+        self.assertEqual(cfg.get_cell_size(), 80)
+
+        with open(self.temp_file, 'w') as f:
+            f.write('{"dimensions": ')
+        os.utime(self.temp_file, ns=(0, 3))
+        with self.assertLogs(level='WARNING'):
+            self.assertFalse(cfg.check_for_changes())
+        self.assertEqual(len(changes), 1)
+        self.assertFalse(cfg.check_for_changes())
+
+    def testValidate(self):
+        self.assertEqual(GameConfig.validate(self.default_values), [])
+        with open(self.temp_file) as f:
+            self.assertEqual(GameConfig.validate(json.load(f)), [])
+        errors = GameConfig.validate({"controls": {"up": ["w", None]}, "font": {"size": -1},
+                                      "rendering": {"mode": "3d"}, "colors": {"tiles": {"2": {"background": 5}}},
+                                      "metrics": {"format": "xml", "intervalMs": 0}})
+        self.assertEqual(len(errors), 6)
+        self.assertEqual(GameConfig.validate([]), ['config must be an object'])
@@ -0,0 +1,148 @@
+#!/usr/bin/env python
+# coding: UTF-8
+# author: Sylphia
+# created:  10:15
+import unittest
+from unittest import mock
+
+from common.multicast_delegate import MulticastDelegate
+from controllers.game_controller import GameController
+from controllers.input_queue import InputQueue
+from game_config import GameConfig
+from tests.fakes import FakeRoot
+from views.animation import AnimationScheduler, Tween
+
+
+class FakeEvent(object):
+    def __init__(self, keysym):
+        self.keysym = keysym
+
+
+class FakeBoard(object):
+    """
+    Records what the board would render: every unbatched move and every end of a batch animate for a while
+    """
+
+    def __init__(self, game, game_title, config):
+        self.game = game
+        self.animations = AnimationScheduler(FakeRoot())
+        self.on_new_game_clicked = MulticastDelegate(None)
+        self.on_undo_clicked = MulticastDelegate(None)
+        self.on_redo_clicked = MulticastDelegate(None)
+        self.on_auto_play_clicked = MulticastDelegate(None)
+        self.on_hint_clicked = MulticastDelegate(None)
+        self.on_key_event = MulticastDelegate(None)
+        self.batch_depth = 0
+        self.rendered = []
+        game.tile_batch_event += self.__tiles_moved
+
+    def __tiles_moved(self, events):
+        if not self.batch_depth:
+            self.__render()
+
+    def __render(self):
+        self.rendered.append([list(column) for column in self.game.matrix])
+        self.animations.start(Tween(100, lambda progress: None))
+
+    def begin_batch(self):
+        self.batch_depth += 1
+
+    def end_batch(self):
+        self.batch_depth -= 1
+        if not self.batch_depth:
+            self.__render()
+
+    def clear_board(self):
+        self.animations.finish_all()
+
+    def call_later(self, delay_ms, callback):
+        pass
+
+    def show_hint(self, direction):
+        pass
+
+    def clear_hint(self):
+        pass
+
+
+class GameControllerTestBase(unittest.TestCase):
+    def setUp(self) -> None:
+        patches = (mock.patch('controllers.game_controller.Board', FakeBoard),
+                   mock.patch('builtins._', lambda text: text, create=True))
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+        GameController.initialize(GameConfig('__dummy__'))
+        self.addCleanup(GameController.Hints.close)
+
+
+class TestGameControllerInput(GameControllerTestBase):
+    def setUp(self) -> None:
+        super().setUp()
+        self.board = GameController.Board
+        self.game = GameController.Game
+        self.moves = []
+        move = self.game.move
+        self.game.move = lambda direction: (self.moves.append(direction), move(direction))
+        self.game.load([[2, 0, 0, 0], [0, 0, 0, 0], [0, 0, 0, 0], [0, 0, 0, 0]])
+
+    def press(self, *keys):
+        for key in keys:
+            GameController.dispatch(FakeEvent(key))
+
+    def assertRenderedGame(self):
+        self.assertEqual(self.board.batch_depth, 0)
+        self.assertEqual(self.board.rendered[-1], self.game.matrix)
+
+    def testMovesApplyWhileAnimating(self):
+        self.assertEqual(GameController.Input.depth, 4)
+        self.press('Right')
+        self.assertEqual(len(self.board.rendered), 1)
+        self.press('Down', 'Left')     # applied to the game at once, rendered when the animation stops
+        self.assertEqual(len(self.moves), 3)
+        self.assertEqual(len(self.board.rendered), 1)
+        self.board.animations.finish_all()
+        self.assertEqual(len(self.board.rendered), 2)
+        self.assertRenderedGame()
+        self.assertFalse(GameController.Input)
+
+    def testHistoryRendersPendingMoves(self):
+        for action in (GameController.undo, GameController.redo, GameController.new_game):
+            self.press('Right', 'Down', 'Left')
+            action()
+            self.assertFalse(GameController.Input)
+            self.assertEqual(self.board.batch_depth, 0)
+            self.board.animations.finish_all()
+            self.press('Up')    # the queue is not stuck
+            self.assertEqual(self.moves[-1].name, 'Up')
+            self.board.animations.finish_all()
+            self.assertEqual(self.board.batch_depth, 0)
+
+    def testIgnoreWhenFull(self):
+        GameController.Input = InputQueue(2, InputQueue.Ignore)
+        self.press('Right', 'Down', 'Left', 'Up', 'Right')
+        self.assertEqual(len(self.moves), 3)
+        self.assertEqual(GameController.Input.ignored, 2)
+        self.board.animations.finish_all()
+        self.assertRenderedGame()
+
+    def testFlushWhenFull(self):
+        GameController.Input = InputQueue(2, InputQueue.Flush)
+        self.press('Right', 'Down', 'Left')
+        self.assertEqual(len(self.board.rendered), 1)
+        self.press('Up')    # the queue is full, its moves are rendered and the key still applies
+        self.assertEqual(len(self.moves), 4)
+        self.assertEqual(len(self.board.rendered), 2)
+        self.board.animations.finish_all()
+        self.assertRenderedGame()
+
+
+class TestGameControllerHints(GameControllerTestBase):
+    def testNoHintWantedOnGameOver(self):
+        GameController.Game.game_over = True
+        GameController.hint()
+        self.assertFalse(GameController.HintWanted)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,266 @@
+#!/usr/bin/env python
+# coding: UTF-8
+# author: Sylphia
+# created:  13:45
+import random
+import unittest
+
+from models.cell_index import CellIndex
+from models.directions import Directions
+from models.game import Game
+from models.random_stream import RandomStream
+
+
+def scan_empty_cells(matrix):
+    return {(i, j) for i in range(len(matrix)) for j in range(len(matrix)) if not matrix[i][j]}
+
+
+def scan_legal_moves(matrix):
+    legal = set()
+    for direction in Directions:
+        game = Game(size=len(matrix), use_bitboard=False)
+        game.load(matrix)
+        game.move(direction)
+        if game.undo_history:
+            legal.add(direction)
+    return legal
+
+
+class TestCellIndex(unittest.TestCase):
+    def testAddRemove(self):
+        index = CellIndex(2, [(0, 0), (0, 1), (1, 0)])
+        index.remove((0, 0))
+        index.add((1, 1))
+        index.add((1, 1))
+        self.assertEqual(len(index), 3)
+        self.assertEqual(list(index), [(0, 1), (1, 0), (1, 1)])
+        self.assertEqual(index.pop_at(1), (1, 0))
+        self.assertNotIn((1, 0), index)
+        self.assertEqual(len(index), 2)
+
+    def testPopAtScanOrder(self):
+        rnd = random.Random(1)
+        for size in (1, 3, 4, 7, 16):
+            cells = [(x, y) for x in range(size) for y in range(size) if rnd.random() < 0.5]
+            index = CellIndex(size, cells)
+            while cells:
+                position = rnd.randrange(len(cells))
+                self.assertEqual(index.pop_at(position), cells.pop(position))
+            self.assertEqual(len(index), 0)
+
+
+class TestGameEmptyCells(unittest.TestCase):
+    def assertIndexMatchesScan(self, game):
+        self.assertEqual(set(game.empty_cells), scan_empty_cells(game.matrix))
+        self.assertEqual(game.empty_cell_count, len(scan_empty_cells(game.matrix)))
+        if not game.game_over:
+            self.assertEqual(game.legal_moves(), scan_legal_moves(game.matrix))
+
+    def testIndexMatchesScan(self):
+        for size, with_events in ((4, False), (4, True), (5, True), (8, True)):
+            random.seed(size)
+            game = Game(size=size)
+            if with_events:
+                game.tile_event += lambda e: None
+            game.new_game()
+            self.assertIndexMatchesScan(game)
+            directions = list(Directions)
+            for step in range(300):
+                if game.game_over:
+                    game.new_game()
+                if step % 7 == 6:
+                    game.undo()
+                else:
+                    game.move(random.choice(directions))
+                self.assertIndexMatchesScan(game)
+
+    def testSpawnOnlyOnEmptyCells(self):
+        random.seed(1)
+        game = Game(size=3)
+        game.load([[2, 4, 8], [16, 32, 64], [0, 128, 256]])
+        game.move(Directions.Up)
+        self.assertEqual(game.matrix[2], [128, 256, 2])
+        self.assertEqual(game.empty_cell_count, 0)
+
+
+class TestGameLegalMoves(unittest.TestCase):
+    def testLegalMoves(self):
+        game = Game(size=3)
+        game.load([[2, 4, 8], [4, 8, 2], [2, 4, 0]])
+        self.assertEqual(game.legal_moves(), {Directions.Right, Directions.Down})
+        game.load([[2, 4, 8], [4, 8, 2], [2, 4, 4]])
+        self.assertEqual(game.legal_moves(), {Directions.Up, Directions.Down})
+        game.load([[0, 0, 0], [0, 0, 0], [0, 0, 0]])
+        self.assertEqual(game.legal_moves(), set())
+
+    def testBitboardLegalMovesMatchScan(self):
+        rnd = random.Random(3)
+        packed = Game(use_bitboard=True)
+        scanned = Game(use_bitboard=False)
+        for _ in range(300):
+            matrix = [[rnd.choice((0, 2, 4, 8)) for _ in range(4)] for __ in range(4)]
+            packed.load(matrix)
+            scanned.load(matrix)
+            self.assertEqual(packed.legal_moves(), scanned.legal_moves())
+
+    def testLoadTileAboveBitboard(self):
+        matrix = [[65536, 0, 0, 0], [2, 0, 0, 0], [0, 0, 0, 0], [0, 0, 0, 0]]
+        game = Game(seed=1)
+        game.load(matrix)
+        self.assertFalse(game.use_bitboard)
+        self.assertEqual(game.legal_moves(), scan_legal_moves(matrix))
+        game.move(Directions.Down)
+        self.assertEqual(game.matrix[0][3], 65536)
+        self.assertEqual(game.matrix[1][3], 2)
+
+    def testLoadRejectsInvalidTiles(self):
+        game = Game()
+        for value in (1, 3, 12):
+            with self.assertRaises(ValueError):
+                game.load([[value, 0, 0, 0], [0, 0, 0, 0], [0, 0, 0, 0], [0, 0, 0, 0]])
+
+    def testGameOver(self):
+        game = Game(size=2)
+        results = []
+        game.game_over_event += results.append
+        game.load([[4, 0], [4, 2]])
+        game.move(Directions.Down)  # the 2 can only spawn at (0, 0)
+        self.assertEqual(game.matrix, [[2, 4], [4, 2]])
+        self.assertEqual(results, [False])
+        self.assertEqual(game.legal_moves(), set())
+
+
+class TestGameHistory(unittest.TestCase):
+    def play(self, game, steps, seed):
+        random.seed(seed)
+        game.new_game()
+        states = [([list(column) for column in game.matrix], game.score)]
+        directions = list(Directions)
+        while len(states) <= steps and not game.game_over:
+            moves = len(game.undo_history)
+            game.move(random.choice(directions))
+            if len(game.undo_history) > moves:
+                states.append(([list(column) for column in game.matrix], game.score))
+        return states
+
+    def testUndoRedo(self):
+        for size, with_events in ((4, False), (4, True), (6, True)):
+            game = Game(size=size)
+            if with_events:
+                game.tile_event += lambda e: None
+            states = []
+            while len(states) < 30:     # retry until a game lasts long enough to undo from a running state
+                states = self.play(game, 40, size)
+                if game.game_over:
+                    states = []
+            states = states[:len(game.undo_history) + 1]
+            for matrix, score in reversed(states[:-1]):
+                game.undo()
+                self.assertEqual((game.matrix, game.score), (matrix, score))
+                self.assertEqual(set(game.empty_cells), scan_empty_cells(game.matrix))
+            for matrix, score in states[1:]:
+                game.redo()
+                self.assertEqual((game.matrix, game.score), (matrix, score))
+                self.assertEqual(set(game.empty_cells), scan_empty_cells(game.matrix))
+
+    def testMoveClearsRedo(self):
+        game = Game()
+        game.load([[2, 0, 0, 0], [2, 0, 0, 0], [0, 0, 0, 0], [0, 0, 0, 0]])
+        game.move(Directions.Left)
+        game.undo()
+        self.assertEqual(len(game.redo_history), 1)
+        game.move(Directions.Down)
+        self.assertEqual(len(game.redo_history), 0)
+
+    def testHistoryDepth(self):
+        random.seed(2)
+        game = Game(size=8, history_depth=5)
+        game.new_game()
+        for direction in list(Directions) * 5:
+            game.move(direction)
+        self.assertEqual(len(game.undo_history), 5)
+
+
+class TestGameRandom(unittest.TestCase):
+    def play(self, game, moves, seed):
+        game.new_game(seed)
+        for direction in moves:
+            game.move(direction)
+        return game.matrix, game.score
+
+    def testSeedDeterminesGame(self):
+        moves = [random.Random(1).choice(list(Directions)) for _ in range(200)]
+        for bulk_random in (False, True):
+            first = self.play(Game(size=5, bulk_random=bulk_random), moves, 7)
+            second = self.play(Game(size=5, seed=123, bulk_random=bulk_random), moves, 7)
+            self.assertEqual(first, second)
+
+    def testEnginesSpawnAlike(self):
+        moves = [random.Random(2).choice(list(Directions)) for _ in range(300)]
+        with_events = Game(seed=3)
+        with_events.tile_event += lambda e: None
+        self.assertEqual(self.play(Game(seed=3), moves, 3), self.play(with_events, moves, 3))
+
+    def testSwitchingEnginesMidGame(self):
+        rnd = random.Random(4)
+        mixed = Game(seed=5)
+        vector = Game(seed=5, use_bitboard=False)
+        mixed.new_game()
+        vector.new_game()
+        listener = lambda e: None
+        for step in range(400):
+            if step % 9 == 0:   # subscribing moves the next moves to the vector engine, and back
+                if mixed.tile_event:
+                    mixed.tile_event -= listener
+                else:
+                    mixed.tile_event += listener
+            action = rnd.random()
+            for game in (mixed, vector):
+                if action < 0.1:
+                    game.undo()
+                elif action < 0.15:
+                    game.redo()
+                else:
+                    game.move(list(Directions)[int(action * 100) % 4])
+            self.assertEqual((mixed.matrix, mixed.score, mixed.game_over), (vector.matrix, vector.score,
+                                                                            vector.game_over))
+            self.assertEqual(mixed.legal_moves(), vector.legal_moves())
+            if mixed.game_over:
+                mixed.new_game()
+                vector.new_game()
+
+    def testInjectedRngWithoutSeed(self):
+        class Rng(object):
+            def __init__(self):
+                self.random = random.Random(9)
+                self.randrange = self.random.randrange
+                self.choice = self.random.choice
+
+        game = Game(seed=1, rng=Rng())
+        game.new_game(5)
+        self.assertEqual(game.seed, 1)
+        self.assertEqual(sum(1 for column in game.matrix for value in column if value), 2)
+
+    def testSpawnMatchesScan(self):
+        for seed in range(50):
+            game = Game(size=6)
+            game.new_game(seed)
+            reference = random.Random(seed)
+            empty_cells = [(i, j) for i in range(6) for j in range(6)]
+            expected = [[0] * 6 for _ in range(6)]
+            for _ in range(2):
+                x, y = empty_cells.pop(reference.randint(0, len(empty_cells) - 1))
+                expected[x][y] = reference.choice([2, 4])
+            self.assertEqual(game.matrix, expected)
+
+
+class TestRandomStream(unittest.TestCase):
+    def testDeterministic(self):
+        first = RandomStream(1, chunk_size=16)
+        second = RandomStream(1, chunk_size=16)
+        values = [first.randrange(10) for _ in range(100)]
+        self.assertEqual(values, [second.randrange(10) for _ in range(100)])
+        self.assertTrue(all(0 <= value < 10 for value in values))
+        first.seed(1)
+        self.assertEqual(values, [first.randrange(10) for _ in range(100)])
+        self.assertEqual(len(set(values)), 10)
@@ -0,0 +1,123 @@
+#!/usr/bin/env python
+# coding: UTF-8
+# author: Sylphia
+# created:  23:58
+import queue
+import threading
+import time
+import unittest
+
+from ai.expectimax import ExpectimaxSolver
+from ai.hint_engine import HintEngine, positions_ahead
+from models import bitboard
+from models.directions import Directions
+from models.symmetry import canonical_board
+
+BOARD = bitboard.from_matrix([[2, 4, 8, 0], [0, 2, 16, 0], [0, 0, 2, 4], [0, 0, 0, 2]])
+OTHER_BOARD = bitboard.from_matrix([[2, 0, 0, 0], [4, 0, 0, 0], [8, 0, 0, 0], [0, 0, 0, 2]])
+FORCED_BOARD = bitboard.from_matrix([[0, 2, 4, 2], [0, 4, 2, 4], [0, 2, 4, 2], [0, 4, 2, 4]])
+DEAD_BOARD = bitboard.from_matrix([[2, 4, 2, 4], [4, 2, 4, 2], [2, 4, 2, 4], [4, 2, 4, 2]])
+
+
+class TestHintEngine(unittest.TestCase):
+    def setUp(self):
+        self.engines = []
+
+    def tearDown(self):
+        for engine in self.engines:
+            engine.close()
+
+    def __engine(self, **kwargs):
+        engine = HintEngine(**kwargs)
+        self.engines.append(engine)
+        return engine
+
+    @staticmethod
+    def __wait_idle(engine, timeout=30):
+        deadline = time.monotonic() + timeout
+        while engine.busy and time.monotonic() < deadline:
+            time.sleep(0.01)
+
+    def testPositionsAhead(self):
+        boards = positions_ahead(BOARD, Directions.Down)
+        moves = {direction: move(BOARD)[0] for direction, move in bitboard.MOVES.items()}
+        self.assertEqual(boards[0] & moves[Directions.Down], moves[Directions.Down])   # a 2 spawned after Down
+        self.assertEqual(bitboard.count_empty(boards[0]), bitboard.count_empty(moves[Directions.Down]) - 1)
+        for board in boards:
+            spawned = [moved for moved in moves.values() if moved != BOARD and
+                       bitboard.count_empty(board) == bitboard.count_empty(moved) - 1 and board & moved == moved]
+            self.assertTrue(spawned)
+        self.assertEqual(len({canonical_board(board)[0] for board in boards}), len(boards))
+        self.assertEqual(positions_ahead(DEAD_BOARD), [])
+
+    def testHintMatchesSolver(self):
+        ready = queue.Queue()
+        engine = self.__engine(max_depth=2, look_ahead=False)
+        engine.hint_ready_event += lambda board, direction: ready.put((board, direction))
+        self.assertIsNone(engine.get_hint())
+        engine.update(BOARD)
+        self.assertEqual(ready.get(timeout=30), (BOARD, ExpectimaxSolver(max_depth=2).best_move_for_board(BOARD)))
+        self.assertEqual(engine.get_hint(), ExpectimaxSolver(max_depth=2).best_move_for_board(BOARD))
+
+    def testAnnouncedHintIsKept(self):
+        for board, kwargs in ((FORCED_BOARD, {}), (OTHER_BOARD, {'max_depth': 8, 'time_budget_ms': 1})):
+            ready = queue.Queue()
+            engine = self.__engine(look_ahead=False, **kwargs)
+            engine.hint_ready_event += lambda board, direction: ready.put(direction)
+            engine.update(board)
+            direction = ready.get(timeout=30)
+            self.assertIsNotNone(direction)
+            self.assertEqual(engine.get_hint(), direction)  # asked for after it was announced
+        self.assertEqual(self.engines[0].get_hint(), Directions.Up)
+
+    def testDispatch(self):
+        callbacks = queue.Queue()
+        fired = []
+        engine = self.__engine(max_depth=1, look_ahead=False, dispatch=callbacks.put)
+        engine.hint_ready_event += lambda board, direction: fired.append(threading.current_thread())
+        engine.update(BOARD)
+        callbacks.get(timeout=30)()
+        self.assertEqual(fired, [threading.current_thread()])
+
+    def testStaleHintIsNotFired(self):
+        callbacks = queue.Queue()
+        fired = []
+        engine = self.__engine(max_depth=1, look_ahead=False, dispatch=callbacks.put)
+        engine.hint_ready_event += lambda board, direction: fired.append(board)
+        engine.update(BOARD)
+        callback = callbacks.get(timeout=30)
+        engine.update(None)     # a move landed before the hint reached the UI
+        callback()
+        self.assertEqual(fired, [])
+        self.assertIsNone(engine.get_hint())
+
+    def testUpdateCancelsSearch(self):
+        ready = queue.Queue()
+        engine = self.__engine(max_depth=8, time_budget_ms=10 ** 6, look_ahead=False)
+        engine.hint_ready_event += lambda board, direction: ready.put(board)
+        engine.update(OTHER_BOARD)  # searching 8 moves deep takes far longer than the test
+        time.sleep(0.05)
+        engine.update(DEAD_BOARD)
+        self.assertEqual(ready.get(timeout=5), DEAD_BOARD)
+        self.__wait_idle(engine)
+        self.assertTrue(ready.empty())
+
+    def testLooksAhead(self):
+        engine = self.__engine(max_depth=1)
+        engine.update(BOARD)
+        self.__wait_idle(engine)
+        self.assertIsNotNone(engine.get_hint())
+        for board in positions_ahead(BOARD):
+            self.assertIsNotNone(engine.get_hint(board))
+
+    def testClose(self):
+        engine = HintEngine(max_depth=8, time_budget_ms=10 ** 6)
+        engine.update(OTHER_BOARD)
+        time.sleep(0.05)
+        start = time.monotonic()
+        engine.close()
+        self.assertLess(time.monotonic() - start, 5)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,29 @@
+#!/usr/bin/env python
+# coding: UTF-8
+# author: Sylphia
+# created:  17:40
+import unittest
+
+from controllers.input_queue import InputQueue
+
+
+class TestInputQueue(unittest.TestCase):
+    def testLimit(self):
+        queue = InputQueue(2, InputQueue.Ignore)
+        self.assertTrue(queue.push())
+        self.assertFalse(queue.full)
+        self.assertTrue(queue.push())
+        self.assertTrue(queue.full)
+        self.assertFalse(queue.push())
+        self.assertEqual((len(queue), queue.ignored), (2, 1))
+        queue.clear()
+        self.assertEqual(len(queue), 0)
+        self.assertTrue(queue.push())
+
+    def testInvalidSettings(self):
+        self.assertRaises(ValueError, InputQueue, 0)
+        self.assertRaises(ValueError, InputQueue, 2, 'oldest')
+
+
+if __name__ == '__main__':
+    unittest.main()
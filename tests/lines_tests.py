@@ -0,0 +1,37 @@
+#!/usr/bin/env python
+# coding: UTF-8
+# author: Sylphia
+# created:  08:25
+import unittest
+
+from models.directions import Directions
+from models.lines import LineMover, build_lines, move_line
+
+
+class TestLines(unittest.TestCase):
+    def testMoveLine(self):
+        self.assertEqual(move_line((1, 1, 1, 1)), ((2, 2, 0, 0), (2, 2)))
+        self.assertEqual(move_line((0, 2, 2, 3)), ((3, 3, 0, 0), (3,)))
+        self.assertEqual(move_line((1, 0, 2, 0, 2)), ((1, 3, 0, 0, 0), (3,)))
+        self.assertEqual(move_line((4, 4), max_exponent=4), ((4, 4), ()))
+
+    def testBuildLines(self):
+        lines = build_lines(3)
+        self.assertEqual(lines[Directions.Up][1], [3, 4, 5])
+        self.assertEqual(lines[Directions.Down][1], [5, 4, 3])
+        self.assertEqual(lines[Directions.Left][1], [1, 4, 7])
+        self.assertEqual(lines[Directions.Right][1], [7, 4, 1])
+
+    def testMoverCacheIsBounded(self):
+        mover = LineMover(cache_size=3)
+        lines = build_lines(2)[Directions.Left]
+        for first in range(1, 6):
+            cells = bytearray([first, 0, first, first + 1])   # rows (first, first) and (0, first + 1)
+            self.assertEqual(mover.move_cells(cells, lines), (True, (first + 1,)))
+            self.assertEqual(cells, bytearray([first + 1, first + 1, 0, 0]))
+            self.assertLessEqual(len(mover), 3)
+        self.assertEqual(mover.move_cells(bytearray([1, 0, 2, 0]), lines), (False, ()))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,117 @@
+#!/usr/bin/env python
+# coding: UTF-8
+# author: Sylphia
+# created:  21:10
+import json
+import os
+import tempfile
+import time
+import unittest
+
+from models.directions import Directions
+from models.game import Game
+from models.metrics import LATENCY_BUCKETS_NS, GameMetrics, Timer
+
+
+class TestTimer(unittest.TestCase):
+    def testBuckets(self):
+        timer = Timer()
+        for elapsed in (1, LATENCY_BUCKETS_NS[0], LATENCY_BUCKETS_NS[0] + 1, LATENCY_BUCKETS_NS[-1] * 2):
+            timer.add(elapsed)
+        self.assertEqual(timer.count, 4)
+        self.assertEqual(timer.max_ns, LATENCY_BUCKETS_NS[-1] * 2)
+        self.assertEqual(timer.buckets[0], 2)
+        self.assertEqual(timer.buckets[1], 1)
+        self.assertEqual(timer.buckets[-1], 1)
+
+
+class TestGameMetrics(unittest.TestCase):
+    def testDisabledByDefault(self):
+        game = Game(seed=1)
+        self.assertIsNone(game.metrics)
+        self.assertNotIn('move', game.__dict__)
+
+    def testRecordsMoves(self):
+        for use_bitboard, subscribed in ((True, False), (False, False), (False, True)):
+            game = Game(seed=3, use_bitboard=use_bitboard)
+            if subscribed:
+                game.tile_event += lambda event: None
+            metrics = game.enable_metrics()
+            game.new_game()
+            game.load([[2, 2, 0, 0], [0, 0, 0, 0], [0, 0, 0, 0], [0, 0, 0, 0]])
+            game.move(Directions.Up)
+            game.move(Directions.Left)
+            game.load([[2, 0, 0, 0], [4, 0, 0, 0], [0, 0, 0, 0], [0, 0, 0, 0]])
+            game.move(Directions.Left)  # nothing moves
+            snapshot = metrics.snapshot()
+            self.assertEqual(snapshot['moves'], 2)
+            self.assertEqual(snapshot['noop_moves'], 1)
+            self.assertEqual(snapshot['timers']['move']['count'], 3)
+            self.assertEqual(snapshot['timers']['spawn']['count'], 3)   # new game and two moves
+            self.assertEqual(snapshot['timers']['game_over_check']['count'], 2)
+            self.assertEqual(snapshot['timers']['dispatch']['count'], 3)   # one per new game and moved board
+            self.assertEqual(snapshot['undo_history'], 2)
+            self.assertEqual(snapshot['tile_events'] > 0, not use_bitboard)
+
+    def testDispatchTimesScoreEvents(self):
+        for use_bitboard in (True, False):
+            game = Game(seed=1, use_bitboard=use_bitboard)
+            game.score_event += lambda score: time.sleep(0.005)
+            game.load([[2, 2, 0, 0], [0, 0, 0, 0], [0, 0, 0, 0], [0, 0, 0, 0]])
+            metrics = game.enable_metrics()
+            game.move(Directions.Up)
+            self.assertEqual(metrics.timers['dispatch'].count, 1)
+            self.assertGreaterEqual(metrics.timers['dispatch'].total_ns, 5 * 10 ** 6, use_bitboard)
+
+    def testDisable(self):
+        game = Game(seed=1)
+        metrics = game.enable_metrics()
+        game.new_game()
+        self.assertIs(game.disable_metrics(), metrics)
+        self.assertNotIn('move', game.__dict__)
+        game.move(Directions.Up)
+        game.move(Directions.Left)
+        self.assertEqual(metrics.timers['move'].count, 0)
+
+    def testSharedMetrics(self):
+        metrics = GameMetrics()
+        games = [Game(seed=seed) for seed in range(3)]
+        for game in games:
+            self.assertIs(game.enable_metrics(metrics), metrics)
+            game.new_game()
+        self.assertEqual(metrics.timers['spawn'].count, 3)
+
+    def testPrometheus(self):
+        game = Game(seed=2)
+        metrics = game.enable_metrics()
+        game.new_game()
+        for direction in list(Directions) * 5:
+            game.move(direction)
+        text = metrics.to_prometheus()
+        samples = {}
+        for line in text.splitlines():
+            if not line.startswith('#'):
+                name, value = line.rsplit(' ', 1)
+                samples[name] = float(value)
+        self.assertEqual(samples['game2048_moves_total'], metrics.moves)
+        self.assertEqual(samples['game2048_move_seconds_count'], 20)
+        self.assertEqual(samples['game2048_move_seconds_bucket{le="+Inf"}'], 20)
+        self.assertIn('# TYPE game2048_move_seconds histogram', text)
+
+    def testDump(self):
+        metrics = Game(seed=2).enable_metrics()
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'metrics')
+            metrics.dump(path, 'json')
+            with open(path) as f:
+                self.assertEqual(json.load(f)['moves'], 0)
+            metrics.dump(path)
+            with open(path) as f:
+                self.assertIn('game2048_moves_total 0', f.read())
+            self.assertEqual(os.listdir(directory), ['metrics'])
+            with self.assertRaises(ValueError):
+                metrics.dump(path, 'xml')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,53 @@
+#!/usr/bin/env python
+# coding: UTF-8
+# author: Sylphia
+# created:  17:55
+import os
+import tempfile
+import unittest
+
+from benchmarks.move_engine import OPERATIONS, Result, Scenario, compare, load_baseline, losing_board, \
+    run_scenario, save_baseline
+from models.directions import Directions
+from models.game import Game
+
+
+class TestMoveEngineBenchmark(unittest.TestCase):
+    def testLosingBoard(self):
+        for size in (4, 5, 16):
+            for use_bitboard in (True, False):
+                game = Game(size, use_bitboard=use_bitboard and size == 4)
+                won = []
+                game.game_over_event += won.append
+                game.load(losing_board(size))
+                self.assertIn(Directions.Right, game.legal_moves())
+                game.move(Directions.Right)
+                self.assertEqual(won, [False])
+
+    def testEveryOperationRuns(self):
+        for operation in OPERATIONS:
+            for subscribed in (False, True):
+                result = run_scenario(Scenario(operation, 4, subscribed), count=3, repeat=1)
+                self.assertEqual(result.ops, 3)
+                self.assertGreater(result.ns_per_op, 0)
+                self.assertGreaterEqual(result.alloc_bytes_per_op, 0)
+
+    def testCompare(self):
+        baseline = {'move_up/4x4/bare': {'ns_per_op': 1000, 'alloc_bytes_per_op': 100}}
+        results = [Result('move_up/4x4/bare', 10, 1200, 100, 1), Result('move_up/8x8/bare', 10, 1e9, 1e9, 1)]
+        self.assertEqual(compare(results, baseline, threshold=25), [])
+        self.assertEqual(compare(results, baseline, threshold=10), [('move_up/4x4/bare', 'ns_per_op', 1000, 1200)])
+
+    def testSaveMergesBaseline(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'baseline.json')
+            self.assertEqual(load_baseline(path), {})
+            save_baseline([Result('a', 1, 10, 1, 1), Result('b', 1, 20, 2, 2)], path)
+            save_baseline([Result('b', 1, 30, 3, 3)], path)
+            baseline = load_baseline(path)
+            self.assertEqual(baseline['a']['ns_per_op'], 10)
+            self.assertEqual(baseline['b']['ns_per_op'], 30)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,120 @@
+#!/usr/bin/env python
+# coding: UTF-8
+# author: Sylphia
+# created:  18:02
+import random
+import unittest
+
+from common.multicast_delegate import MulticastDelegate
+from models.directions import Directions
+from models.game import Game
+
+
+class TestMulticastDelegate(unittest.TestCase):
+    def testAddSubtract(self):
+        calls = []
+        first = MulticastDelegate(lambda: calls.append(1))
+        second = first + (lambda: calls.append(2))
+        self.assertEqual(len(first), 1)
+        self.assertEqual(second(), [None, None])
+        self.assertEqual(calls, [1, 2])
+
+    def testInPlace(self):
+        calls = []
+        delegate = MulticastDelegate(None)
+        alias = delegate
+        delegate += calls.append
+        delegate += calls.append
+        self.assertIs(delegate, alias)
+        delegate.fire(1)
+        delegate -= calls.append
+        delegate.fire(2)
+        self.assertEqual(calls, [1])
+        self.assertFalse(delegate)
+
+    def testSubscribeWhileFiring(self):
+        calls = []
+        delegate = MulticastDelegate(None)
+
+        def subscribe(value):
+            calls.append(value)
+            delegate.__iadd__(lambda v: calls.append(-v))
+        delegate += subscribe
+        delegate.fire(1)
+        self.assertEqual(calls, [1])
+
+    def testBatch(self):
+        calls = []
+        batches = []
+        delegate = MulticastDelegate(calls.append)
+        delegate.add_batch_handler(batches.append)
+        delegate.begin_batch()
+        delegate.fire(1)
+        delegate.begin_batch()
+        delegate.fire(2)
+        delegate.end_batch()
+        self.assertEqual(calls, [])
+        delegate.end_batch()
+        self.assertEqual(calls, [1, 2])
+        self.assertEqual(batches, [[(1,), (2,)]])
+        delegate.fire(3)
+        self.assertEqual(batches[-1], [(3,)])
+
+    def testRaisingFunctionEndsBatch(self):
+        calls = []
+
+        def fail(value):
+            raise RuntimeError(value)
+
+        delegate = MulticastDelegate(fail)
+        delegate.begin_batch()
+        delegate.fire(1)
+        with self.assertRaises(RuntimeError):
+            delegate.end_batch()
+        delegate -= fail
+        delegate += calls.append
+        delegate.fire(2)
+        self.assertEqual(calls, [2])
+
+    def testCoalesce(self):
+        calls = []
+        delegate = MulticastDelegate(calls.append, coalesce=True)
+        delegate.begin_batch()
+        for value in range(5):
+            delegate.fire(value)
+        delegate.end_batch()
+        self.assertEqual(calls, [4])
+
+
+class TestGameScoreEvents(unittest.TestCase):
+    def testScoreOncePerMove(self):
+        game = Game(size=4, use_bitboard=False)
+        scores = []
+        game.score_event += scores.append
+        game.load([[2, 4, 0, 0], [2, 4, 0, 0], [0, 0, 0, 0], [0, 0, 0, 0]])
+        random.seed(1)
+        game.move(Directions.Left)
+        self.assertEqual(scores, [12])
+
+    def testRaisingTileHandler(self):
+        for batched in (False, True):
+            game = Game(size=4, seed=1)
+            scores = []
+            failures = [RuntimeError('handler')]
+
+            def handler(events):
+                if failures:
+                    raise failures.pop()
+
+            if batched:
+                game.tile_batch_event += handler
+            else:
+                game.tile_event += handler
+            game.score_event += scores.append
+            game.load([[2, 4, 0, 0], [2, 4, 0, 0], [0, 0, 0, 0], [0, 0, 0, 0]])
+            with self.assertRaises(RuntimeError):
+                game.move(Directions.Left)
+            self.assertEqual(len(game.undo_history), 1)
+            game.load([[2, 4, 0, 0], [2, 4, 0, 0], [0, 0, 0, 0], [0, 0, 0, 0]])
+            game.move(Directions.Left)
+            self.assertEqual(scores, [12, 12])
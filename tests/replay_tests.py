@@ -0,0 +1,108 @@
+#!/usr/bin/env python
+# coding: UTF-8
+# author: Sylphia
+# created:  22:40
+import os
+import random
+import tempfile
+import unittest
+
+from models.directions import Directions
+from models.game import Game
+from models.replay import FINISHED, HEADER, REDO, UNDO, GameRecorder, ReplayReader, action_width, decode_actions, \
+    parse_records, replay
+
+
+def play(game, seed, moves):
+    rnd = random.Random(seed)
+    directions = list(Directions)
+    for _ in range(moves):
+        if game.game_over:
+            break
+        choice = rnd.random()
+        if choice < 0.05:
+            game.undo()
+        elif choice < 0.08:
+            game.undo()
+            game.redo()
+        else:
+            game.move(rnd.choice(directions))
+
+
+class TestReplay(unittest.TestCase):
+    def testActionWidth(self):
+        self.assertEqual(action_width(2), 1)
+        self.assertEqual(action_width(4), 1)
+        self.assertEqual(action_width(5), 2)
+        self.assertEqual(action_width(64), 2)
+        self.assertEqual(action_width(65), 4)
+
+    def testRecordAndReplay(self):
+        for size in (3, 4, 5):
+            chunks = []
+            game = Game(size, seed=size)
+            recorder = GameRecorder(game, chunks.append)
+            finals = []
+            for index in range(3):
+                game.new_game()
+                play(game, index, 400)
+                finals.append(([list(column) for column in game.matrix], game.score, game.game_over))
+            recorder.close()
+            self.assertEqual(recorder.records, 3)
+            archive = b''.join(chunks)
+            records = [record for _, record in parse_records(archive)]
+            self.assertEqual(len(records), 3)
+            for record, (matrix, score, game_over) in zip(records, finals):
+                self.assertEqual(record.score, score)
+                self.assertEqual(bool(record.flags & FINISHED), game_over)
+                self.assertEqual(len(record.actions), record.width * len(list(decode_actions(record))))
+                replayed = Game(size, history_depth=None)
+                for _ in replay(record, replayed):
+                    pass
+                self.assertEqual(replayed.matrix, matrix)
+                self.assertEqual(replayed.score, score)
+
+    def testCompactFormat(self):
+        chunks = []
+        game = Game(seed=1)
+        GameRecorder(game, chunks.append)
+        game.new_game()
+        play(game, 0, 10000)
+        record = next(parse_records(chunks[0]))[1]
+        actions = list(decode_actions(record))
+        self.assertEqual(len(chunks[0]), HEADER.size + len(actions))
+        self.assertIn((None, UNDO, None, None), actions)
+        self.assertIn((None, REDO, None, None), actions)
+
+    def testReader(self):
+        path = os.path.join(tempfile.mkdtemp(), 'games.bin')
+        game = Game(seed=3)
+        with open(path, 'wb') as archive:
+            recorder = GameRecorder(game, archive)
+            for index in range(5):
+                game.new_game()
+                play(game, index, 100)
+            recorder.close()
+        with ReplayReader(path) as reader:
+            offsets = [offset for offset, _ in reader.records()]
+            self.assertEqual(len(offsets), 5)
+            self.assertEqual(offsets[0], 0)
+            tail = [record.score for _, record in reader.records(offsets[3])]
+            self.assertEqual(len(tail), 2)
+            self.assertEqual(sum(1 for _ in reader), 5)
+            del tail
+        os.remove(path)
+
+    def testCorruptArchive(self):
+        chunks = []
+        game = Game(seed=2)
+        recorder = GameRecorder(game, chunks.append)
+        game.new_game()
+        play(game, 0, 20)
+        recorder.close()
+        self.assertRaises(ValueError, list, parse_records(chunks[0][:-1]))
+        self.assertRaises(ValueError, list, parse_records(b'XX' + chunks[0][2:]))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,57 @@
+#!/usr/bin/env python
+# coding: UTF-8
+# author: Sylphia
+# created:  16:50
+import builtins
+import os
+import runpy
+import subprocess
+import sys
+import unittest
+
+from benchmarks.import_time import ENTRY_MODULES, ROOT, parse_import_time
+
+
+class TestStartup(unittest.TestCase):
+    def __imported_modules(self, *args):
+        result = subprocess.run([sys.executable, '-X', 'importtime'] + list(args), cwd=ROOT,
+                                stdout=subprocess.PIPE, stderr=subprocess.PIPE, universal_newlines=True)
+        self.assertEqual(result.returncode, 0, result.stderr)
+        return parse_import_time(result.stderr)
+
+    def testHeadlessModulesSkipTkinter(self):
+        modules = self.__imported_modules('-c', 'import ' + ', '.join(ENTRY_MODULES))
+        for module in ENTRY_MODULES:
+            self.assertIn(module, modules)
+        self.assertNotIn('tkinter', modules)
+
+    def testHeadlessCommandsSkipTkinter(self):
+        for args in (['simulate', '--help'], ['analyze', '--help'], ['check-config', 'config.json']):
+            modules = self.__imported_modules('.', *args)
+            self.assertNotIn('tkinter', modules, args)
+
+    def testTranslationsInstalledByPlayOnly(self):
+        runpy.run_path(os.path.join(ROOT, '__main__.py'), run_name='entry_point')
+        self.assertFalse(hasattr(builtins, '_'))
+
+    def testCheckConfigReportsErrors(self):
+        path = os.path.join(os.path.dirname(__file__), 'startup_tests_config.json')
+        with open(path, 'w') as f:
+            f.write('{"font": {"size": -1}}')
+        try:
+            result = subprocess.run([sys.executable, '.', 'check-config', path], cwd=ROOT,
+                                    stdout=subprocess.PIPE, stderr=subprocess.PIPE, universal_newlines=True)
+        finally:
+            os.remove(path)
+        self.assertEqual(result.returncode, 1)
+        self.assertIn('"font.size" must be a positive integer', result.stderr)
+
+    def testParseImportTime(self):
+        output = ('import time: self [us] | cumulative | imported package\n'
+                  'import time:       120 |        120 |   _io\n'
+                  'import time:       300 |       5000 | models.game\n')
+        self.assertEqual(parse_import_time(output), {'_io': 120, 'models.game': 5000})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,119 @@
+#!/usr/bin/env python
+# coding: UTF-8
+# author: Sylphia
+# created:  22:50
+import random
+import threading
+import unittest
+
+from models import bitboard
+from models.directions import Directions
+from models.symmetry import IDENTITY, TRANSFORMS, EvaluationCache, canonical_board, canonical_key, \
+    canonical_matrix, inverse_direction, transform_board, transform_direction, transform_matrix
+from simulation.differential import ReferenceEngine
+
+
+def random_matrix(rnd, size):
+    return [[rnd.choice([0, 0, 2, 2, 4, 8, 16]) for _ in range(size)] for __ in range(size)]
+
+
+class TestTransforms(unittest.TestCase):
+    def testEightDistinctImages(self):
+        matrix = [[1, 2, 3], [4, 5, 6], [7, 8, 9]]
+        images = {tuple(map(tuple, transform_matrix(matrix, transform))) for transform in TRANSFORMS}
+        self.assertEqual(len(images), 8)
+        self.assertEqual(transform_matrix(matrix, IDENTITY), matrix)
+
+    def testBitboardMatchesMatrix(self):
+        rnd = random.Random(1)
+        for _ in range(100):
+            matrix = random_matrix(rnd, 4)
+            board = bitboard.from_matrix(matrix)
+            for transform in TRANSFORMS:
+                self.assertEqual(bitboard.to_matrix(transform_board(board, transform)),
+                                 transform_matrix(matrix, transform))
+
+    def testMovesCommute(self):
+        rnd = random.Random(2)
+        for size in (3, 4, 5):
+            reference = ReferenceEngine(size, full_check_every=0)
+            for _ in range(30):
+                matrix = random_matrix(rnd, size)
+                for transform in TRANSFORMS:
+                    for direction in Directions:
+                        moved, score = reference.move_board(matrix, direction)
+                        image_moved, image_score = reference.move_board(transform_matrix(matrix, transform),
+                                                                        transform_direction(direction, transform))
+                        self.assertEqual(image_moved, transform_matrix(moved, transform))
+                        self.assertEqual(image_score, score)
+                        self.assertEqual(inverse_direction(transform_direction(direction, transform), transform),
+                                         direction)
+
+    def testCanonicalForm(self):
+        rnd = random.Random(3)
+        for _ in range(100):
+            matrix = random_matrix(rnd, 4)
+            board = bitboard.from_matrix(matrix)
+            canonical, transform = canonical_board(board)
+            self.assertEqual(transform_board(board, transform), canonical)
+            key, matrix_transform = canonical_matrix(matrix)
+            self.assertEqual(tuple(value for column in transform_matrix(matrix, matrix_transform) for value in column),
+                             key)
+            for image_transform in TRANSFORMS:
+                self.assertEqual(canonical_board(transform_board(board, image_transform))[0], canonical)
+                self.assertEqual(canonical_key(transform_matrix(matrix, image_transform))[0], key)
+
+
+class TestEvaluationCache(unittest.TestCase):
+    def testImagesShareEntry(self):
+        cache = EvaluationCache()
+        matrix = [[2, 4, 0], [0, 8, 0], [0, 0, 0]]
+        cache.put(matrix, Directions.Left, 42)
+        for transform in TRANSFORMS:
+            direction, value = cache.get(transform_matrix(matrix, transform))
+            self.assertEqual(direction, transform_direction(Directions.Left, transform))
+            self.assertEqual(value, 42)
+        self.assertEqual(len(cache), 1)
+        self.assertIsNone(cache.get([[2, 0, 0], [0, 0, 0], [0, 0, 0]]))
+        self.assertEqual((cache.hits, cache.misses), (8, 1))
+
+    def testWithoutDirection(self):
+        cache = EvaluationCache()
+        cache.put(0x21, None, 1.5)
+        self.assertEqual(cache.get(transform_board(0x21, TRANSFORMS[5])), (None, 1.5))
+
+    def testLeastRecentlyUsedEviction(self):
+        cache = EvaluationCache(capacity=2)
+        cache.put(0x1, None, 1)
+        cache.put(0x2, None, 2)
+        cache.get(0x1)
+        cache.put(0x3, None, 3)
+        self.assertEqual(len(cache), 2)
+        self.assertIsNone(cache.get(0x2))
+        self.assertEqual(cache.get(0x1), (None, 1))
+
+    def testThreads(self):
+        cache = EvaluationCache(capacity=500)
+        errors = []
+
+        def work(seed):
+            rnd = random.Random(seed)
+            try:
+                for _ in range(2000):
+                    board = rnd.getrandbits(64)
+                    cache.put(board, Directions.Up, board)
+                    cache.get(board)
+            except Exception as e:   # surfaced below, a thread can't fail the test itself
+                errors.append(e)
+
+        threads = [threading.Thread(target=work, args=(seed,)) for seed in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(errors, [])
+        self.assertEqual(len(cache), 500)
+
+
+if __name__ == '__main__':
+    unittest.main()
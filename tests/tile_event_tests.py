@@ -0,0 +1,55 @@
+#!/usr/bin/env python
+# coding: UTF-8
+# author: Sylphia
+# created:  16:20
+import random
+import unittest
+
+from models.directions import Directions
+from models.game import Game
+from models.tile_event import TileEventBuffer, TileEventTypes, TileMoveAndMergeEvent, TileSpawnEvent
+
+
+class TestTileEvents(unittest.TestCase):
+    def testEventTypes(self):
+        self.assertEqual(TileMoveAndMergeEvent(0, 0, 1, 0, 4).event_type, TileEventTypes.MoveAndMerge)
+        self.assertFalse(hasattr(TileSpawnEvent(0, 0, 2), '__dict__'))
+
+    def testBuffer(self):
+        buffer = TileEventBuffer()
+        buffer.append(TileEventTypes.Spawn.value, 1, 2, 1, 2, 4)
+        buffer.append(TileEventTypes.MoveAndMerge.value, 1, 0, 0, 0, 8)
+        self.assertEqual(len(buffer), 2)
+        self.assertEqual(list(buffer), [(1, 1, 2, 1, 2, 4), (3, 1, 0, 0, 0, 8)])
+        copy = buffer.copy()
+        buffer.clear()
+        self.assertEqual(len(buffer), 0)
+        self.assertEqual(len(copy), 2)
+        spawn, merge = copy.to_events()
+        self.assertIsInstance(spawn, TileSpawnEvent)
+        self.assertEqual((merge.x, merge.dest_x, merge.value), (1, 0, 8))
+
+
+class TestGameTileBatches(unittest.TestCase):
+    def testBatchMatchesTileEvents(self):
+        random.seed(1)
+        game = Game(size=5)
+        single = []
+        batches = []
+        game.tile_event += lambda e: single.append((e.event_type.value, e.x, e.y, getattr(e, 'dest_x', e.x),
+                                                    getattr(e, 'dest_y', e.y), e.value))
+        game.tile_batch_event += lambda events: batches.append(list(events))
+        game.new_game()
+        for _ in range(50):
+            game.move(random.choice(list(Directions)))
+        self.assertEqual([event for batch in batches for event in batch], single)
+        self.assertEqual(len(batches), len(game.undo_history) + 1)
+
+    def testNoBatchWithoutMove(self):
+        game = Game()
+        batches = []
+        game.tile_batch_event += batches.append
+        game.load([[2, 0, 0, 0], [0, 0, 0, 0], [0, 0, 0, 0], [0, 0, 0, 0]])
+        game.move(Directions.Left)
+        game.move(Directions.Up)
+        self.assertEqual(batches, [])
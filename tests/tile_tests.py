@@ -0,0 +1,57 @@
+#!/usr/bin/env python
+# coding: UTF-8
+# author: Sylphia
+# created:  08:55
+import unittest
+
+from tests.fakes import FakeRoot, StubTile
+from views.animation import AnimationScheduler
+
+
+class TestTileBase(unittest.TestCase):
+    def setUp(self):
+        self.now = 0.0
+        self.root = FakeRoot()
+        self.animations = AnimationScheduler(self.root, clock=lambda: self.now)
+
+    def run_frames(self, count=10):
+        for _ in range(count):
+            self.now += 0.01
+            self.root.run_frame()
+
+    def testMoveAndMerge(self):
+        target = StubTile(2, self.animations)
+        tile = StubTile(2, self.animations)
+        destroyed = []
+        tile.spawn_at(None, 0, 0)
+        tile.move_and_merge(lambda: destroyed.append(target), 4, 50, 0)
+        self.run_frames()
+        self.assertEqual(tile.placed[-1], (50, 0))
+        self.assertEqual(destroyed, [target])
+        self.assertEqual(tile.labels, [(4, 'fg4', 'bg4')])
+
+    def testNewMoveFinishesPreviousMove(self):
+        tile = StubTile(2, self.animations)
+        merged = []
+        tile.spawn_at(None, 0, 0)
+        tile.move_and_merge(lambda: merged.append(True), 4, 100, 0)
+        tile.move_to(100, 30)
+        self.assertEqual(merged, [True])    # the merge landed before the next move started
+        self.run_frames()
+        self.assertEqual(tile.placed[-1], (100, 30))
+
+    def testDestroyCancelsAnimations(self):
+        tile = StubTile(2, self.animations)
+        tile.spawn_at(None, 0, 0)
+        tile.move_to(100, 0)
+        tile.destroy()
+        self.assertEqual(len(self.animations), 0)
+
+    def testRestyle(self):
+        tile = StubTile(8, self.animations)
+        tile.restyle()
+        self.assertEqual(tile.labels, [(8, 'fg8', 'bg8')])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,60 @@
+#!/usr/bin/env python
+# coding: UTF-8
+# author: Sylphia
+# created:  21:30
+import io
+import unittest
+
+from models.replay import parse_records
+from simulation.policies import create_policy
+from simulation.tournament import GameTask, TournamentStats, play_game, run_tournament
+
+
+class TestTournament(unittest.TestCase):
+    def testPlayGameIsDeterministic(self):
+        task = GameTask(0, 7, 4, 2048, 'random', 0)
+        first = play_game(task)
+        second = play_game(task)
+        self.assertEqual(first[:6], second[:6])
+        self.assertIsNone(first.log)
+        self.assertGreater(first.moves, 0)
+
+    def testMaxMoves(self):
+        result = play_game(GameTask(0, 1, 4, 2048, 'greedy', 10))
+        self.assertEqual(result.moves, 10)
+
+    def testProcessPoolMatchesSingleProcess(self):
+        local = []
+        pooled = []
+        local_stats, _ = run_tournament(12, workers=0, policy='random', seed=5, on_result=local.append)
+        pooled_stats, _ = run_tournament(12, workers=2, policy='random', seed=5, on_result=pooled.append)
+        self.assertEqual(sorted(result[:6] for result in local), sorted(result[:6] for result in pooled))
+        self.assertEqual(local_stats.to_dict()['max_tiles'], pooled_stats.to_dict()['max_tiles'])
+        self.assertEqual(pooled_stats.games, 12)
+        self.assertEqual(sum(pooled_stats.score_histogram.values()), 12)
+        self.assertEqual(pooled_stats.moves, sum(result.moves for result in pooled))
+
+    def testMerge(self):
+        stats, _ = run_tournament(6, workers=0, size=3, target=64, seed=1)
+        first, _ = run_tournament(3, workers=0, size=3, target=64, seed=1)
+        second, _ = run_tournament(3, workers=0, size=3, target=64, seed=4)
+        merged = TournamentStats().merge(first).merge(second)
+        self.assertEqual(merged.to_dict()['score_histogram'], stats.to_dict()['score_histogram'])
+        self.assertEqual(merged.wins, stats.wins)
+        self.assertEqual(merged.total_score, stats.total_score)
+
+    def testArchive(self):
+        archive = io.BytesIO()
+        results = []
+        run_tournament(3, workers=0, seed=2, archive=archive, on_result=results.append)
+        records = [record for _, record in parse_records(archive.getvalue())]
+        self.assertEqual([record.seed for record in records], [result.seed for result in results])
+        self.assertEqual([record.score for record in records], [result.score for result in results])
+
+    def testUnknownPolicy(self):
+        self.assertRaises(ValueError, create_policy, 'minimax')
+        self.assertRaises(ValueError, run_tournament, 1, 0, policy='minimax')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,49 @@
+#!/usr/bin/env python
+# coding: UTF-8
+# author: Sylphia
+# created:  23:10
+import random
+import unittest
+
+from models.directions import Directions
+from models.game import Game
+from models.tile_event import TileSpawnEvent
+
+try:
+    import numpy
+    from models import vectorized
+except ImportError:
+    numpy = None
+
+
+def reference_move(matrix, direction):
+    spawns = []
+    game = Game(size=len(matrix), use_bitboard=False)
+    game.tile_event += lambda e: spawns.append(e) if isinstance(e, TileSpawnEvent) else None
+    game.load(matrix)
+    game.move(direction)
+    for spawn in spawns:
+        game.matrix[spawn.x][spawn.y] = 0
+    return game.matrix, game.score
+
+
+@unittest.skipUnless(numpy, 'numpy is not installed')
+class TestVectorizedMove(unittest.TestCase):
+    def testMatchesGame(self):
+        rnd = random.Random(1)
+        values = [0, 0, 0, 2, 2, 4, 4, 8, 16]
+        for size in (2, 3, 4, 5, 6, 8):
+            matrices = [[[rnd.choice(values) for _ in range(size)] for __ in range(size)] for ___ in range(200)]
+            boards = vectorized.from_matrices(matrices)
+            for direction in Directions:
+                new_boards, scores, changed = vectorized.move(boards, direction)
+                for i, matrix in enumerate(matrices):
+                    expected_matrix, expected_score = reference_move(matrix, direction)
+                    self.assertEqual(new_boards[i].tolist(), expected_matrix, (matrix, direction))
+                    self.assertEqual(scores[i], expected_score)
+                    self.assertEqual(bool(changed[i]), expected_matrix != matrix)
+
+    def testInputNotModified(self):
+        boards = vectorized.from_matrices([[[2, 2], [0, 0]]])
+        vectorized.move(boards, Directions.Up)
+        self.assertEqual(boards.tolist(), [[[2, 2], [0, 0]]])
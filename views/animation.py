@@ -0,0 +1,130 @@
+#!/usr/bin/env python
+# coding: UTF-8
+# author: Sylphia
+# created:  14:05
+import time
+
+from common.multicast_delegate import MulticastDelegate
+
+
+class Tween(object):
+    """
+    An animation from progress 0 to 1 over a duration
+    """
+    __slots__ = ('duration_ms', 'update', 'done', 'start', 'active')
+
+    def __init__(self, duration_ms, update, done=None):
+        """
+        Create a tween, it does nothing until it's started by an AnimationScheduler
+        :param duration_ms: duration in milliseconds
+        :param update: called with the progress (0 < progress <= 1) on every frame, last with exactly 1
+        :param done: called without arguments after the last update, or None
+        """
+        self.duration_ms = duration_ms
+        self.update = update
+        self.done = done
+        self.start = None
+        self.active = False
+
+
+class AnimationScheduler(object):
+    """
+    Runs every tween of a window on the Tk event loop, one pass over all active tweens per frame.
+    Frames are only scheduled while something is animating.
+    """
+
+    def __init__(self, root, frame_ms=16, clock=time.perf_counter):
+        """
+        Create a scheduler
+        :param root: Tk widget whose after/after_cancel drive the frames
+        :param frame_ms: time between frames in milliseconds
+        :param clock: time source in seconds
+        """
+        self.root = root
+        self.frame_ms = frame_ms
+        self.clock = clock
+        self.__tweens = []
+        self.__after_id = None
+        self.idle_event = MulticastDelegate(None)   # the last running tween ended, by itself or by finish_all
+
+    def start(self, tween: Tween):
+        """
+        Start a tween, its first update happens on the next frame
+        :param tween: Tween
+        :return: the tween
+        """
+        tween.start = self.clock()
+        tween.active = True
+        self.__tweens.append(tween)
+        if self.__after_id is None:
+            self.__after_id = self.root.after(self.frame_ms, self.__frame)
+        return tween
+
+    def cancel(self, tween: Tween):
+        """
+        Stop a tween where it is, done is not called
+        :return: None
+        """
+        if tween.active:
+            tween.active = False
+            if tween in self.__tweens:  # not there while its frame runs
+                self.__tweens.remove(tween)
+
+    def finish(self, tween: Tween):
+        """
+        Fast-forward a tween to its end, calls update(1) and done
+        :return: None
+        """
+        if tween.active:
+            self.cancel(tween)
+            self.__complete(tween)
+
+    def finish_all(self):
+        """
+        Fast-forward every active tween, e.g. before animating a new move
+        :return: None
+        """
+        finished = bool(self.__tweens)
+        while self.__tweens:
+            tweens, self.__tweens = self.__tweens, []
+            for tween in tweens:
+                if tween.active:
+                    tween.active = False
+                    self.__complete(tween)
+        self.__stop_frames()
+        if finished:
+            self.idle_event.fire()
+
+    def __len__(self):
+        return len(self.__tweens)
+
+    @staticmethod
+    def __complete(tween):
+        tween.update(1)
+        if tween.done:
+            tween.done()
+
+    def __stop_frames(self):
+        if self.__after_id is not None:
+            self.root.after_cancel(self.__after_id)
+            self.__after_id = None
+
+    def __frame(self):
+        self.__after_id = None
+        frame_start = self.clock()
+        tweens, self.__tweens = self.__tweens, []
+        for tween in tweens:
+            if not tween.active:    # finished or cancelled by an earlier update of this frame
+                continue
+            elapsed_ms = (frame_start - tween.start) * 1000
+            if elapsed_ms >= tween.duration_ms:
+                tween.active = False
+                self.__complete(tween)
+            else:
+                tween.update(elapsed_ms / tween.duration_ms)
+                self.__tweens.append(tween)
+        if self.__tweens and self.__after_id is None:
+            spent_ms = (self.clock() - frame_start) * 1000
+            self.__after_id = self.root.after(max(1, int(self.frame_ms - spent_ms)), self.__frame)
+        elif not self.__tweens:
+            self.idle_event.fire()
@@ -3,17 +3,20 @@
 # author: Sylphia
 # created:  22:02
 import logging
-from asyncio import AbstractEventLoop
 from tkinter import Tk, Canvas, Button, Label, StringVar, messagebox
 
 from common.multicast_delegate import MulticastDelegate
 from game_config import GameConfig
-from models.tile_event import TileEvent, TileSpawnEvent, TileMoveEvent, TileMoveAndMergeEvent
+from models.tile_event import TileEventBuffer, TileEventTypes
+from .animation import AnimationScheduler
+from .canvas_tile import CanvasTile, TileItemPool
 from .tile import Tile
 
+_HINT_ARROWS = ('\u2191', '\u2193', '\u2190', '\u2192')    # by Directions value: up, down, left, right
+
 
 class Board(object):
-    def __init__(self, game, game_title, config: GameConfig, io_loop: AbstractEventLoop, board_size=4, **kw):
+    def __init__(self, game, game_title, config: GameConfig, board_size=4, **kw):
         """
         Initialize a new game board
         :param game_title: the title that will display on the window
@@ -23,29 +26,72 @@ class Board(object):
         """
         super().__init__(**kw)
 
-        self.io_loop = io_loop
         self.cells = []
         self.tiles = []
+        self.__cell_items = []  # canvas rectangles of the cells
         self.config = config
         self.board = None
         self.board_size = 4
 
         self.on_new_game_clicked = MulticastDelegate(None)
         self.on_undo_clicked = MulticastDelegate(None)
+        self.on_redo_clicked = MulticastDelegate(None)
+        self.on_auto_play_clicked = MulticastDelegate(None)
+        self.on_hint_clicked = MulticastDelegate(None)
         self.on_key_event = MulticastDelegate(None)
 
         self.__tile_size = self.config.get_cell_size()
         self.__canvas_size = self.__get_board_wh(board_size)
         self.__tile_label_font = self.config.get_label_font()
+        self.__render_mode = self.config.get_render_mode()
+        self.__tile_pool = None     # canvas items of removed tiles, reused by new ones in canvas render mode
         self.__score_var = None
+        self.__hint_var = None
 
         self.root = self.__initialize_window(game_title)
         self.__initialize(board_size)
+        self._attach_game(game, AnimationScheduler(self.root), self.__score_var)
+        game.game_over_event += self.__game_over_dispatcher
+        config.changed_event += self.__config_changed_dispatcher
+
+    def _attach_game(self, game, animations: AnimationScheduler, score_var):
+        """
+        Set up the tile rendering state and render the tile, score, undo and redo events of a game from now on.
+        cells and tiles must be laid out already
+        :param game: the game to render
+        :param animations: scheduler that plays the tile animations
+        :param score_var: variable showing the score
+        :return: None
+        """
         self.game = game
-        game.tile_event += self.__tile_event_dispatcher
+        self.animations = animations    # plays every tile animation on the Tk loop
+        self.__score_var = score_var
+        self.__batch_depth = 0
+        self.__tile_event_handlers = {
+            TileEventTypes.Spawn.value: self.__process_spawn_event,
+            TileEventTypes.Move.value: self.__process_move_event,
+            TileEventTypes.MoveAndMerge.value: self.__process_move_and_merge_event,
+        }
+        game.tile_batch_event += self.__tile_batch_dispatcher
         game.score_event += self.__score_event_dispatcher
         game.undo_event += self.__undo_event_dispatcher
-        game.game_over_event += self.__game_over_dispatcher
+        game.redo_event += self.__undo_event_dispatcher
+
+    def __config_changed_dispatcher(self, config: GameConfig):
+        """
+        Restyle the board and its tiles in place, changed dimensions and render mode apply after a restart
+        """
+        board_fg, board_bg = config.get_board_colors()
+        self.board.config(bg=board_bg)
+        for item in self.__cell_items:
+            self.board.itemconfig(item, outline=board_bg, fill=board_fg)
+        self.__tile_label_font = config.get_label_font()
+        if self.__tile_pool:
+            self.__tile_pool.font = self.__tile_label_font
+        for column in self.tiles:
+            for tile in column:
+                if tile:
+                    tile.restyle()
 
     def __game_over_dispatcher(self, won):
         message = _("Congratulations, YOU WON!") if won else _("Don't be sad, it always happens.")
@@ -53,70 +99,147 @@ class Board(object):
         messagebox.showinfo(title, message)
 
     def __undo_event_dispatcher(self, score, matrix):
-        self.clear_board()
         self.__score_var.set(score)
-        for i in range(len(matrix)):
-            for j in range(len(matrix)):
-                tile = matrix[i][j]
-                if not tile:
+        self.__sync_tiles(matrix)
+
+    def __sync_tiles(self, matrix):
+        """
+        Bring the rendered tiles to a matrix by changing only the cells that differ. Tiles that left a cell slide to
+        a cell of the same row or column that needs their value, the rest are updated in place, removed or spawned
+        """
+        self.animations.finish_all()
+        size = len(matrix)
+        freed = {}  # value -> [(x, y, tile)] of rendered tiles whose cell is wrong
+        needed = []     # (x, y, value) of cells without a rendered tile of their value
+        for x in range(size):
+            for y in range(size):
+                value = matrix[x][y]
+                tile = self.tiles[x][y]
+                if tile and tile.value == value:
+                    continue
+                if tile and value:
+                    tile.set_value(value)
                     continue
-                self.spawn_tile(i, j, tile)
+                if tile:
+                    freed.setdefault(tile.value, []).append((x, y, tile))
+                    self.tiles[x][y] = None
+                if value:
+                    needed.append((x, y, value))
+        for x, y, value in needed:
+            candidates = [(abs(x - from_x) + abs(y - from_y), index)
+                          for index, (from_x, from_y, tile) in enumerate(freed.get(value, ()))
+                          if from_x == x or from_y == y]
+            if not candidates:
+                self.spawn_tile(x, y, value)
+                continue
+            _, index = min(candidates)
+            _, _, tile = freed[value].pop(index)
+            self.tiles[x][y] = tile
+            tile.move_to(*self.cells[x][y])
+        for tiles in freed.values():
+            for _, _, tile in tiles:
+                tile.destroy()
 
     def __score_event_dispatcher(self, new_score):
         self.__score_var.set(new_score)
 
-    def __tile_event_dispatcher(self, tile_event: TileEvent):
-        logging.debug(tile_event)
-
-        self.__process_spawn_event(tile_event)
-        self.__process_move_event(tile_event)
-        self.__process_move_and_merge_event(tile_event)
-
-    def __process_spawn_event(self, tile_event: TileEvent):
-        if not isinstance(tile_event, TileSpawnEvent):
-            return
-        self.spawn_tile(tile_event.x, tile_event.y, tile_event.value)
-
-    def __process_move_event(self, tile_event: TileEvent):
-        if not isinstance(tile_event, TileMoveEvent):
-            return
-        tile = self.tiles[tile_event.x][tile_event.y]
-        x, y = self.cells[tile_event.dest_x][tile_event.dest_y]
-        self.tiles[tile_event.x][tile_event.y] = None
-        self.tiles[tile_event.dest_x][tile_event.dest_y] = tile
-        tile.move_to(x, y)
-
-    def __process_move_and_merge_event(self, tile_event: TileEvent):
-        if not isinstance(tile_event, TileMoveAndMergeEvent):
-            return
-        tile = self.tiles[tile_event.x][tile_event.y]
-        target_tile = self.tiles[tile_event.dest_x][tile_event.dest_y]
-        x, y = self.cells[tile_event.dest_x][tile_event.dest_y]
-        self.tiles[tile_event.x][tile_event.y] = None
-        self.tiles[tile_event.dest_x][tile_event.dest_y] = tile
-        tile.move_and_merge(target_tile.destroy, tile_event.value, x, y)
+    def __tile_batch_dispatcher(self, events: TileEventBuffer):
+        if logging.root.isEnabledFor(logging.DEBUG):   # the repr of the buffer builds an object per tile
+            logging.debug('%d tile events', len(events))
+        if self.__batch_depth:
+            return  # rendered at once by end_batch
+        self.animations.finish_all()    # a new move, the previous one snaps to its end
+        handlers = self.__tile_event_handlers
+        for event_type, x, y, dest_x, dest_y, value in events:
+            handlers[event_type](x, y, dest_x, dest_y, value)
+
+    def __process_spawn_event(self, x, y, dest_x, dest_y, value):
+        self.spawn_tile(x, y, value)
+
+    def __process_move_event(self, x, y, dest_x, dest_y, value):
+        tile = self.tiles[x][y]
+        cell_x, cell_y = self.cells[dest_x][dest_y]
+        self.tiles[x][y] = None
+        self.tiles[dest_x][dest_y] = tile
+        tile.move_to(cell_x, cell_y)
+
+    def __process_move_and_merge_event(self, x, y, dest_x, dest_y, value):
+        tile = self.tiles[x][y]
+        target_tile = self.tiles[dest_x][dest_y]
+        cell_x, cell_y = self.cells[dest_x][dest_y]
+        self.tiles[x][y] = None
+        self.tiles[dest_x][dest_y] = tile
+        tile.move_and_merge(target_tile.destroy, value, cell_x, cell_y)
+
+    def begin_batch(self):
+        """
+        Stop animating tile events until the matching end_batch, batches can be nested
+        :return: None
+        """
+        self.__batch_depth += 1
+
+    def end_batch(self):
+        """
+        Animate the board from what is rendered to the game state in one go
+        :return: None
+        """
+        self.__batch_depth -= 1
+        if not self.__batch_depth:
+            self.__sync_tiles(self.game.matrix)
 
     def clear_board(self):
-        self.__canvas_size = self.__get_board_wh(self.board_size)
-        self.tiles = []
+        """
+        Remove every tile, the canvas and its cells are kept
+        :return: None
+        """
         self.__score_var.set(0)
-        if self.board:
-            self.board.place_forget()
-            self.board.destroy()
-
-        self.__initialize(self.board_size)
+        self.animations.finish_all()
+        for column in self.tiles:
+            for j, tile in enumerate(column):
+                if tile:
+                    tile.destroy()
+                    column[j] = None
 
     def show(self):
         self.root.mainloop()
 
+    def call_later(self, delay_ms, callback):
+        """
+        Run a callback on the Tk main loop after a delay
+        :param delay_ms: delay in milliseconds
+        :param callback: function without arguments
+        :return: Tk after id
+        """
+        return self.root.after(delay_ms, callback)
+
     def __on_new_game_clicked(self):
-        self.on_new_game_clicked.invoke()
+        self.on_new_game_clicked.fire()
 
     def __on_undo_clicked(self):
-        self.on_undo_clicked.invoke()
+        self.on_undo_clicked.fire()
+
+    def __on_redo_clicked(self):
+        self.on_redo_clicked.fire()
+
+    def __on_auto_play_clicked(self):
+        self.on_auto_play_clicked.fire()
+
+    def __on_hint_clicked(self):
+        self.on_hint_clicked.fire()
+
+    def show_hint(self, direction):
+        """
+        Show a recommended move
+        :param direction: Directions value, None if there is no move to recommend
+        :return: None
+        """
+        self.__hint_var.set(_HINT_ARROWS[direction.value] if direction is not None else '-')
+
+    def clear_hint(self):
+        self.__hint_var.set('')
 
     def __on_key_event(self, event):
-        self.on_key_event.invoke(event)
+        self.on_key_event.fire(event)
 
     def __initialize_window(self, game_title):
         root = Tk()
@@ -127,6 +250,12 @@ class Board(object):
         btn_new_game.grid(row=0, column=0, padx=20, pady=5)
         btn_undo = Button(root, text=_('Undo'), width=10, command=self.__on_undo_clicked)
         btn_undo.grid(row=1, column=0, padx=20, pady=5)
+        btn_redo = Button(root, text=_('Redo'), width=10, command=self.__on_redo_clicked)
+        btn_redo.grid(row=1, column=1, padx=20, pady=5)
+        btn_auto_play = Button(root, text=_('Auto Play'), width=10, command=self.__on_auto_play_clicked)
+        btn_auto_play.grid(row=0, column=1, padx=20, pady=5)
+        btn_hint = Button(root, text=_('Hint'), width=10, command=self.__on_hint_clicked)
+        btn_hint.grid(row=0, column=2, padx=20, pady=5)
         lbl_score_title = Label(root, text=_('Score'), font=(_('Arial'), 14))
         lbl_score_title.grid(row=0, column=3, columnspan=2, padx=20)
 
@@ -134,6 +263,10 @@ class Board(object):
         self.__score_var.set(0)
         lbl_score_value = Label(root, textvariable=self.__score_var, font=(_('Arial'), 12))
         lbl_score_value.grid(row=1, column=3, columnspan=2, padx=20)
+
+        self.__hint_var = StringVar()
+        lbl_hint = Label(root, textvariable=self.__hint_var, font=(_('Arial'), 14))
+        lbl_hint.grid(row=1, column=2, padx=20)
         return root
 
     def __get_board_wh(self, board_size):
@@ -152,14 +285,16 @@ class Board(object):
             for j in range(board_size):
                 cell_left = i * self.__tile_size + cell_padding * (1 + i)
                 cell_top = j * self.__tile_size + cell_padding * (1 + j)
-                self.board.create_rectangle(cell_left, cell_top, cell_left + self.__tile_size,
-                                            cell_top + self.__tile_size,
-                                            outline=board_bg, fill=board_fg)
+                self.__cell_items.append(self.board.create_rectangle(cell_left, cell_top,
+                                                                     cell_left + self.__tile_size,
+                                                                     cell_top + self.__tile_size,
+                                                                     outline=board_bg, fill=board_fg))
                 centers_column.append((cell_left + self.__tile_size / 2, cell_top + self.__tile_size / 2))
                 tile_column.append(None)
             self.cells.append(centers_column)
             self.tiles.append(tile_column)
-        pass
+        if self.__render_mode == 'canvas':
+            self.__tile_pool = TileItemPool(self.board, self.__tile_label_font)
 
     def spawn_tile(self, x, y, value: int):
         center_x, center_y = self.cells[x][y]
@@ -167,6 +302,9 @@ class Board(object):
         if current_tile:
             current_tile.destroy()
             self.tiles[x][y] = None
-        tile = Tile(self.__tile_size, value, self.config)
+        if self.__tile_pool:
+            tile = CanvasTile(self.__tile_size, value, self.config, self.__tile_pool, self.animations)
+        else:
+            tile = Tile(self.__tile_size, value, self.config, self.animations)
         self.tiles[x][y] = tile
         tile.spawn_at(self.board, center_x, center_y)
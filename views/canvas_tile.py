@@ -0,0 +1,120 @@
+#!/usr/bin/env python
+# coding: UTF-8
+# author: Sylphia
+# created:  10:48
+from tkinter import Canvas, HIDDEN, NORMAL
+
+from game_config import GameConfig
+from .animation import AnimationScheduler, Tween
+from .tile_base import TileBase
+
+
+class TileItemPool(object):
+    """
+    Rectangle and text canvas items for tiles, hidden instead of deleted when a tile goes away and handed out again to
+    the next tile, so a running game creates no new items once the pool has grown to the number of tiles on the board
+    """
+
+    def __init__(self, canvas: Canvas, font):
+        self.canvas = canvas
+        self.font = font
+        self.__free = []
+
+    def acquire(self):
+        """
+        Get a hidden (rectangle, text) item pair, raised above every other item
+        :return: Tuple of canvas item ids
+        """
+        if self.__free:
+            items = self.__free.pop()
+        else:
+            items = (self.canvas.create_rectangle(0, 0, 0, 0, width=0, state=HIDDEN),
+                     self.canvas.create_text(0, 0, font=self.font, state=HIDDEN))
+        for item in items:
+            self.canvas.tag_raise(item)
+        return items
+
+    def release(self, items):
+        """
+        Hide an item pair and keep it for reuse
+        :param items: Tuple of canvas item ids from acquire
+        :return: None
+        """
+        for item in items:
+            self.canvas.itemconfig(item, state=HIDDEN)
+        self.__free.append(items)
+
+
+class CanvasTile(TileBase):
+    """
+    A tile drawn as a rectangle and a text item on the board canvas, same interface as views.tile.Tile
+    """
+
+    def __init__(self, size, value, config: GameConfig, pool: TileItemPool, animations: AnimationScheduler):
+        """
+        Create a tile
+        :param size: tile size (squared width and height) in px
+        :param value: tile value
+        :param config: game config for colors
+        :param pool: item pool of the board canvas
+        :param animations: scheduler that plays the tile animations
+        """
+        super().__init__(size, value, config, animations)
+        self.__pool = pool
+        self.__items = None
+        self.__current_size = 0
+
+    def spawn_at(self, root, x, y):
+        """
+        Spawn the tile at specified position
+        :param root: the board canvas, items come from the pool
+        :param x: x
+        :param y: y
+        :return: None
+        """
+        self.__items = self.__pool.acquire()
+        self._current_position = (x, y)
+        self.__current_size = 1
+        self._update_label()
+        self._place()
+        self.__pool.canvas.itemconfig(self.__items[0], state=NORMAL)     # the label shows once the tile is grown
+
+        self.__play_spawn_anim()
+
+    def _update_label(self):
+        if not self.__items:
+            return
+        rectangle, text = self.__items
+        canvas = self.__pool.canvas
+        canvas.itemconfig(rectangle, fill=self.bg)
+        canvas.itemconfig(text, text=self.value, fill=self.fg, font=self.__pool.font)
+
+    def _place(self):
+        """
+        Move the items to the current position and size
+        """
+        if not self.__items:
+            return
+        rectangle, text = self.__items
+        canvas = self.__pool.canvas
+        x, y = self._current_position
+        half = self.__current_size / 2
+        canvas.coords(rectangle, x - half, y - half, x + half, y + half)
+        canvas.coords(text, x, y)
+
+    def __play_spawn_anim(self):
+        def update(progress):
+            self.__current_size = 1 + (self.size - 1) * progress
+            self._place()
+
+        def done():
+            if self.__items:
+                self.__pool.canvas.itemconfig(self.__items[1], state=NORMAL)
+
+        self._spawn_tween = self._animations.start(Tween(self._spawn_anim_duration_ms, update, done))
+
+    def destroy(self):
+        super().destroy()
+        if self.__items:
+            self.__pool.release(self.__items)
+            self.__items = None
@@ -0,0 +1,110 @@
+#!/usr/bin/env python
+# coding: UTF-8
+# author: Sylphia
+# created:  08:40
+from game_config import GameConfig
+from .animation import AnimationScheduler, Tween
+
+
+class TileBase(object):
+    """
+    Value, colors, moving and merging of a tile. Subclasses draw it: _place shows the tile at _current_position and
+    _update_label shows the value and colors, spawn_at and destroy create and remove what they draw
+    """
+    _spawn_anim_duration_ms = 100
+    _move_speed = 5    # px per ms
+
+    def __init__(self, size, value, config: GameConfig, animations: AnimationScheduler):
+        """
+        Create a tile
+        :param size: tile size (squared width and height) in px
+        :param value: tile value
+        :param config: game config for colors and font
+        :param animations: scheduler that plays the tile animations
+        """
+        self.config = config
+        self.size = size
+        self.value = value
+        self.fg, self.bg = config.get_tile_colors(value)
+        self._animations = animations
+        self._move_tween = None
+        self._spawn_tween = None
+        self._current_position = None
+        self.__merge_event = None
+        self.__destination = None
+
+    def set_value(self, new_value):
+        """
+        Update tile value to new one
+        :param new_value: new value to set
+        :return: None
+        """
+        self.value = new_value
+        self.fg, self.bg = self.config.get_tile_colors(new_value)
+        self._update_label()
+
+    def restyle(self):
+        """
+        Apply the current config colors and font
+        :return: None
+        """
+        self.fg, self.bg = self.config.get_tile_colors(self.value)
+        self._update_label()
+
+    def move_to(self, x=None, y=None):
+        """
+        Move the tile to specified position
+        :param x: x
+        :param y: y
+        :return: None
+        """
+        if not self._current_position:  # do nothing if not been placed on board
+            return
+        if self._move_tween:
+            self._animations.finish(self._move_tween)   # jump to the end of the previous move, merges included
+        if not x:
+            x = self._current_position[0]
+        if not y:
+            y = self._current_position[1]
+        dest = (x, y)
+        if dest == self._current_position:
+            return
+        self.__destination = dest
+        self.__play_move_anim()
+
+    def move_and_merge(self, merge_callback, new_value, x=None, y=None):
+        self.__merge_event = (merge_callback, new_value)
+        self.move_to(x, y)
+
+    def destroy(self):
+        for tween in (self._move_tween, self._spawn_tween):
+            if tween:
+                self._animations.cancel(tween)  # cancel any playing animations on destroy
+
+    def _place(self):
+        raise NotImplementedError()
+
+    def _update_label(self):
+        raise NotImplementedError()
+
+    def __proceed_with_merge(self):
+        if not self.__merge_event:
+            return
+        callback, new_value = self.__merge_event
+        self.__merge_event = None
+        if callback:
+            callback()
+        self.set_value(new_value)
+
+    def __play_move_anim(self):
+        start_x, start_y = self._current_position
+        destination_x, destination_y = self.__destination
+        distance = max(abs(destination_x - start_x), abs(destination_y - start_y))
+
+        def update(progress):
+            self._current_position = (start_x + (destination_x - start_x) * progress,
+                                      start_y + (destination_y - start_y) * progress)
+            self._place()
+
+        self._move_tween = self._animations.start(Tween(distance / self._move_speed, update,
+                                                        self.__proceed_with_merge))